@@ -5,6 +5,7 @@ from flask_mail import Mail
 from flask_migrate import Migrate
 # ✅ ELIMINADA la importación circular: from app.models import Product
 import os
+from datetime import datetime
 
 # Importar la configuración
 from config import Config
@@ -27,6 +28,14 @@ def create_app():
     mail.init_app(app)
     migrate.init_app(app, db)
     
+    # Caché del catálogo con claves versionadas
+    from app.cache import catalog_cache
+    catalog_cache.init_app(app)
+    
+    # Foto del dashboard por ventana de tiempo, con cálculo único por ventana
+    from app.cache import dashboard_cache
+    dashboard_cache.init_app(app)
+    
     # Configurar Login Manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
@@ -42,6 +51,41 @@ def create_app():
     with app.app_context():
         db.create_all()
         
+        # Índice de texto completo para /api/products/search (FTS5 / FULLTEXT)
+        from app.search import init_search_index
+        try:
+            init_search_index()
+        except Exception as e:
+            print(f"⚠️  No se pudo crear el índice de búsqueda: {e}")
+        
+        # Agregado de facetas para /api/products/filter (mantenido por triggers)
+        from app.facets import init_facet_index
+        try:
+            init_facet_index()
+        except Exception as e:
+            print(f"⚠️  No se pudo crear el agregado de facetas: {e}")
+        
+        # Contador de líneas del carrito por usuario (mantenido por triggers)
+        from app.counters import init_cart_counter
+        try:
+            init_cart_counter()
+        except Exception as e:
+            print(f"⚠️  No se pudo crear el contador del carrito: {e}")
+        
+        # Totales de usuarios para el listado del panel (mantenidos por triggers)
+        from app.counters import init_user_counter
+        try:
+            init_user_counter()
+        except Exception as e:
+            print(f"⚠️  No se pudo crear el contador de usuarios: {e}")
+        
+        # Total de productos para las estadísticas del panel (mantenido por triggers)
+        from app.counters import init_product_counter
+        try:
+            init_product_counter()
+        except Exception as e:
+            print(f"⚠️  No se pudo crear el contador de productos: {e}")
+        
         # Print para depurar la URI de DB cargada
         print(f"URI de DB cargada: {app.config['SQLALCHEMY_DATABASE_URI']}")
         
@@ -67,40 +111,60 @@ def create_app():
     def index():
         # ✅ IMPORTAR Product DENTRO de la función para evitar circular import
         from app.models import Product
+        from app.pagination import keyset_page
+        from app.cache import catalog_cache
         
-        page = request.args.get('page', 1, type=int)
+        # ✅ Paginación por cursor: ?after=<idProduct> / ?before=<idProduct>
+        after = request.args.get('after', type=int)
+        before = request.args.get('before', type=int)
         per_page = 30  # ✅ 30 productos por página (no 6)
         
-        # Obtener productos con paginación
-        products_query = Product.query.filter_by(status='Activo')
-        pagination = products_query.paginate(
-            page=page, 
-            per_page=per_page,
-            error_out=False
-        )
+        def load_page():
+            products_query = Product.query.filter_by(status='Activo')
+            products, has_next, has_prev = keyset_page(
+                products_query,
+                Product.idProduct,
+                after=after,
+                before=before,
+                limit=per_page
+            )
+            
+            # Convertir productos a formato para la template
+            products_data = []
+            for product in products:
+                products_data.append({
+                    'id': product.idProduct,
+                    'name': product.nameProduct,
+                    'description': product.description or '',
+                    'price': float(product.price),
+                    'image_url': product.image or f'https://via.placeholder.com/300x400/f8f9fa/000?text={product.nameProduct}',
+                    'category': product.category,
+                    'stock': product.stock,
+                    'status': product.status
+                })
+            return {'products': products_data, 'has_next': has_next, 'has_prev': has_prev}
         
-        products = pagination.items
+        page = catalog_cache.get_or_set(f'index:{after}:{before}', load_page)
+        products_data = page['products']
         
-        # Convertir productos a formato para la template
-        products_data = []
-        for product in products:
-            products_data.append({
-                'id': product.idProduct,
-                'name': product.nameProduct,
-                'description': product.description or '',
-                'price': float(product.price),
-                'image_url': product.image or f'https://via.placeholder.com/300x400/f8f9fa/000?text={product.nameProduct}',
-                'category': product.category,
-                'stock': product.stock,
-                'status': product.status
-            })
+        # Más vendidos de la semana, solo en la primera página
+        trending = []
+        if after is None and before is None:
+            from app.leaderboard import top_products
+            try:
+                trending = catalog_cache.get_or_set(
+                    f'trending:7d:4:{datetime.utcnow().date()}',
+                    lambda: top_products('7d', limit=4, active_only=True))
+            except Exception as e:
+                print(f"⚠️  No se pudo cargar el ranking: {e}")
         
         return render_template('index.html', 
                              products=products_data,
-                             current_page=page,
-                             total_pages=pagination.pages,
-                             has_next=pagination.has_next,
-                             has_prev=pagination.has_prev)
+                             trending=trending,
+                             has_next=page['has_next'],
+                             has_prev=page['has_prev'],
+                             next_cursor=products_data[-1]['id'] if products_data else None,
+                             prev_cursor=products_data[0]['id'] if products_data else None)
     
     # ✅ CORREGIDO: Registrar blueprints
     from app.routes.auth import bp as auth_bp
@@ -115,4 +179,8 @@ def create_app():
     app.register_blueprint(products_bp)
     app.register_blueprint(cart_bp)
     
+    # Comandos de mantenimiento (flask <comando>)
+    from app.commands import register_commands
+    register_commands(app)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""Análisis de pedidos con NumPy: cohortes, tamaño de canasta y afinidad entre categorías.
+
+Los datos se cargan una sola vez por bloques (``yield_per``) en arreglos
+columnares de enteros (``Dataset``): usuarios con su mes de alta, pedidos
+con su usuario y mes, líneas de pedido y la categoría de cada producto. Los
+meses se guardan como índice ``año * 12 + mes - 1`` calculado en SQL, así
+que no hay conversión de fechas fila a fila en Python.
+
+Los tres reportes se calculan juntos con operaciones vectorizadas
+(``bincount``, ordenamientos, productos de matrices) y se guardan en disco en
+un ``.npz`` cuyo nombre lleva una huella de los datos (agregado
+``sales_daily``, contador de usuarios y versión del catálogo): mientras no
+haya pedidos, usuarios o productos nuevos o modificados, las peticiones
+leen el archivo sin recorrer las tablas grandes. Si
+varias peticiones encuentran el caché vacío a la vez, calcula solo una.
+
+Ver app/analytics_benchmark.py para la comparación con una implementación
+en Python puro.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+from flask import current_app
+
+from app import db
+from app.cache import SingleFlight
+from app.rollups import UNCATEGORIZED
+
+CHUNK_SIZE = 50000
+AFFINITY_CHUNK = 100000
+MAX_BASKET = 10
+
+Dataset = namedtuple('Dataset', [
+    'user_ids', 'user_months',                       # usuarios ordenados por id; mes de alta (-1 sin fecha)
+    'order_ids', 'order_users', 'order_months',      # pedidos ordenados por id; usuario (-1 sin usuario)
+    'line_orders', 'line_products', 'line_units',    # líneas de pedido
+    'product_ids', 'product_categories',             # productos ordenados por id; código de categoría
+    'categories'                                     # nombres de las categorías (por código)
+])
+
+_flight = SingleFlight()
+
+
+def _month_index(column):
+    return db.func.coalesce(db.extract('year', column) * 12 + db.extract('month', column) - 1, -1)
+
+
+def _load_columns(statement, columns, chunk_size):
+    """Ejecuta `statement` por bloques y devuelve un arreglo int64 por columna."""
+    chunks = [np.array(partition, dtype=np.int64).reshape(-1, columns)
+              for partition in db.session.execute(statement.execution_options(yield_per=chunk_size)).partitions()]
+    block = np.concatenate(chunks) if chunks else np.empty((0, columns), dtype=np.int64)
+    return [block[:, i] for i in range(columns)]
+
+
+def load_dataset(chunk_size=CHUNK_SIZE):
+    """Carga usuarios, pedidos, líneas y productos como arreglos columnares."""
+    from app.models import Order, OrderDetail, Product, User
+
+    user_ids, user_months = _load_columns(
+        db.select(User.idUser, _month_index(User.created_at)).order_by(User.idUser), 2, chunk_size)
+    order_ids, order_users, order_months = _load_columns(
+        db.select(Order.idOrder, db.func.coalesce(Order.idUser, -1), _month_index(Order.orderDate))
+        .order_by(Order.idOrder), 3, chunk_size)
+    line_orders, line_products, line_units = _load_columns(
+        db.select(OrderDetail.idOrder, OrderDetail.idProduct, OrderDetail.quantity)
+        .where(OrderDetail.idOrder.isnot(None), OrderDetail.idProduct.isnot(None)), 3, chunk_size)
+
+    # Una fila por producto: las categorías se codifican con np.unique
+    products = db.session.execute(
+        db.select(Product.idProduct, db.func.coalesce(Product.category, UNCATEGORIZED)).order_by(Product.idProduct)
+    ).all()
+    product_ids = np.array([row[0] for row in products], dtype=np.int64)
+    categories, codes = np.unique(np.array([row[1] for row in products], dtype=str), return_inverse=True)
+    return Dataset(user_ids, user_months, order_ids, order_users, order_months,
+                   line_orders, line_products, line_units,
+                   product_ids, codes.astype(np.int64), categories)
+
+
+def _distinct(values):
+    """Valores distintos ordenados y la posición de cada uno (np.unique con ordenamiento simple).
+
+    En NumPy 2.x ``np.unique`` es varias veces más lento que ordenar para
+    arreglos de enteros grandes.
+    """
+    ordered = np.sort(values)
+    keys = ordered[np.concatenate(([True], ordered[1:] != ordered[:-1]))] if ordered.size else ordered
+    return keys, np.searchsorted(keys, values)
+
+
+def _lookup(keys, values):
+    """Posición de cada valor en `keys` (ordenado) y máscara de los encontrados."""
+    if keys.size == 0:
+        return np.zeros(values.size, dtype=np.int64), np.zeros(values.size, dtype=bool)
+    position = np.minimum(np.searchsorted(keys, values), keys.size - 1)
+    return position, keys[position] == values
+
+
+def repeat_cohorts(data):
+    """Cohortes por mes de alta: usuarios, compradores, recompradores y retención.
+
+    ``retention[c, k]`` es cuántos usuarios de la cohorte ``c`` compraron en
+    su mes ``k`` desde el alta (0 = el mes del alta).
+    """
+    has_month = data.user_months >= 0
+    cohorts, cohort_of = _distinct(data.user_months[has_month])
+    user_cohort = np.full(data.user_ids.size, -1, dtype=np.int64)
+    user_cohort[has_month] = cohort_of
+
+    position, found = _lookup(data.user_ids, data.order_users)
+    buyer = position[found]
+    orders_per_user = np.bincount(buyer, minlength=data.user_ids.size)
+    counted = user_cohort >= 0
+    size = np.bincount(user_cohort[counted], minlength=cohorts.size)
+    buyers = np.bincount(user_cohort[counted], weights=orders_per_user[counted] >= 1, minlength=cohorts.size)
+    repeat = np.bincount(user_cohort[counted], weights=orders_per_user[counted] >= 2, minlength=cohorts.size)
+
+    offset = data.order_months[found] - data.user_months[buyer]
+    valid = (user_cohort[buyer] >= 0) & (data.order_months[found] >= 0) & (offset >= 0)
+    buyer, offset = buyer[valid], offset[valid]
+    width = int(offset.max()) + 1 if offset.size else 1
+    # Un usuario cuenta una vez por mes aunque compre varias veces
+    pairs, _ = _distinct(buyer * width + offset)
+    cells = user_cohort[pairs // width] * width + pairs % width
+    retention = np.bincount(cells, minlength=cohorts.size * width).reshape(cohorts.size, width)
+    return {
+        'cohort_months': cohorts,
+        'cohort_users': size.astype(np.int64),
+        'cohort_buyers': buyers.astype(np.int64),
+        'cohort_repeat': repeat.astype(np.int64),
+        'cohort_retention': retention.astype(np.int64)
+    }
+
+
+def basket_sizes(data, max_basket=MAX_BASKET):
+    """Tamaño de canasta (unidades y líneas por pedido), su histograma y promedio mensual."""
+    position, found = _lookup(data.order_ids, data.line_orders)
+    order_index = position[found]
+    units = np.bincount(order_index, weights=data.line_units[found], minlength=data.order_ids.size)
+    lines = np.bincount(order_index, minlength=data.order_ids.size)
+    with_lines = lines > 0
+    units, lines, months = units[with_lines], lines[with_lines], data.order_months[with_lines]
+
+    histogram = np.bincount(np.clip(units.astype(np.int64), 0, max_basket), minlength=max_basket + 1)[1:]
+    dated = months >= 0
+    month_keys, month_of = _distinct(months[dated])
+    month_orders = np.bincount(month_of, minlength=month_keys.size)
+    month_units = np.bincount(month_of, weights=units[dated], minlength=month_keys.size)
+    return {
+        'basket_summary': np.array([
+            units.size,
+            units.mean() if units.size else 0,
+            lines.mean() if lines.size else 0,
+            np.median(units) if units.size else 0
+        ], dtype=np.float64),
+        'basket_histogram': histogram.astype(np.int64),
+        'basket_months': month_keys,
+        'basket_month_orders': month_orders.astype(np.int64),
+        'basket_month_units': month_units
+    }
+
+
+def category_affinity(data, chunk=AFFINITY_CHUNK):
+    """Pedidos que combinan cada par de categorías y su lift.
+
+    ``together[a, b]`` cuenta los pedidos con al menos un producto de cada
+    categoría (la diagonal, los pedidos con la categoría ``a``). ``lift`` es
+    ``P(a y b) / (P(a) P(b))``: mayor que 1 si se compran juntas más de lo
+    esperable por azar. La matriz pedido × categoría se arma por bloques de
+    `chunk` pedidos para acotar la memoria.
+    """
+    n_categories = data.categories.size
+    order_position, order_found = _lookup(data.order_ids, data.line_orders)
+    product_position, product_found = _lookup(data.product_ids, data.line_products)
+    keep = order_found & product_found
+    codes = data.product_categories[product_position[keep]]
+    # Pares (pedido, categoría) únicos, ordenados por pedido
+    pairs, _ = _distinct(order_position[keep] * max(n_categories, 1) + codes)
+    pair_orders, pair_codes = pairs // max(n_categories, 1), pairs % max(n_categories, 1)
+
+    together = np.zeros((n_categories, n_categories), dtype=np.int64)
+    for start in range(0, data.order_ids.size, chunk):
+        lo, hi = np.searchsorted(pair_orders, [start, start + chunk])
+        if lo == hi:
+            continue
+        # float32 para usar BLAS; los conteos de un bloque (<= chunk) son exactos
+        incidence = np.zeros((min(chunk, data.order_ids.size - start), n_categories), dtype=np.float32)
+        incidence[pair_orders[lo:hi] - start, pair_codes[lo:hi]] = 1
+        together += np.rint(incidence.T @ incidence).astype(np.int64)
+
+    total = _distinct(pair_orders)[0].size
+    with_category = np.diag(together).astype(np.float64)
+    expected = np.outer(with_category, with_category)
+    lift = np.divide(together * float(total), expected, out=np.zeros_like(expected), where=expected > 0)
+    return {
+        'affinity_categories': data.categories,
+        'affinity_orders': np.array([total], dtype=np.int64),
+        'affinity_together': together,
+        'affinity_lift': lift
+    }
+
+
+def compute_reports(data):
+    """Los tres reportes en un solo diccionario de arreglos (lo que se guarda en disco)."""
+    return {**repeat_cohorts(data), **basket_sizes(data), **category_affinity(data)}
+
+
+# --- Caché en disco --------------------------------------------------------
+
+def _fingerprint():
+    """Huella de los datos de entrada sin recorrer orders ni order_detail.
+
+    Pedidos y unidades salen de ``sales_daily`` (una fila por día, mantenida
+    en la transacción de cada pedido); usuarios, del contador ``users`` y el
+    id máximo; productos, de la versión del catálogo que sube cada escritura.
+    None si la versión no se pudo leer.
+    """
+    from app.cache import catalog_cache
+    from app.counters import user_totals
+    from app.models import SalesDaily, User
+
+    sales = db.session.execute(db.select(
+        db.func.coalesce(db.func.sum(SalesDaily.orders), 0),
+        db.func.coalesce(db.func.sum(SalesDaily.units), 0),
+        db.func.max(SalesDaily.day)
+    )).one()
+    last_user = db.session.execute(db.select(db.func.max(User.idUser))).scalar()
+    version = catalog_cache.version()
+    if version is None:
+        return None
+    values = (*sales, user_totals()['users'], last_user, version)
+    return hashlib.sha1(repr(values).encode()).hexdigest()[:16]
+
+
+def _cache_dir():
+    path = current_app.config.get('ANALYTICS_CACHE_DIR') or os.path.join(current_app.instance_path, 'analytics')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cached_reports():
+    """Reportes del caché en disco o, si los datos cambiaron, recalculados y guardados."""
+    fingerprint = _fingerprint()
+    if fingerprint is None:
+        # Sin huella confiable no se lee ni se escribe el caché
+        return compute_reports(load_dataset(current_app.config.get('ANALYTICS_CHUNK_SIZE', CHUNK_SIZE)))
+    directory = _cache_dir()
+    path = os.path.join(directory, f'analytics-{fingerprint}.npz')
+
+    def compute():
+        if not os.path.exists(path):
+            reports = compute_reports(load_dataset(current_app.config.get('ANALYTICS_CHUNK_SIZE', CHUNK_SIZE)))
+            # Escritura atómica: nunca se lee un archivo a medio escribir
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix='.npz')
+            with os.fdopen(fd, 'wb') as stream:
+                np.savez(stream, **reports)
+            os.replace(temporary, path)
+            for stale in glob.glob(os.path.join(directory, 'analytics-*.npz')):
+                if stale != path:
+                    os.remove(stale)
+        with np.load(path, allow_pickle=False) as stored:
+            return {name: stored[name] for name in stored.files}
+
+    return _flight.do(path, compute)
+
+
+# --- Formato JSON ----------------------------------------------------------
+
+def _month_label(index):
+    return f'{int(index) // 12:04d}-{int(index) % 12 + 1:02d}'
+
+
+def cohorts_json(reports):
+    return {'cohorts': [{
+        'month': _month_label(month),
+        'users': int(users),
+        'buyers': int(buyers),
+        'repeat_buyers': int(repeat),
+        'repeat_rate': round(float(repeat) / buyers, 4) if buyers else 0,
+        'retention': retention.tolist()
+    } for month, users, buyers, repeat, retention in zip(
+        reports['cohort_months'], reports['cohort_users'], reports['cohort_buyers'],
+        reports['cohort_repeat'], reports['cohort_retention'])]}
+
+
+def basket_json(reports):
+    orders, average_units, average_lines, median_units = reports['basket_summary'].tolist()
+    histogram = reports['basket_histogram'].tolist()
+    return {
+        'orders': int(orders),
+        'average_units': round(average_units, 2),
+        'average_lines': round(average_lines, 2),
+        'median_units': median_units,
+        'histogram': [{'units': str(size) if size < len(histogram) else f'{size}+', 'orders': count}
+                      for size, count in enumerate(histogram, start=1)],
+        'monthly': [{
+            'month': _month_label(month),
+            'orders': int(count),
+            'average_units': round(float(units) / count, 2) if count else 0
+        } for month, count, units in zip(
+            reports['basket_months'], reports['basket_month_orders'], reports['basket_month_units'])]
+    }
+
+
+def affinity_json(reports):
+    return {
+        'categories': reports['affinity_categories'].tolist(),
+        'orders': int(reports['affinity_orders'][0]),
+        'together': reports['affinity_together'].tolist(),
+        'lift': np.round(reports['affinity_lift'], 4).tolist()
+    }
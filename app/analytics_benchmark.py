@@ -0,0 +1,162 @@
+"""Benchmark de app/analytics.py contra una implementación en Python puro.
+
+``naive_reports()`` calcula los mismos reportes recorriendo las filas una a
+una con diccionarios y conjuntos, como los bucles por fila de las rutas. Se
+usa como referencia en las pruebas (los resultados deben coincidir) y en
+``flask benchmark-analytics``, que genera datos sintéticos en memoria y
+compara los tiempos de ambas versiones sin tocar la base de datos.
+"""
+import time
+from collections import defaultdict
+from statistics import median
+
+import numpy as np
+
+from app.analytics import MAX_BASKET, Dataset, compute_reports
+
+
+def synthetic_dataset(orders=100000, users=None, products=500, categories=12, seed=7):
+    """Dataset aleatorio pero reproducible con la forma de la tienda."""
+    rng = np.random.default_rng(seed)
+    users = users or max(orders // 4, 1)
+    user_ids = np.arange(1, users + 1, dtype=np.int64)
+    user_months = rng.integers(24000, 24036, size=users)
+    order_ids = np.arange(1, orders + 1, dtype=np.int64)
+    order_users = rng.choice(user_ids, size=orders)
+    order_months = user_months[order_users - 1] + rng.integers(0, 12, size=orders)
+    lines_per_order = rng.integers(1, 5, size=orders)
+    line_orders = np.repeat(order_ids, lines_per_order)
+    product_ids = np.arange(1, products + 1, dtype=np.int64)
+    return Dataset(
+        user_ids, user_months, order_ids, order_users, order_months,
+        line_orders, rng.choice(product_ids, size=line_orders.size), rng.integers(1, 4, size=line_orders.size),
+        product_ids, rng.integers(0, categories, size=products),
+        np.array([f'Categoría {i:02d}' for i in range(categories)])
+    )
+
+
+def naive_reports(data):
+    """Los reportes de compute_reports() con bucles de Python sobre listas de filas."""
+    users = list(zip(data.user_ids.tolist(), data.user_months.tolist()))
+    orders = list(zip(data.order_ids.tolist(), data.order_users.tolist(), data.order_months.tolist()))
+    lines = list(zip(data.line_orders.tolist(), data.line_products.tolist(), data.line_units.tolist()))
+    product_category = dict(zip(data.product_ids.tolist(), data.product_categories.tolist()))
+    n_categories = len(data.categories)
+
+    # Cohortes
+    signup = {user_id: month for user_id, month in users}
+    orders_per_user = defaultdict(int)
+    active = defaultdict(set)
+    for _, user_id, month in orders:
+        if user_id not in signup:
+            continue
+        orders_per_user[user_id] += 1
+        if signup[user_id] >= 0 and month >= 0 and month >= signup[user_id]:
+            active[user_id].add(month - signup[user_id])
+    cohorts = sorted({month for month in signup.values() if month >= 0})
+    width = max((offset for offsets in active.values() for offset in offsets), default=0) + 1
+    size, buyers, repeat = defaultdict(int), defaultdict(int), defaultdict(int)
+    retention = {cohort: [0] * width for cohort in cohorts}
+    for user_id, month in users:
+        if month < 0:
+            continue
+        size[month] += 1
+        buyers[month] += orders_per_user[user_id] >= 1
+        repeat[month] += orders_per_user[user_id] >= 2
+        for offset in active[user_id]:
+            retention[month][offset] += 1
+
+    # Canasta
+    order_month = {order_id: month for order_id, _, month in orders}
+    units, line_count = defaultdict(int), defaultdict(int)
+    for order_id, _, quantity in lines:
+        if order_id in order_month:
+            units[order_id] += quantity
+            line_count[order_id] += 1
+    basket = [units[order_id] for order_id, _, _ in orders if line_count[order_id]]
+    basket_lines = [line_count[order_id] for order_id, _, _ in orders if line_count[order_id]]
+    histogram = [0] * MAX_BASKET
+    month_orders, month_units = defaultdict(int), defaultdict(int)
+    for order_id, _, month in orders:
+        if not line_count[order_id]:
+            continue
+        if units[order_id] >= 1:
+            histogram[min(units[order_id], MAX_BASKET) - 1] += 1
+        if month >= 0:
+            month_orders[month] += 1
+            month_units[month] += units[order_id]
+
+    # Afinidad de categorías
+    order_categories = defaultdict(set)
+    for order_id, product_id, _ in lines:
+        if order_id in order_month and product_id in product_category:
+            order_categories[order_id].add(product_category[product_id])
+    together = [[0] * n_categories for _ in range(n_categories)]
+    for codes in order_categories.values():
+        for a in codes:
+            for b in codes:
+                together[a][b] += 1
+    total = len(order_categories)
+    lift = [[together[a][b] * total / (together[a][a] * together[b][b]) if together[a][a] and together[b][b] else 0
+             for b in range(n_categories)] for a in range(n_categories)]
+
+    months = sorted(month_orders)
+    return {
+        'cohort_months': np.array(cohorts, dtype=np.int64),
+        'cohort_users': np.array([size[c] for c in cohorts], dtype=np.int64),
+        'cohort_buyers': np.array([buyers[c] for c in cohorts], dtype=np.int64),
+        'cohort_repeat': np.array([repeat[c] for c in cohorts], dtype=np.int64),
+        'cohort_retention': np.array([retention[c] for c in cohorts], dtype=np.int64).reshape(len(cohorts), width),
+        'basket_summary': np.array([
+            len(basket),
+            sum(basket) / len(basket) if basket else 0,
+            sum(basket_lines) / len(basket_lines) if basket_lines else 0,
+            median(basket) if basket else 0
+        ], dtype=np.float64),
+        'basket_histogram': np.array(histogram, dtype=np.int64),
+        'basket_months': np.array(months, dtype=np.int64),
+        'basket_month_orders': np.array([month_orders[m] for m in months], dtype=np.int64),
+        'basket_month_units': np.array([month_units[m] for m in months], dtype=np.float64),
+        'affinity_categories': data.categories,
+        'affinity_orders': np.array([total], dtype=np.int64),
+        'affinity_together': np.array(together, dtype=np.int64).reshape(n_categories, n_categories),
+        'affinity_lift': np.array(lift, dtype=np.float64).reshape(n_categories, n_categories)
+    }
+
+
+def reports_match(expected, actual):
+    """True si los dos diccionarios de arreglos coinciden (con tolerancia en los flotantes)."""
+    if expected.keys() != actual.keys():
+        return False
+    for name, value in expected.items():
+        other = actual[name]
+        if value.shape != other.shape:
+            return False
+        if np.issubdtype(value.dtype, np.floating) or np.issubdtype(other.dtype, np.floating):
+            if not np.allclose(value, other):
+                return False
+        elif not np.array_equal(value, other):
+            return False
+    return True
+
+
+def run_benchmark(orders=100000, repeat=3):
+    """Tiempo (mejor de `repeat`) de ambas versiones sobre el mismo dataset sintético."""
+    data = synthetic_dataset(orders=orders)
+    timings = {}
+    results = {}
+    for name, implementation in (('vectorizado', compute_reports), ('python', naive_reports)):
+        best = None
+        for _ in range(repeat):
+            began = time.perf_counter()
+            results[name] = implementation(data)
+            elapsed = time.perf_counter() - began
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return {
+        'orders': orders,
+        'lines': int(data.line_orders.size),
+        'seconds': timings,
+        'speedup': timings['python'] / timings['vectorizado'] if timings['vectorizado'] else float('inf'),
+        'match': reports_match(results['python'], results['vectorizado'])
+    }
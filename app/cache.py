@@ -0,0 +1,290 @@
+"""Caché de lectura del catálogo con invalidación por versión.
+
+- Nivel 1: LRU en memoria del proceso con TTL.
+- Nivel 2 (opcional): backend compartido entre procesos (Redis si se
+  configura ``CATALOG_CACHE_REDIS_URL``). ``LocalBackend`` implementa la misma
+  interfaz en memoria y sirve de sustituto en desarrollo y pruebas.
+
+Todas las claves llevan el número de versión del catálogo. Los handlers que
+escriben productos llaman a ``catalog_cache.bump()`` después del commit, así
+que una entrada anterior a la escritura ya no vuelve a encontrarse. La
+versión vive en el backend compartido o, sin él, en la fila
+``catalog_version`` de la tabla ``counter``: una escritura en un worker
+invalida también el LRU de los demás. Cada worker reutiliza la versión leída
+durante ``CATALOG_VERSION_TTL`` segundos (una consulta por clave primaria por
+ventana, no por lectura); si no se puede leer, no se cachea nada.
+
+``BucketCache`` (``dashboard_cache``) guarda valores por ventana de tiempo
+fija y usa ``SingleFlight`` para que, en un fallo de caché, las peticiones
+concurrentes esperen un único cálculo en lugar de repetirlo cada una.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import has_app_context
+
+_MISSING = object()
+
+
+class LRUCache:
+    """LRU acotado en tamaño con expiración por entrada."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LocalBackend:
+    """Backend "compartido" en memoria con la interfaz de RedisBackend."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._data[key] = (expires_at, value)
+
+    def incr(self, key):
+        with self._lock:
+            _, value = self._data.get(key, (None, 0))
+            value = int(value) + 1
+            self._data[key] = (None, value)
+            return value
+
+
+class RedisBackend:
+    """Backend compartido sobre Redis (requiere el paquete ``redis``)."""
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, value, ex=ttl)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+
+class CatalogCache:
+    """Caché read-through de dos niveles con claves versionadas."""
+
+    VERSION_KEY = 'catalog:version'
+    COUNTER = 'catalog_version'  # fila de counter sin backend compartido
+
+    def __init__(self):
+        self.local = LRUCache()
+        self.shared = None
+        self.version_ttl = 1
+        self._version = None  # (vence, valor) de la última lectura del contador
+
+    def init_app(self, app, shared=None):
+        self.local = LRUCache(maxsize=app.config.get('CATALOG_CACHE_SIZE', 1024),
+                              ttl=app.config.get('CATALOG_CACHE_TTL', 300))
+        self.version_ttl = app.config.get('CATALOG_VERSION_TTL', 1)
+        self._version = None
+        if shared is None and app.config.get('CATALOG_CACHE_REDIS_URL'):
+            shared = RedisBackend(app.config['CATALOG_CACHE_REDIS_URL'])
+        self.shared = shared
+        app.extensions['catalog_cache'] = self
+
+    def _remember(self, value):
+        self._version = (time.monotonic() + self.version_ttl, value)
+        return value
+
+    def version(self):
+        """Versión actual del catálogo (la del backend compartido o la de la base).
+
+        Devuelve None si no se puede leer: con None no se usa ninguna caché.
+        """
+        if self.shared is not None:
+            value = self.shared.get(self.VERSION_KEY)
+            return int(value) if value is not None else 0
+        cached = self._version
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        if not has_app_context():
+            return None
+        from app.counters import read_counter
+        try:
+            return self._remember(read_counter(self.COUNTER))
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la versión del catálogo: {e}")
+            return None
+
+    def bump(self):
+        """Invalida todo el catálogo cacheado; llamar después del commit de cada escritura.
+
+        El contador sube en su propia transacción: no confirma la sesión de quien llama.
+        """
+        if self.shared is not None:
+            return self.shared.incr(self.VERSION_KEY)
+        self._version = None
+        if not has_app_context():
+            self.local.clear()
+            return None
+        from app.counters import increment_counter
+        try:
+            return self._remember(increment_counter(self.COUNTER))
+        except Exception as e:
+            # Al menos este worker deja de servir lo viejo; los demás, al vencer CATALOG_CACHE_TTL
+            self.local.clear()
+            print(f"⚠️ No se pudo subir la versión del catálogo: {e}")
+            return None
+
+    def get_or_set(self, name, loader, ttl=None):
+        """Devuelve el valor cacheado de `name` o lo calcula con `loader()`.
+
+        Los valores deben ser serializables a JSON (se guardan así en el
+        backend compartido).
+        """
+        version = self.version()
+        if version is None:
+            return loader()
+        key = f'catalog:v{version}:{name}'
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if self.shared is not None:
+            raw = self.shared.get(key)
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(key, value, ttl)
+                return value
+
+        value = loader()
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, json.dumps(value), ttl or self.local.ttl)
+        return value
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes con la misma clave en una sola ejecución."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Ejecuta `fn()` o, si ya hay una ejecución para `key`, espera su resultado.
+
+        Los que esperan reciben el mismo valor (o la misma excepción).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class BucketCache:
+    """Caché por ventanas de tiempo fijas con cálculo único por ventana.
+
+    La clave lleva el número de ventana (``time.time() // ttl``): todas las
+    peticiones de una misma ventana comparten el valor y este nunca tiene más
+    de ``ttl`` segundos.
+    """
+
+    def __init__(self, ttl=5, maxsize=64):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+
+    def init_app(self, app):
+        self.local = LRUCache(maxsize=64, ttl=app.config.get('DASHBOARD_SNAPSHOT_TTL', 5))
+        app.extensions['dashboard_cache'] = self
+
+    def bucket_key(self, name, now=None):
+        now = time.time() if now is None else now
+        return f'{name}:{int(now // self.local.ttl)}'
+
+    def get_or_compute(self, name, loader):
+        """Valor de `name` en la ventana actual; lo calcula una sola vez con `loader()`."""
+        key = self.bucket_key(name)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def compute():
+            # Otro hilo pudo terminar el cálculo entre la lectura y este punto
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                value = loader()
+                self.local.set(key, value)
+            return value
+        return self.flight.do(key, compute)
+
+
+catalog_cache = CatalogCache()
+dashboard_cache = BucketCache()
@@ -0,0 +1,123 @@
+"""Checkout: convierte el carrito de un usuario en un pedido.
+
+Todo ocurre en una sola transacción y empieza por la escritura:
+
+1. Un único UPDATE sobre ``product`` descuenta la cantidad del carrito de
+   cada producto, solo donde ``stock - reservas de otros >= cantidad`` (sin
+   leer y luego escribir; ver app/reservations.py). El UPDATE toma los bloqueos de fila (MySQL) o de escritura
+   (SQLite) antes de cualquier lectura, así que dos checkouts concurrentes
+   nunca ven el mismo stock.
+2. Si el número de filas descontadas no coincide con las líneas del
+   carrito, algún producto no alcanzaba: rollback completo.
+3. Se crea el ``Order``, sus ``OrderDetail`` con un solo INSERT por lotes,
+   se vacía el carrito (los triggers ajustan ``user.cart_count``), se
+   liberan sus reservas y se actualizan el índice de recomendaciones y los
+   agregados de ventas (app/rollups.py).
+"""
+from app import db
+from app.reservations import held_quantity, release_holds
+
+
+class CheckoutError(Exception):
+    """El carrito no se puede convertir en pedido."""
+
+    def __init__(self, message, shortages=None):
+        super().__init__(message)
+        self.message = message
+        self.shortages = shortages or []
+
+
+def _reserve_stock(user_id):
+    """Descuenta del stock lo que hay en el carrito; devuelve las filas afectadas."""
+    from app.models import CartItem, Product
+
+    product = Product.__table__
+    cart_item = CartItem.__table__
+    in_cart = db.select(cart_item.c.quantity).where(
+        cart_item.c.idUser == user_id,
+        cart_item.c.idProduct == product.c.idProduct
+    ).scalar_subquery()
+    remaining = product.c.stock - in_cart
+
+    # status va primero: MySQL evalúa el SET de izquierda a derecha con valores nuevos
+    statement = product.update().where(
+        product.c.idProduct.in_(
+            db.select(cart_item.c.idProduct).where(cart_item.c.idUser == user_id)
+        ),
+        product.c.stock - held_quantity(product.c.idProduct, exclude_user=user_id) >= in_cart
+    ).ordered_values(
+        (product.c.status, db.case((remaining > 0, product.c.status), else_='Inactivo')),
+        (product.c.stock, remaining),
+        (product.c.version, product.c.version + 1),
+    )
+    return db.session.execute(statement).rowcount
+
+
+def _shortages(user_id):
+    """Productos del carrito sin stock suficiente (para el mensaje de error)."""
+    from app.models import CartItem, Product
+
+    available = (Product.stock - held_quantity(Product.idProduct, exclude_user=user_id)).label('available')
+    rows = db.session.query(
+        Product.idProduct, Product.nameProduct, available, CartItem.quantity
+    ).join(
+        CartItem, CartItem.idProduct == Product.idProduct
+    ).filter(
+        CartItem.idUser == user_id,
+        available < CartItem.quantity
+    ).all()
+    return [{'product_id': row.idProduct, 'name': row.nameProduct,
+             'available': row.available, 'requested': row.quantity} for row in rows]
+
+
+def place_order(user_id):
+    """Crea el pedido del carrito de `user_id` y hace commit; devuelve el Order.
+
+    Lanza CheckoutError (después de hacer rollback) si el carrito está vacío
+    o algún producto no tiene stock suficiente.
+    """
+    from app.models import CartItem, Order, OrderDetail, Product
+    from app.recommendations import record_order
+    from app.rollups import record_sale
+
+    try:
+        reserved = _reserve_stock(user_id)
+
+        # Las líneas se leen con el stock ya bloqueado: los precios no cambian
+        lines = db.session.query(
+            CartItem.idProduct, CartItem.quantity, Product.price, Product.category
+        ).join(
+            Product, Product.idProduct == CartItem.idProduct
+        ).filter(
+            CartItem.idUser == user_id
+        ).with_for_update().all()
+
+        if not lines:
+            raise CheckoutError('El carrito está vacío')
+        if reserved != len(lines):
+            db.session.rollback()
+            raise CheckoutError('No hay suficiente stock disponible', _shortages(user_id))
+
+        order = Order(
+            idUser=user_id,
+            totalAmount=sum(line.price * line.quantity for line in lines),
+            status='Pendiente'
+        )
+        db.session.add(order)
+        db.session.flush()
+
+        db.session.execute(OrderDetail.__table__.insert(), [
+            {'idOrder': order.idOrder, 'idProduct': line.idProduct,
+             'quantity': line.quantity, 'price': line.price}
+            for line in lines
+        ])
+        db.session.execute(CartItem.__table__.delete().where(CartItem.__table__.c.idUser == user_id))
+        release_holds(user_id)
+        record_order([line.idProduct for line in lines])
+        record_sale(order.orderDate, [(line.idProduct, line.quantity, line.price, line.category)
+                                      for line in lines])
+        db.session.commit()
+        return order
+    except Exception:
+        db.session.rollback()
+        raise
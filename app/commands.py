@@ -0,0 +1,142 @@
+"""Comandos de mantenimiento disponibles con `flask <comando>`."""
+import click
+
+
+@click.command('rebuild-recommendations')
+@click.option('--top-k', default=None, type=int, help='Vecinos a guardar por producto.')
+def rebuild_recommendations_command(top_k):
+    """Reconstruye el índice "comprados juntos" desde order_detail."""
+    from app.recommendations import TOP_K, rebuild_recommendations
+    from app.cache import catalog_cache
+
+    rows = rebuild_recommendations(k=top_k or TOP_K)
+    catalog_cache.bump()
+    click.echo(f'✅ Recomendaciones reconstruidas: {rows} filas')
+
+
+@click.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Formato del archivo (por defecto según la extensión).')
+@click.option('--batch-size', default=None, type=int, help='Filas por INSERT/transacción.')
+def import_products_command(path, fmt, batch_size):
+    """Importa productos desde un archivo CSV o NDJSON."""
+    from app.importer import DEFAULT_BATCH_SIZE, import_products
+    from app.cache import catalog_cache
+    from app.events import publish_stock
+
+    if fmt is None:
+        fmt = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+    with open(path, 'rb') as stream:
+        result = import_products(stream, fmt=fmt, batch_size=batch_size or DEFAULT_BATCH_SIZE)
+    if result.inserted:
+        catalog_cache.bump()
+        publish_stock(result.product_ids, change='created')
+
+    click.echo(f'✅ Insertados: {result.inserted} | ❌ Con errores: {result.failed} | Lotes: {result.batches}')
+    for error in result.errors:
+        click.echo(f"  línea {error['line']}: {error['error']}")
+
+
+@click.command('check-query-plans')
+def check_query_plans_command():
+    """Falla si alguna consulta frecuente recorre una tabla completa."""
+    from app.query_plans import HOT_QUERIES, check_query_plans
+
+    problems = check_query_plans()
+    for name, tables in problems.items():
+        click.echo(f"❌ {name}: recorrido completo de {', '.join(tables)}")
+    if problems:
+        raise SystemExit(1)
+    click.echo(f'✅ {len(HOT_QUERIES)} consultas revisadas, todas usan índices')
+
+
+@click.command('repair-cart-counts')
+def repair_cart_counts_command():
+    """Recalcula el contador de carrito de todos los usuarios."""
+    from app.counters import repair_cart_counts
+
+    users = repair_cart_counts()
+    click.echo(f'✅ Contadores de carrito recalculados: {users} usuarios')
+
+
+@click.command('release-expired-holds')
+@click.option('--batch-size', default=None, type=int, help='Reservas borradas por transacción.')
+def release_expired_holds_command(batch_size):
+    """Borra por lotes las reservas de stock vencidas."""
+    from app.reservations import release_expired
+
+    released = release_expired(batch_size=batch_size)
+    click.echo(f'✅ Reservas vencidas liberadas: {released}')
+
+
+@click.command('rebuild-sales-rollups')
+def rebuild_sales_rollups_command():
+    """Recalcula los agregados de ventas desde orders/order_detail."""
+    from app.rollups import rebuild_rollups
+    from app.cache import catalog_cache
+
+    days, products = rebuild_rollups()
+    # Ranking y páginas de producto cacheados leen estos agregados
+    catalog_cache.bump()
+    click.echo(f'✅ Agregados de ventas reconstruidos: {days} días, {products} productos')
+
+
+@click.command('roll-leaderboard')
+def roll_leaderboard_command():
+    """Saca de las ventanas de 7 y 30 días los días vencidos (programar una vez al día)."""
+    from app.leaderboard import roll_windows
+
+    if roll_windows():
+        click.echo('✅ Ventanas del ranking avanzadas a hoy')
+    else:
+        click.echo('✅ Las ventanas del ranking ya estaban al día')
+
+
+@click.command('export')
+@click.argument('name', type=click.Choice(['orders', 'products', 'users']))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', help='Formato de salida.')
+@click.option('--output', '-o', required=True, type=click.Path(dir_okay=False, writable=True),
+              help='Archivo de salida.')
+@click.option('--chunk-size', default=None, type=int, help='Filas leídas del cursor por partición.')
+def export_command(name, fmt, output, chunk_size):
+    """Exporta pedidos, productos o usuarios en streaming (memoria constante)."""
+    from app.exporter import DEFAULT_CHUNK_SIZE, export_chunks
+
+    chunks = 0
+    with open(output, 'w', encoding='utf-8', newline='') as stream:
+        for chunk in export_chunks(name, fmt, chunk_size or DEFAULT_CHUNK_SIZE):
+            stream.write(chunk)
+            chunks += 1
+    click.echo(f'✅ Exportación de {name} escrita en {output} ({chunks} bloques)')
+
+
+@click.command('benchmark-analytics')
+@click.option('--orders', default=100000, type=int, help='Pedidos del dataset sintético.')
+@click.option('--repeat', default=3, type=int, help='Repeticiones (se toma la mejor).')
+def benchmark_analytics_command(orders, repeat):
+    """Compara los reportes vectorizados con una implementación en Python puro."""
+    from app.analytics_benchmark import run_benchmark
+
+    result = run_benchmark(orders=orders, repeat=repeat)
+    click.echo(f"Pedidos: {result['orders']}, líneas: {result['lines']}")
+    for name, seconds in result['seconds'].items():
+        click.echo(f'  {name:<12} {seconds * 1000:10.1f} ms')
+    click.echo(f"  aceleración   {result['speedup']:9.1f}x")
+    if result['match']:
+        click.echo('✅ Ambas implementaciones dan los mismos resultados')
+    else:
+        click.echo('❌ Los resultados no coinciden')
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_recommendations_command)
+    app.cli.add_command(import_products_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(repair_cart_counts_command)
+    app.cli.add_command(release_expired_holds_command)
+    app.cli.add_command(rebuild_sales_rollups_command)
+    app.cli.add_command(roll_leaderboard_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(benchmark_analytics_command)
@@ -0,0 +1,111 @@
+"""GET condicional (ETag / Last-Modified) para los endpoints del catálogo.
+
+Los validadores salen de agregados baratos (conteo y max(updated_at) del
+conjunto consultado) y se guardan en la caché versionada del catálogo, así
+que un cliente que repite la petición recibe 304 sin consultar ni
+serializar los productos.
+
+El ETag de un producto se deriva de ``product.version`` (``version_id_col``
+del mapper), así que también sirve para ``If-Match`` en los PUT: si no
+coincide, la edición partió de una versión vieja y se responde 409.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from flask import current_app, jsonify, request
+
+from app import db
+from app.cache import catalog_cache
+
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de los valores que identifican la representación."""
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def product_etag(product_id, version):
+    """ETag de un producto: cambia con cada incremento de product.version."""
+    return make_etag('product', product_id, version)
+
+
+def catalog_validators(scope, *filters):
+    """(etag, last_modified) de un listado de productos filtrado.
+
+    ``scope`` distingue representaciones distintas (ruta y query string).
+    """
+    from app.models import Product
+
+    def load():
+        count, last_modified = db.session.query(
+            db.func.count(Product.idProduct),
+            db.func.max(db.func.coalesce(Product.updated_at, Product.created_at))
+        ).filter(*filters).one()
+        if isinstance(last_modified, str):  # SQLite devuelve texto en agregados
+            last_modified = datetime.fromisoformat(last_modified)
+        return {
+            'etag': make_etag(scope, count, last_modified.isoformat() if last_modified else ''),
+            'last_modified': last_modified.isoformat() if last_modified else None
+        }
+
+    validators = catalog_cache.get_or_set(f'validators:{scope}', load)
+    last_modified = validators['last_modified']
+    return validators['etag'], datetime.fromisoformat(last_modified) if last_modified else None
+
+
+def product_validators(product_id):
+    """(etag, last_modified) de un producto, o None si no existe."""
+    from app.models import Product
+
+    def load():
+        row = db.session.query(
+            db.func.coalesce(Product.updated_at, Product.created_at), Product.version
+        ).filter(Product.idProduct == product_id).first()
+        if row is None:
+            return None
+        last_modified, version = row
+        if isinstance(last_modified, str):
+            last_modified = datetime.fromisoformat(last_modified)
+        stamp = last_modified.isoformat() if last_modified else ''
+        return {'etag': product_etag(product_id, version), 'last_modified': stamp or None}
+
+    validators = catalog_cache.get_or_set(f'validators:product:{product_id}', load)
+    if validators is None:
+        return None
+    last_modified = validators['last_modified']
+    return validators['etag'], datetime.fromisoformat(last_modified) if last_modified else None
+
+
+def is_not_modified(etag, last_modified):
+    """Evalúa If-None-Match (prioritario) o If-Modified-Since."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag) or request.if_none_match.star_tag
+    if request.if_modified_since and last_modified is not None:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def if_match_failed(etag):
+    """True si la petición trae If-Match y ninguna etiqueta coincide con `etag`."""
+    if not request.if_match:
+        return False
+    return not (request.if_match.star_tag or request.if_match.contains(etag))
+
+
+def conditional_json(etag, last_modified, build_body):
+    """Respuesta JSON con validadores; 304 sin llamar a build_body si no cambió."""
+    if is_not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build_body())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    return response
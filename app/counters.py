@@ -0,0 +1,237 @@
+"""Contadores desnormalizados mantenidos por triggers.
+
+- ``user.cart_count``: líneas del carrito por usuario, con triggers sobre
+  ``cart_item``. ``User.get_cart_count()`` lo lee con una sola consulta por
+  clave primaria en lugar de un COUNT(*).
+- ``counter``: totales globales de usuarios (``users`` y ``admins``), con
+  triggers sobre ``user``, y de productos (``products``), con triggers sobre
+  ``product``. El listado de usuarios y las estadísticas del panel los usan
+  en lugar de contar las tablas en cada petición. También guarda valores
+  que sube la aplicación, como ``catalog_version`` (ver app/cache.py).
+
+Cada INSERT/DELETE ajusta el contador dentro de la misma transacción, sea
+cual sea la ruta que modificó la tabla.
+
+``upsert_increment()`` es el upsert por dialecto que usan estos contadores y
+los agregados de ventas (app/rollups.py, app/leaderboard.py).
+"""
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from app.facets import trigger_exists
+
+
+def upsert_increment(table, rows, key_columns, counters, conn=None):
+    """INSERT de `rows`; si la clave ya existe, suma `counters` a la fila.
+
+    Se ejecuta en `conn` o, sin ella, en la sesión actual (sin commit).
+    """
+    dialect = (conn or db.engine).dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(table)
+        statement = statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in counters}
+        )
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={name: table.c[name] + statement.excluded[name] for name in counters}
+        )
+    else:
+        raise RuntimeError(f'Backend no soportado para los contadores: {dialect}')
+    (conn if conn is not None else db.session).execute(statement, rows)
+
+
+def increment_counter(name, delta=1):
+    """Suma `delta` a counter.`name` en su propia transacción; devuelve el valor nuevo.
+
+    No toca la sesión de quien llama: se puede usar después de su commit
+    sin confirmar nada más.
+    """
+    from app.models import Counter
+
+    table = Counter.__table__
+    with db.engine.begin() as conn:
+        upsert_increment(table, [{'name': name, 'value': delta}], ['name'], ['value'], conn=conn)
+        return conn.execute(db.select(table.c.value).where(table.c.name == name)).scalar_one()
+
+
+def read_counter(name):
+    """Valor de counter.`name` (0 si la fila no existe)."""
+    from app.models import Counter
+
+    return db.session.execute(
+        db.select(Counter.value).where(Counter.name == name)
+    ).scalar_one_or_none() or 0
+
+
+def _trigger_ddl(dialect):
+    """(nombre, DDL) de los triggers que mantienen user.cart_count."""
+    if dialect == 'mysql':
+        user, new, old = '`user`', 'NEW', 'OLD'
+        header = 'CREATE TRIGGER {name} {event} ON cart_item FOR EACH ROW BEGIN\n{body};\nEND'
+    else:
+        user, new, old = '"user"', 'new', 'old'
+        header = 'CREATE TRIGGER IF NOT EXISTS {name} {event} ON cart_item BEGIN\n{body};\nEND'
+
+    def adjust(row, delta, condition=''):
+        return f'UPDATE {user} SET cart_count = cart_count {delta} WHERE idUser = {row}.idUser{condition}'
+
+    # Solo cuenta el cambio de dueño de la línea, no los cambios de cantidad
+    moved = f' AND {old}.idUser <> {new}.idUser'
+    triggers = {
+        'cart_count_ai': ('AFTER INSERT', [adjust(new, '+ 1')]),
+        'cart_count_ad': ('AFTER DELETE', [adjust(old, '- 1')]),
+        'cart_count_au': ('AFTER UPDATE' if dialect == 'mysql' else 'AFTER UPDATE OF idUser',
+                          [adjust(old, '- 1', moved), adjust(new, '+ 1', moved)]),
+    }
+    for name, (event, statements) in triggers.items():
+        yield name, header.format(name=name, event=event, body=';\n'.join(statements))
+
+
+def repair_cart_counts(conn=None):
+    """Recalcula cart_count de todos los usuarios en una sola sentencia."""
+    def run(connection):
+        user = '`user`' if connection.dialect.name == 'mysql' else '"user"'
+        return connection.execute(text(
+            f'UPDATE {user} SET cart_count = '
+            f'(SELECT COUNT(*) FROM cart_item WHERE cart_item.idUser = {user}.idUser)'
+        )).rowcount
+
+    if conn is not None:
+        return run(conn)
+    with db.engine.begin() as connection:
+        return run(connection)
+
+
+def _user_trigger_ddl(dialect):
+    """(nombre, DDL) de los triggers que mantienen counter.users / counter.admins."""
+    if dialect == 'mysql':
+        user, new, old = '`user`', 'NEW', 'OLD'
+        header = 'CREATE TRIGGER {name} {event} ON {user} FOR EACH ROW BEGIN\n{body};\nEND'
+    else:
+        user, new, old = '"user"', 'new', 'old'
+        header = 'CREATE TRIGGER IF NOT EXISTS {name} {event} ON {user} BEGIN\n{body};\nEND'
+
+    def adjust(name, delta):
+        return f"UPDATE counter SET value = value {delta} WHERE name = '{name}'"
+
+    admin_delta = f'(CASE WHEN {new}.is_admin THEN 1 ELSE 0 END) - (CASE WHEN {old}.is_admin THEN 1 ELSE 0 END)'
+    triggers = {
+        'user_count_ai': ('AFTER INSERT', [adjust('users', '+ 1'),
+                                           adjust('admins', f'+ (CASE WHEN {new}.is_admin THEN 1 ELSE 0 END)')]),
+        'user_count_ad': ('AFTER DELETE', [adjust('users', '- 1'),
+                                           adjust('admins', f'- (CASE WHEN {old}.is_admin THEN 1 ELSE 0 END)')]),
+        'user_count_au': ('AFTER UPDATE' if dialect == 'mysql' else 'AFTER UPDATE OF is_admin',
+                          [adjust('admins', f'+ {admin_delta}')]),
+    }
+    for name, (event, statements) in triggers.items():
+        yield name, header.format(name=name, event=event, user=user, body=';\n'.join(statements))
+
+
+def _set_totals(connection, totals):
+    """Escribe en counter cada {nombre: SELECT COUNT(*) ...} y devuelve los valores."""
+    for name, count_sql in totals.items():
+        updated = connection.execute(text(
+            f'UPDATE counter SET value = ({count_sql}) WHERE name = :name'), {'name': name}).rowcount
+        if not updated:
+            connection.execute(text(
+                f'INSERT INTO counter (name, value) SELECT :name, ({count_sql})'), {'name': name})
+    return dict(connection.execute(
+        text('SELECT name, value FROM counter WHERE name IN :names').bindparams(
+            bindparam('names', expanding=True)), {'names': list(totals)}).all())
+
+
+def repair_user_counts(conn=None):
+    """Recalcula counter.users y counter.admins desde la tabla user."""
+    def run(connection):
+        user = '`user`' if connection.dialect.name == 'mysql' else '"user"'
+        return _set_totals(connection, {
+            'users': f'SELECT COUNT(*) FROM {user}',
+            'admins': f'SELECT COUNT(*) FROM {user} WHERE is_admin',
+        })
+
+    if conn is not None:
+        return run(conn)
+    with db.engine.begin() as connection:
+        return run(connection)
+
+
+def counter_values(*names):
+    """{nombre: valor} de las filas de counter pedidas, en una consulta (0 si falta)."""
+    from app.models import Counter
+
+    values = dict(db.session.query(Counter.name, Counter.value).filter(Counter.name.in_(names)).all())
+    return {name: values.get(name, 0) for name in names}
+
+
+def user_totals():
+    """{'users': N, 'admins': M} leído de la tabla counter (sin COUNT(*))."""
+    return counter_values('users', 'admins')
+
+
+def init_user_counter():
+    """Crea los triggers de los totales de usuarios (y los calcula) si aún no existen."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        return
+    with db.engine.begin() as conn:
+        if trigger_exists(conn, 'user_count_ai'):
+            return
+        repair_user_counts(conn)
+        for _, ddl in _user_trigger_ddl(dialect):
+            conn.execute(text(ddl))
+
+
+def _product_trigger_ddl(dialect):
+    """(nombre, DDL) de los triggers que mantienen counter.products."""
+    if dialect == 'mysql':
+        header = 'CREATE TRIGGER {name} {event} ON product FOR EACH ROW BEGIN\n{body};\nEND'
+    else:
+        header = 'CREATE TRIGGER IF NOT EXISTS {name} {event} ON product BEGIN\n{body};\nEND'
+    triggers = {
+        'product_count_ai': ('AFTER INSERT', "UPDATE counter SET value = value + 1 WHERE name = 'products'"),
+        'product_count_ad': ('AFTER DELETE', "UPDATE counter SET value = value - 1 WHERE name = 'products'"),
+    }
+    for name, (event, body) in triggers.items():
+        yield name, header.format(name=name, event=event, body=body)
+
+
+def repair_product_counts(conn=None):
+    """Recalcula counter.products desde la tabla product."""
+    def run(connection):
+        return _set_totals(connection, {'products': 'SELECT COUNT(*) FROM product'})
+
+    if conn is not None:
+        return run(conn)
+    with db.engine.begin() as connection:
+        return run(connection)
+
+
+def init_product_counter():
+    """Crea los triggers del total de productos (y lo calcula) si aún no existen."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        return
+    with db.engine.begin() as conn:
+        if trigger_exists(conn, 'product_count_ai'):
+            return
+        repair_product_counts(conn)
+        for _, ddl in _product_trigger_ddl(dialect):
+            conn.execute(text(ddl))
+
+
+def init_cart_counter():
+    """Crea los triggers del contador (y lo recalcula) si aún no existen."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        return
+    with db.engine.begin() as conn:
+        if trigger_exists(conn, 'cart_count_ai'):
+            return
+        for _, ddl in _trigger_ddl(dialect):
+            conn.execute(text(ddl))
+        repair_cart_counts(conn)
@@ -0,0 +1,179 @@
+"""Bus de eventos en proceso para el feed en vivo del dashboard (SSE).
+
+Las rutas de escritura publican deltas pequeños después del commit:
+
+- ``order``: pedido nuevo (para total de pedidos, ingresos de hoy y la
+  tabla de pedidos recientes).
+- ``stock``: productos creados, modificados o eliminados con su stock y
+  estado actuales.
+- ``user``: usuario registrado o eliminado.
+
+Cada conexión SSE (``/api/dashboard/events``) es un ``Subscriber`` con una
+cola acotada; el stream solo lee de esa cola, nunca de la base de datos, así
+que una conexión abierta ocupa un hilo del servidor pero ninguna conexión
+del pool. Los últimos eventos se guardan en un historial para reenviarlos
+cuando el navegador reconecta con ``Last-Event-ID``; si se perdió algo (la
+cola se llenó o el historial ya no llega), el cliente recibe ``resync`` y
+vuelve a pedir la foto completa.
+
+El bus es por proceso: con varios workers, cada uno solo ve sus escrituras
+(el ``resync`` periódico de ``DASHBOARD_EVENTS_MAX_AGE`` acota el desfase).
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+from app import db
+
+ORDER = 'order'
+STOCK = 'stock'
+USER = 'user'
+RESYNC = 'resync'
+
+# Productos por evento de stock: una importación grande se parte en varios
+STOCK_EVENT_SIZE = 500
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+
+class Subscriber:
+    """Una conexión SSE: cola de eventos pendientes y los que hay que reenviar."""
+
+    def __init__(self, maxsize, backlog, gap):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.backlog = backlog
+        self.lagged = gap
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Cliente lento: se descarta lo pendiente y se le pide un resync
+            self.lagged = True
+
+
+class EventBus:
+    """Publicación/suscripción en memoria con historial acotado."""
+
+    def __init__(self, history=256, queue_size=256):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, type, data):
+        """Envía el evento a todos los suscriptores; devuelve el Event."""
+        with self._lock:
+            event = Event(self._next_id, type, data)
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(event)
+        return event
+
+    def subscribe(self, last_id=None):
+        """Registra una conexión; con `last_id` prepara los eventos posteriores."""
+        with self._lock:
+            backlog, gap = [], False
+            if last_id is not None:
+                backlog = [event for event in self._history if event.id > last_id]
+                oldest = self._history[0].id if self._history else self._next_id
+                # Un id posterior al último emitido: el proceso se reinició
+                gap = last_id + 1 < oldest or last_id >= self._next_id
+            subscriber = Subscriber(self.queue_size, backlog, gap)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+def format_sse(event):
+    """Mensaje SSE (id, event, data) de un Event."""
+    return f'id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n'
+
+
+def stream(bus, subscriber, heartbeat=15, max_age=300, clock=time.monotonic):
+    """Generador del cuerpo text/event-stream de una conexión.
+
+    Envía un comentario cada `heartbeat` segundos sin eventos (así se detecta
+    un cliente desconectado y se libera el hilo) y cierra tras `max_age`
+    segundos; EventSource reconecta solo con ``Last-Event-ID``.
+    """
+    deadline = clock() + max_age
+    try:
+        yield 'retry: 3000\n\n'
+        for event in subscriber.backlog:
+            yield format_sse(event)
+        while True:
+            if subscriber.lagged:
+                subscriber.lagged = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                yield f'event: {RESYNC}\ndata: {{}}\n\n'
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return
+            try:
+                event = subscriber.queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield format_sse(event)
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+event_bus = EventBus()
+
+
+# --- Publicación desde las rutas de escritura (después del commit) ---------
+
+def publish_order(order, customer=None):
+    return event_bus.publish(ORDER, {
+        'id': order.idOrder,
+        'customer': customer or 'Cliente',
+        'date': order.orderDate.strftime('%d/%m/%Y') if order.orderDate else None,
+        'day': order.orderDate.date().isoformat() if order.orderDate else None,
+        'amount': float(order.totalAmount or 0),
+        'status': order.status
+    })
+
+
+def publish_stock(product_ids, change='updated'):
+    """Publica el stock y estado actuales de `product_ids` (`change`: created/updated/deleted).
+
+    Con más de ``STOCK_EVENT_SIZE`` ids se envían varios eventos; devuelve el último.
+    """
+    from app.models import Product
+
+    product_ids = list(product_ids)
+    event = None
+    for start in range(0, len(product_ids), STOCK_EVENT_SIZE):
+        chunk = product_ids[start:start + STOCK_EVENT_SIZE]
+        if change == 'deleted':
+            products = [{'id': product_id} for product_id in chunk]
+        else:
+            try:
+                products = [{'id': product_id, 'name': name, 'stock': stock, 'status': status}
+                            for product_id, name, stock, status in db.session.query(
+                                Product.idProduct, Product.nameProduct, Product.stock, Product.status
+                            ).filter(Product.idProduct.in_(chunk))]
+            except Exception as e:
+                # La escritura ya se confirmó: sin evento el cliente se corrige en el próximo resync
+                print(f"⚠️ No se pudo publicar el cambio de stock: {e}")
+                return event
+        event = event_bus.publish(STOCK, {'change': change, 'products': products})
+    return event
+
+
+def publish_user(user_id, name=None, change='created'):
+    return event_bus.publish(USER, {'change': change, 'id': user_id, 'name': name})
@@ -0,0 +1,134 @@
+"""Exportación en streaming (CSV / NDJSON) de pedidos, productos y usuarios.
+
+Contraparte de app/importer.py. Cada exportación es un SELECT de columnas
+(sin objetos ORM, así que no crece el identity map) ejecutado con
+``yield_per``: el driver usa un cursor del lado del servidor y las filas
+llegan por particiones de ``chunk_size``. Cada partición se codifica y se
+entrega en cuanto llega, así que la memoria no depende del total de filas y
+el primer byte sale antes de terminar la consulta.
+
+Las columnas de productos usan los nombres que acepta la importación, de
+modo que un CSV exportado se puede volver a importar.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import db
+
+FORMATS = ('csv', 'ndjson')
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _orders():
+    from app.models import Order, OrderDetail, User
+
+    items = db.select(db.func.count(OrderDetail.idOrderDetail)) \
+        .where(OrderDetail.idOrder == Order.idOrder).scalar_subquery()
+    units = db.select(db.func.coalesce(db.func.sum(OrderDetail.quantity), 0)) \
+        .where(OrderDetail.idOrder == Order.idOrder).scalar_subquery()
+    return db.select(
+        Order.idOrder.label('id'),
+        Order.idUser.label('user_id'),
+        User.nameUser.label('customer'),
+        User.emailUser.label('email'),
+        Order.orderDate.label('date'),
+        Order.status.label('status'),
+        Order.totalAmount.label('total'),
+        items.label('items'),
+        units.label('units')
+    ).outerjoin(User, User.idUser == Order.idUser).order_by(Order.idOrder)
+
+
+def _products():
+    from app.models import Product
+
+    return db.select(
+        Product.idProduct.label('id'),
+        Product.nameProduct.label('name'),
+        Product.category.label('category'),
+        Product.price.label('price'),
+        Product.stock.label('stock'),
+        Product.status.label('status'),
+        Product.description.label('description'),
+        Product.image.label('image'),
+        Product.details.label('details'),
+        Product.size.label('size'),
+        Product.color.label('color'),
+        Product.created_at.label('created_at'),
+        Product.updated_at.label('updated_at')
+    ).order_by(Product.idProduct)
+
+
+def _users():
+    from app.models import User
+
+    # Sin contraseñas ni tokens
+    return db.select(
+        User.idUser.label('id'),
+        User.nameUser.label('name'),
+        User.emailUser.label('email'),
+        db.case((User.is_admin == True, 'admin'), else_='user').label('role'),  # noqa: E712
+        User.created_at.label('created_at')
+    ).order_by(User.idUser)
+
+
+EXPORTS = {
+    'orders': _orders,
+    'products': _products,
+    'users': _users,
+}
+
+
+def _plain(value):
+    """Valor serializable: Decimal como texto exacto y fechas en ISO 8601."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def validate_export(name, fmt):
+    """Mensaje de error si la exportación o el formato no existen; None si son válidos."""
+    if name not in EXPORTS:
+        return f"Exportación no soportada: {name} (use {', '.join(EXPORTS)})"
+    if fmt not in FORMATS:
+        return f"Formato no soportado: {fmt} (use {' o '.join(FORMATS)})"
+    return None
+
+
+def export_chunks(name, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Genera el archivo de la exportación `name` como trozos de texto, uno por partición.
+
+    Necesita el contexto de la aplicación mientras se consume (en una
+    respuesta, con ``stream_with_context``).
+    """
+    error = validate_export(name, fmt)
+    if error:
+        raise ValueError(error)
+    result = db.session.execute(EXPORTS[name]().execution_options(yield_per=chunk_size))
+    try:
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            if writer:
+                writer.writerows([_plain(value) for value in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+    finally:
+        # Cierra el cursor del servidor aunque el cliente corte la descarga
+        result.close()
@@ -0,0 +1,230 @@
+"""Filtros facetados del catálogo con conteos precalculados.
+
+``product_facet`` guarda cuántos productos activos hay por cada combinación
+(categoría, talla, color, franja de precio, con/sin stock). Los triggers
+sobre ``product`` la mantienen al día fila a fila, así que los conteos de
+cualquier filtro salen de esta tabla pequeña y no de un GROUP BY sobre todo
+el catálogo.
+
+El filtro de precio es exacto: las franjas cubiertas por completo se leen
+del agregado y solo las (como mucho dos) franjas de los extremos se cuentan
+sobre ``product`` usando el rango de precio.
+"""
+import math
+
+from sqlalchemy import case, false, func, or_, text
+
+from app import db
+
+PRICE_BUCKET = 50
+FACET_DIMENSIONS = ('category', 'size', 'color')
+_KEY_COLUMNS = 'category, size, color, price_bucket, in_stock'
+
+
+def _key_values(row, dialect):
+    """Expresiones SQL de la clave del agregado para NEW/OLD/tabla."""
+    bucket = (f'FLOOR({row}.price / {PRICE_BUCKET})' if dialect == 'mysql'
+              else f'CAST({row}.price / {PRICE_BUCKET} AS INTEGER)')
+    return [f"COALESCE({row}.category, '')", f"COALESCE({row}.size, '')",
+            f"COALESCE({row}.color, '')", bucket, f'({row}.stock > 0)']
+
+
+def _increment(row, dialect):
+    values = ', '.join(_key_values(row, dialect))
+    if dialect == 'mysql':
+        return (f"INSERT INTO product_facet ({_KEY_COLUMNS}, product_count) "
+                f"SELECT {values}, 1 FROM DUAL WHERE {row}.status = 'Activo' "
+                f"ON DUPLICATE KEY UPDATE product_count = product_count + 1")
+    return (f"INSERT INTO product_facet ({_KEY_COLUMNS}, product_count) "
+            f"SELECT {values}, 1 WHERE {row}.status = 'Activo' "
+            f"ON CONFLICT ({_KEY_COLUMNS}) DO UPDATE SET product_count = product_count + 1")
+
+
+def _decrement(row, dialect):
+    match = ' AND '.join(f'{column} = {value}' for column, value in
+                         zip(_KEY_COLUMNS.split(', '), _key_values(row, dialect)))
+    return (f"UPDATE product_facet SET product_count = product_count - 1 "
+            f"WHERE {match} AND {row}.status = 'Activo'")
+
+
+def _trigger_ddl(dialect):
+    """(nombre, DDL) de los triggers que mantienen product_facet."""
+    new, old = ('NEW', 'OLD') if dialect == 'mysql' else ('new', 'old')
+    bodies = {
+        'product_facet_ai': ('AFTER INSERT ON product', [_increment(new, dialect)]),
+        'product_facet_ad': ('AFTER DELETE ON product', [_decrement(old, dialect)]),
+        'product_facet_au': ('AFTER UPDATE ON product' if dialect == 'mysql'
+                             else 'AFTER UPDATE OF status, category, size, color, price, stock ON product',
+                             [_decrement(old, dialect), _increment(new, dialect)]),
+    }
+    for name, (event, statements) in bodies.items():
+        body = ';\n'.join(statements)
+        if dialect == 'mysql':
+            yield name, f'CREATE TRIGGER {name} {event} FOR EACH ROW BEGIN\n{body};\nEND'
+        else:
+            yield name, f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{body};\nEND'
+
+
+def rebuild_facets(conn=None):
+    """Recalcula product_facet completo a partir de product."""
+    def run(connection):
+        dialect = connection.dialect.name
+        keys = ', '.join(_key_values('product', dialect))
+        connection.execute(text('DELETE FROM product_facet'))
+        connection.execute(text(
+            f"INSERT INTO product_facet ({_KEY_COLUMNS}, product_count) "
+            f"SELECT {keys}, COUNT(*) FROM product WHERE status = 'Activo' GROUP BY {keys}"
+        ))
+
+    if conn is not None:
+        return run(conn)
+    with db.engine.begin() as connection:
+        run(connection)
+
+
+def trigger_exists(conn, name):
+    """True si el trigger `name` ya existe (SQLite o MySQL)."""
+    if conn.dialect.name == 'sqlite':
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"
+    else:
+        sql = ("SELECT 1 FROM information_schema.triggers "
+               "WHERE trigger_schema = DATABASE() AND trigger_name = :name")
+    return conn.execute(text(sql), {'name': name}).first() is not None
+
+
+def init_facet_index():
+    """Crea los triggers del agregado (y lo llena) si aún no existen."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'mysql'):
+        return
+    with db.engine.begin() as conn:
+        if trigger_exists(conn, 'product_facet_ai'):
+            return
+        for _, ddl in _trigger_ddl(dialect):
+            conn.execute(text(ddl))
+        rebuild_facets(conn)
+
+
+def price_span(price_min, price_max):
+    """Franjas de precio cubiertas por completo por [price_min, price_max].
+
+    Devuelve (primera, última) o None si ninguna franja cabe entera.
+    """
+    first = 0 if price_min is None else math.ceil(price_min / PRICE_BUCKET)
+    if price_max is None:
+        return first, None
+    last = int(price_max // PRICE_BUCKET) - 1
+    return (first, last) if last >= first else None
+
+
+class FacetFilters:
+    """Filtros seleccionados: listas por dimensión, stock y rango de precio."""
+
+    def __init__(self, category=None, size=None, color=None,
+                 in_stock=None, price_min=None, price_max=None):
+        self.values = {'category': category or [], 'size': size or [], 'color': color or []}
+        self.in_stock = in_stock
+        self.price_min = price_min
+        self.price_max = price_max
+
+    @property
+    def has_price(self):
+        return self.price_min is not None or self.price_max is not None
+
+    def product_conditions(self, exclude=None):
+        """Condiciones exactas sobre product (para los items y los bordes de precio)."""
+        from app.models import Product
+        conditions = [Product.status == 'Activo']
+        for dimension, values in self.values.items():
+            if values and dimension != exclude:
+                conditions.append(func.coalesce(getattr(Product, dimension), '').in_(values))
+        if self.in_stock is not None and exclude != 'in_stock':
+            conditions.append(Product.stock > 0 if self.in_stock else Product.stock <= 0)
+        if exclude != 'price':
+            if self.price_min is not None:
+                conditions.append(Product.price >= self.price_min)
+            if self.price_max is not None:
+                conditions.append(Product.price <= self.price_max)
+        return conditions
+
+    def facet_conditions(self, exclude=None):
+        """Condiciones sobre product_facet; el precio solo cubre franjas enteras."""
+        from app.models import ProductFacet
+        conditions = [ProductFacet.product_count > 0]
+        for dimension, values in self.values.items():
+            if values and dimension != exclude:
+                conditions.append(getattr(ProductFacet, dimension).in_(values))
+        if self.in_stock is not None and exclude != 'in_stock':
+            conditions.append(ProductFacet.in_stock == self.in_stock)
+        if self.has_price and exclude != 'price':
+            span = price_span(self.price_min, self.price_max)
+            if span is None:
+                conditions.append(false())
+            else:
+                conditions.append(ProductFacet.price_bucket >= span[0])
+                if span[1] is not None:
+                    conditions.append(ProductFacet.price_bucket <= span[1])
+        return conditions
+
+    def edge_conditions(self):
+        """Productos del rango de precio que caen fuera de las franjas enteras."""
+        from app.models import Product
+        span = price_span(self.price_min, self.price_max)
+        if span is None:
+            return []
+        outside = [Product.price < span[0] * PRICE_BUCKET]
+        if span[1] is not None:
+            outside.append(Product.price >= (span[1] + 1) * PRICE_BUCKET)
+        return [or_(*outside)]
+
+
+def _grouped_counts(filters, facet_column, product_column, exclude):
+    """{valor: conteo} para una faceta, con el resto de filtros aplicados."""
+    from app.models import ProductFacet
+    counts = {}
+    rows = db.session.query(facet_column, func.sum(ProductFacet.product_count)) \
+        .filter(*filters.facet_conditions(exclude=exclude)) \
+        .group_by(facet_column).all()
+    for value, count in rows:
+        counts[value] = counts.get(value, 0) + int(count)
+
+    # Bordes del rango de precio: se cuentan exactos sobre product
+    if filters.has_price and exclude != 'price':
+        edge = db.session.query(product_column, func.count()) \
+            .filter(*filters.product_conditions(exclude=exclude), *filters.edge_conditions()) \
+            .group_by(product_column).all()
+        for value, count in edge:
+            counts[value] = counts.get(value, 0) + int(count)
+    return counts
+
+
+def facet_counts(filters):
+    """Conteos por faceta para el conjunto de resultados actual.
+
+    Cada faceta ignora su propio filtro (selección múltiple dentro de la
+    faceta) y aplica el de las demás.
+    """
+    from app.models import Product, ProductFacet
+
+    facets = {}
+    for dimension in FACET_DIMENSIONS:
+        counts = _grouped_counts(filters, getattr(ProductFacet, dimension),
+                                 func.coalesce(getattr(Product, dimension), ''), dimension)
+        facets[dimension] = {value: count for value, count in sorted(counts.items()) if value and count}
+
+    in_stock = case((Product.stock > 0, True), else_=False)
+    stock_counts = _grouped_counts(filters, ProductFacet.in_stock, in_stock, 'in_stock')
+    facets['in_stock'] = {
+        'true': sum(c for v, c in stock_counts.items() if v),
+        'false': sum(c for v, c in stock_counts.items() if not v),
+    }
+
+    price_counts = _grouped_counts(filters, ProductFacet.price_bucket, None, 'price')
+    facets['price'] = {
+        f'{int(bucket) * PRICE_BUCKET}-{(int(bucket) + 1) * PRICE_BUCKET}': count
+        for bucket, count in sorted(price_counts.items()) if count
+    }
+
+    # Total del conjunto actual: todos los filtros aplicados
+    total = sum(_grouped_counts(filters, ProductFacet.in_stock, in_stock, None).values())
+    return facets, total
@@ -0,0 +1,160 @@
+"""Importación masiva del catálogo (CSV / NDJSON).
+
+El archivo se lee de forma incremental, cada fila se valida con las mismas
+reglas que ``POST /api/products`` y las filas válidas se insertan por lotes
+con ``executemany``: un INSERT y un commit por lote, así que el número de
+transacciones queda acotado por ``len(filas) / batch_size``. Un lote que
+falla en la base de datos se reintenta fila a fila con un SAVEPOINT por
+fila dentro de la misma transacción, así que se reportan solo las filas
+culpables sin abortar la carga y el lote sigue costando un solo commit.
+"""
+import codecs
+import csv
+import json
+
+from app import db
+
+REQUIRED_FIELDS = ['name', 'category', 'price', 'stock']
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def validate_product(data):
+    """Valida un producto entrante; devuelve (valores para Product, None) o (None, error)."""
+    # Stock 0 es válido: solo falta lo que no viene o viene vacío
+    missing_fields = [field for field in REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing_fields:
+        return None, f'Campos requeridos faltantes: {", ".join(missing_fields)}'
+
+    try:
+        price = float(data['price'])
+        stock = int(data['stock'])
+    except (ValueError, TypeError):
+        return None, 'Precio y stock deben ser valores numéricos'
+
+    values = {
+        'nameProduct': data['name'],
+        'category': data['category'],
+        'price': price,
+        'stock': stock,
+        'description': data.get('description', ''),
+        'image': data.get('image', ''),
+        # Estado explícito si es válido; si no, según el stock
+        'status': data['status'] if data.get('status') in ('Activo', 'Inactivo')
+        else ('Activo' if stock > 0 else 'Inactivo')
+    }
+    for field in ('details', 'size', 'color'):
+        if field in data:
+            values[field] = data[field]
+    return values, None
+
+
+def iter_rows(stream, fmt):
+    """Recorre un flujo binario fila a fila: (número de línea, dict o None, error)."""
+    text = codecs.getreader('utf-8-sig')(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Celdas vacías equivalen a campos ausentes
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, '')}, None
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'JSON inválido: {e}'
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None, 'Cada línea debe ser un objeto JSON'
+                continue
+            yield line_number, data, None
+    else:
+        raise ValueError(f'Formato no soportado: {fmt}')
+
+
+class ImportResult:
+    """Resumen de una importación."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.product_ids = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'batches': self.batches,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _flush_batch(batch, result):
+    from app.models import Product
+
+    table = Product.__table__
+    inserted, errors = 0, []
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert(), [values for _, values in batch])
+        inserted = len(batch)
+    except Exception:
+        # Aislar las filas que rompen el lote: un SAVEPOINT por fila, dentro de la misma transacción
+        for line, values in batch:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), [values])
+                inserted += 1
+            except Exception as e:
+                errors.append((line, str(getattr(e, 'orig', e))))
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        inserted, errors = 0, [(line, str(getattr(e, 'orig', e))) for line, _ in batch]
+    result.inserted += inserted
+    for line, message in errors:
+        result.add_error(line, message)
+    result.batches += 1
+
+
+def import_products(stream, fmt='csv', batch_size=DEFAULT_BATCH_SIZE):
+    """Importa productos desde `stream` y devuelve un ImportResult.
+
+    ``result.product_ids`` trae los ids insertados para publicar el evento de stock.
+    """
+    from app.models import Product
+
+    # Los ids son autoincrementales: lo insertado queda por encima del máximo previo
+    last_id = db.session.query(db.func.max(Product.idProduct)).scalar() or 0
+    result = ImportResult()
+    batch = []
+    for line, data, error in iter_rows(stream, fmt):
+        if error is None:
+            values, error = validate_product(data)
+        if error is not None:
+            result.add_error(line, error)
+            continue
+        # executemany necesita las mismas columnas en todas las filas
+        for field in ('details', 'size', 'color'):
+            values.setdefault(field, None)
+        batch.append((line, values))
+        if len(batch) >= batch_size:
+            _flush_batch(batch, result)
+            batch = []
+    if batch:
+        _flush_batch(batch, result)
+    if result.inserted:
+        result.product_ids = [product_id for (product_id,) in db.session.query(Product.idProduct)
+                              .filter(Product.idProduct > last_id).order_by(Product.idProduct)]
+    return result
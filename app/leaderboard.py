@@ -0,0 +1,199 @@
+"""Ranking de productos más vendidos: histórico y ventanas de 7 y 30 días.
+
+- Histórico: ``product_sales`` (ver app/rollups.py).
+- Ventanas móviles: ``product_trending`` guarda por (periodo, producto) las
+  unidades e ingresos de los últimos N días. ``record_sale()`` suma cada
+  pedido al crearlo, igual que al resto de los agregados.
+
+Los días que salen de una ventana se restan de forma perezosa: la fila
+``leaderboard_day`` de ``counter`` guarda el día (ordinal) hasta el que
+están al día las ventanas y ``roll_windows()`` resta lo vendido en los días
+vencidos, leyéndolo de ``product_sales_daily``. El avance del marcador se
+reclama con un UPDATE condicional, así que dos procesos nunca restan el
+mismo día dos veces.
+
+``roll_windows()`` escribe, así que solo se llama desde rutas de escritura
+(después del commit del checkout) o desde ``flask roll-leaderboard``
+(programable una vez al día). ``top_products()`` es solo lectura: el top N
+sale del índice (periodo, unidades) leyendo N filas; si el marcador todavía
+no llegó a hoy, la ventana se suma directamente de ``product_sales_daily``
+(a lo sumo 30 días) en lugar de leer filas con días vencidos.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+MARKER = 'leaderboard_day'
+WINDOWS = {'7d': 7, '30d': 30}
+PERIODS = ('all',) + tuple(WINDOWS)
+
+
+def _window_start(today, days):
+    return today - timedelta(days=days - 1)
+
+
+def record_windows(day, per_product, today=None):
+    """Suma las ventas de `day` ({idProduct: (unidades, ingresos)}) a las ventanas que lo contienen."""
+    from app.models import ProductTrending
+    from app.counters import upsert_increment
+
+    today = today or datetime.utcnow().date()
+    for period, days in WINDOWS.items():
+        if not _window_start(today, days) <= day <= today:
+            continue
+        upsert_increment(ProductTrending.__table__, [
+            {'period': period, 'idProduct': product_id, 'units': units, 'revenue': revenue}
+            for product_id, (units, revenue) in sorted(per_product.items())
+        ], ['period', 'idProduct'], ['units', 'revenue'])
+
+
+def _rebuild_window(period, days, today):
+    from app.models import ProductSalesDaily, ProductTrending
+
+    trending = ProductTrending.__table__
+    db.session.execute(trending.delete().where(trending.c.period == period))
+    db.session.execute(trending.insert().from_select(
+        ['period', 'idProduct', 'units', 'revenue'],
+        db.select(
+            db.literal(period), ProductSalesDaily.idProduct,
+            db.func.sum(ProductSalesDaily.units), db.func.sum(ProductSalesDaily.revenue)
+        ).where(
+            ProductSalesDaily.day >= _window_start(today, days), ProductSalesDaily.day <= today
+        ).group_by(ProductSalesDaily.idProduct)
+    ))
+
+
+def _expire_days(period, first, last):
+    """Resta de la ventana `period` lo vendido entre `first` y `last` (inclusive)."""
+    from app.models import ProductSalesDaily, ProductTrending
+
+    trending = ProductTrending.__table__
+    daily = ProductSalesDaily.__table__
+    in_range = [daily.c.idProduct == trending.c.idProduct, daily.c.day >= first, daily.c.day <= last]
+    expired_units = db.select(db.func.coalesce(db.func.sum(daily.c.units), 0)).where(*in_range).scalar_subquery()
+    expired_revenue = db.select(db.func.coalesce(db.func.sum(daily.c.revenue), 0)).where(*in_range).scalar_subquery()
+    db.session.execute(trending.update().where(
+        trending.c.period == period,
+        trending.c.idProduct.in_(db.select(daily.c.idProduct).where(daily.c.day >= first, daily.c.day <= last))
+    ).values(units=trending.c.units - expired_units, revenue=trending.c.revenue - expired_revenue))
+    db.session.execute(trending.delete().where(trending.c.period == period, trending.c.units <= 0))
+
+
+def _set_marker(today):
+    from app.models import Counter
+
+    marker = db.session.get(Counter, MARKER)
+    if marker is None:
+        db.session.add(Counter(name=MARKER, value=today.toordinal()))
+    else:
+        marker.value = today.toordinal()
+
+
+def rebuild_windows(today=None):
+    """Recalcula las ventanas desde product_sales_daily. No hace commit."""
+    today = today or datetime.utcnow().date()
+    for period, days in WINDOWS.items():
+        _rebuild_window(period, days, today)
+    _set_marker(today)
+
+
+def roll_windows(today=None):
+    """Saca de las ventanas los días vencidos y hace commit; devuelve True si avanzó.
+
+    Hace commit de la sesión: llamar solo sin cambios pendientes (después del
+    commit de una escritura o desde la CLI), nunca desde una lectura.
+    """
+    from app.models import Counter
+
+    today = today or datetime.utcnow().date()
+    current = db.session.execute(
+        db.select(Counter.value).where(Counter.name == MARKER)
+    ).scalar_one_or_none()
+    if current is not None and current >= today.toordinal():
+        return False
+
+    try:
+        if current is None:
+            rebuild_windows(today)
+        else:
+            counter = Counter.__table__
+            claimed = db.session.execute(counter.update().where(
+                counter.c.name == MARKER, counter.c.value == current
+            ).values(value=today.toordinal())).rowcount
+            if not claimed:
+                # Otro proceso ya avanzó las ventanas
+                db.session.rollback()
+                return False
+            last = date.fromordinal(current)
+            for period, days in WINDOWS.items():
+                if (today - last).days >= days:
+                    _rebuild_window(period, days, today)
+                else:
+                    _expire_days(period, _window_start(last, days), today - timedelta(days=days))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Dos procesos crearon el marcador a la vez: el otro ya reconstruyó
+        db.session.rollback()
+        return False
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _window_source(period, today):
+    """Tabla de la que leer la ventana `period`: product_trending si está al día."""
+    from app.models import Counter, ProductSalesDaily, ProductTrending
+
+    marker = db.session.execute(
+        db.select(Counter.value).where(Counter.name == MARKER)
+    ).scalar_one_or_none()
+    if marker is not None and marker >= today.toordinal():
+        trending = ProductTrending.__table__
+        return trending, [trending.c.period == period]
+    # Ventanas sin avanzar: se suman los días vigentes sin escribir nada
+    daily = ProductSalesDaily.__table__
+    return db.select(
+        daily.c.idProduct, db.func.sum(daily.c.units).label('units'), db.func.sum(daily.c.revenue).label('revenue')
+    ).where(
+        daily.c.day >= _window_start(today, WINDOWS[period]), daily.c.day <= today
+    ).group_by(daily.c.idProduct).subquery(), []
+
+
+def top_products_query(period='all', limit=10, active_only=False, today=None):
+    """La consulta de top_products (sin ejecutar)."""
+    from app.models import Product, ProductSales
+
+    if period not in PERIODS:
+        raise ValueError(f"Periodo no soportado: {period} (use {', '.join(PERIODS)})")
+    if period == 'all':
+        source, conditions = ProductSales.__table__, []
+    else:
+        source, conditions = _window_source(period, today or datetime.utcnow().date())
+    if active_only:
+        conditions.append(Product.status == 'Activo')
+
+    return db.session.query(
+        Product.idProduct, Product.nameProduct, Product.category, Product.price,
+        Product.image, Product.stock, Product.status, source.c.units, source.c.revenue
+    ).select_from(source).join(
+        Product, Product.idProduct == source.c.idProduct
+    ).filter(*conditions).order_by(source.c.units.desc(), source.c.idProduct.desc()).limit(limit)
+
+
+def top_products(period='all', limit=10, active_only=False, today=None):
+    """Los `limit` productos con más unidades vendidas en `period` ('all', '7d' o '30d'). Solo lectura."""
+    rows = top_products_query(period, limit, active_only, today).all()
+    return [{
+        'id': row.idProduct,
+        'name': row.nameProduct,
+        'category': row.category,
+        'price': float(row.price),
+        'image': row.image,
+        'stock': row.stock,
+        'status': row.status,
+        'units': int(row.units),
+        'revenue': float(row.revenue)
+    } for row in rows]
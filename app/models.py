@@ -4,6 +4,14 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 class User(db.Model, UserMixin):
+    __table_args__ = (
+        db.Index('ix_user_created_at', 'created_at'),
+        db.Index('ix_user_is_admin_created_at', 'is_admin', 'created_at'),
+        # Búsqueda por prefijo sin distinguir mayúsculas: en SQLite LIKE solo usa
+        # índices NOCASE (en MySQL bastan los índices únicos con collation *_ci)
+        db.Index('ix_user_name_nocase', db.text('"nameUser" COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+        db.Index('ix_user_email_nocase', db.text('"emailUser" COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+    )
     idUser = db.Column(db.Integer, primary_key=True)
     nameUser = db.Column(db.String(50), unique=True, nullable=False)
     emailUser = db.Column(db.String(120), unique=True, nullable=False)
@@ -15,6 +23,8 @@ class User(db.Model, UserMixin):
     verification_code = db.Column(db.String(6), nullable=True)
     verification_code_expiration = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Líneas en el carrito, mantenido por triggers sobre cart_item (ver app/counters.py)
+    cart_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relación con el carrito
     cart_items = db.relationship('CartItem', backref='user', lazy=True, cascade="all, delete-orphan")
@@ -39,7 +49,8 @@ class User(db.Model, UserMixin):
         return CartItem.query.filter_by(idUser=self.idUser).all()
     
     def get_cart_count(self):
-        return CartItem.query.filter_by(idUser=self.idUser).count()
+        # Lectura por clave primaria del contador (incluye cambios no confirmados de la transacción)
+        return db.session.query(User.cart_count).filter(User.idUser == self.idUser).scalar() or 0
 
     def __repr__(self):
         return f'<User {self.nameUser}>'
@@ -47,6 +58,10 @@ class User(db.Model, UserMixin):
 # Modelo para items del carrito
 class CartItem(db.Model):
     __tablename__ = 'cart_item'
+    __table_args__ = (
+        # Una línea por usuario y producto (también sirve de índice para el carrito)
+        db.Index('uq_cart_item_user_product', 'idUser', 'idProduct', unique=True),
+    )
     idCartItem = db.Column(db.Integer, primary_key=True)
     idUser = db.Column(db.Integer, db.ForeignKey('user.idUser'), nullable=False)
     idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct'), nullable=False)
@@ -56,9 +71,30 @@ class CartItem(db.Model):
     # Relación con producto
     product = db.relationship('Product', backref=db.backref('cart_items', lazy=True))
 
+# Reserva temporal de stock para una línea del carrito (ver app/reservations.py)
+class StockHold(db.Model):
+    __tablename__ = 'stock_hold'
+    __table_args__ = (
+        db.Index('uq_stock_hold_user_product', 'idUser', 'idProduct', unique=True),
+        # Cubre SUM(quantity) de las reservas vigentes por producto
+        db.Index('ix_stock_hold_product_expires', 'idProduct', 'expires_at', 'quantity'),
+        db.Index('ix_stock_hold_expires', 'expires_at'),
+    )
+    idHold = db.Column(db.Integer, primary_key=True)
+    idUser = db.Column(db.Integer, db.ForeignKey('user.idUser', ondelete='CASCADE'), nullable=False)
+    idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
 # NUEVAS TABLAS PARA EL DASHBOARD
 class Product(db.Model):
     __tablename__ = 'product'
+    __table_args__ = (
+        # Listados activos paginados por cursor (status + idProduct)
+        db.Index('ix_product_status_id', 'status', 'idProduct'),
+        # Listados por categoría
+        db.Index('ix_product_category_status_id', 'category', 'status', 'idProduct'),
+    )
     idProduct = db.Column(db.Integer, primary_key=True)
     nameProduct = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
@@ -67,7 +103,31 @@ class Product(db.Model):
     category = db.Column(db.String(100))
     image = db.Column(db.String(255))
     status = db.Column(db.Enum('Activo', 'Inactivo'), default='Activo')
+    details = db.Column(db.Text)
+    size = db.Column(db.String(50))
+    color = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Control de concurrencia optimista: cada UPDATE del ORM exige la versión leída
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': version}
+
+class Counter(db.Model):
+    """Totales globales mantenidos por triggers (ver app/counters.py)."""
+    __tablename__ = 'counter'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductFacet(db.Model):
+    """Conteo de productos activos por combinación de facetas (mantenido por triggers)."""
+    __tablename__ = 'product_facet'
+    category = db.Column(db.String(100), primary_key=True, default='')
+    size = db.Column(db.String(50), primary_key=True, default='')
+    color = db.Column(db.String(50), primary_key=True, default='')
+    price_bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    in_stock = db.Column(db.Boolean, primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
 
 class Category(db.Model):
     __tablename__ = 'category'
@@ -78,6 +138,14 @@ class Category(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_orderDate', 'orderDate'),
+        db.Index('ix_orders_idUser', 'idUser'),
+        # Grilla de pedidos: filtro por estado + orden por fecha o monto
+        db.Index('ix_orders_status_orderDate', 'status', 'orderDate'),
+        db.Index('ix_orders_totalAmount', 'totalAmount'),
+        db.Index('ix_orders_status_totalAmount', 'status', 'totalAmount'),
+    )
     idOrder = db.Column(db.Integer, primary_key=True)
     idUser = db.Column(db.Integer, db.ForeignKey('user.idUser'))
     totalAmount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -87,10 +155,67 @@ class Order(db.Model):
 
 class OrderDetail(db.Model):
     __tablename__ = 'order_detail'
+    __table_args__ = (
+        db.Index('ix_order_detail_idOrder', 'idOrder'),
+        db.Index('ix_order_detail_idProduct', 'idProduct'),
+    )
     idOrderDetail = db.Column(db.Integer, primary_key=True)
     idOrder = db.Column(db.Integer, db.ForeignKey('orders.idOrder'))
     idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct'))
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     order = db.relationship('Order', backref=db.backref('details', lazy=True))
-    product = db.relationship('Product', backref=db.backref('order_details', lazy=True))
\ No newline at end of file
+    product = db.relationship('Product', backref=db.backref('order_details', lazy=True))
+
+class ProductRecommendation(db.Model):
+    """Vecinos "comprados juntos" por producto (ver app/recommendations.py)."""
+    __tablename__ = 'product_recommendation'
+    idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), primary_key=True)
+    idRelated = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SalesDaily(db.Model):
+    """Ventas por día UTC, mantenidas al crear pedidos (ver app/rollups.py)."""
+    __tablename__ = 'sales_daily'
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+class SalesCategoryDaily(db.Model):
+    """Ventas por día UTC y categoría del producto al momento de la venta."""
+    __tablename__ = 'sales_category_daily'
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductSales(db.Model):
+    """Unidades e ingresos acumulados por producto (ver app/rollups.py)."""
+    __tablename__ = 'product_sales'
+    __table_args__ = (
+        db.Index('ix_product_sales_units', 'units'),
+    )
+    idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+class ProductSalesDaily(db.Model):
+    """Unidades e ingresos por día UTC y producto (base de las ventanas móviles)."""
+    __tablename__ = 'product_sales_daily'
+    day = db.Column(db.Date, primary_key=True)
+    idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+class ProductTrending(db.Model):
+    """Ventas por producto en las ventanas móviles de 7 y 30 días (ver app/leaderboard.py)."""
+    __tablename__ = 'product_trending'
+    __table_args__ = (
+        db.Index('ix_product_trending_period_units', 'period', 'units', 'idProduct'),
+    )
+    period = db.Column(db.String(8), primary_key=True)
+    idProduct = db.Column(db.Integer, db.ForeignKey('product.idProduct', ondelete='CASCADE'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
@@ -0,0 +1,99 @@
+"""Paginación por cursor (keyset / seek) para los listados del catálogo y los pedidos.
+
+En lugar de OFFSET, que obliga a la base de datos a recorrer y descartar
+todas las filas anteriores, se filtra por la clave ordenada
+(``idProduct > after``), de modo que cualquier página cuesta lo mismo
+que la primera.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from app import db
+
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 100
+
+
+def parse_limit(value, default=DEFAULT_LIMIT):
+    """Convierte ?limit= en un entero acotado entre 1 y MAX_LIMIT."""
+    try:
+        limit = int(value) if value is not None else default
+    except (ValueError, TypeError):
+        limit = default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def keyset_query(query, key_column, after=None, before=None, limit=DEFAULT_LIMIT):
+    """La consulta que ejecuta keyset_page (sirve también para revisar su plan)."""
+    if before is not None:
+        return query.filter(key_column < before).order_by(key_column.desc()).limit(limit + 1)
+    if after is not None:
+        query = query.filter(key_column > after)
+    return query.order_by(key_column.asc()).limit(limit + 1)
+
+
+def keyset_page(query, key_column, after=None, before=None, limit=DEFAULT_LIMIT):
+    """Devuelve (filas, has_next, has_prev) usando búsqueda por clave.
+
+    - ``after``: filas con clave mayor al cursor (página siguiente).
+    - ``before``: filas con clave menor al cursor (página anterior).
+
+    Se pide una fila de más para saber si existe otra página sin COUNT(*).
+    """
+    rows = keyset_query(query, key_column, after=after, before=before, limit=limit).all()
+    if before is not None:
+        has_prev = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        return rows, True, has_prev
+
+    has_next = len(rows) > limit
+    return rows[:limit], has_next, after is not None
+
+
+def encode_cursor(values):
+    """Cursor opaco (base64 de JSON) con los valores de la última fila."""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else
+                      str(value) if isinstance(value, Decimal) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parsers):
+    """Inverso de encode_cursor; `parsers` convierte cada valor. ValueError si es inválido."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Cursor inválido: {e}')
+    if not isinstance(values, list) or len(values) != len(parsers):
+        raise ValueError('Cursor inválido')
+    try:
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError, ArithmeticError) as e:
+        raise ValueError(f'Cursor inválido: {e}')
+
+
+def seek_query(query, columns, after=None, limit=DEFAULT_LIMIT, descending=False):
+    """La consulta que ejecuta seek_page (sirve también para revisar su plan).
+
+    ``after`` son los valores de `columns` de la última fila vista. La
+    condición se expande a ``a > x OR (a = x AND b > y)`` para que MySQL y
+    SQLite la resuelvan con un rango sobre el índice.
+    """
+    if after is not None:
+        seek = None
+        for position in range(len(columns) - 1, -1, -1):
+            column, value = columns[position], after[position]
+            step = column < value if descending else column > value
+            seek = step if seek is None else db.or_(step, db.and_(column == value, seek))
+        query = query.filter(seek)
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    return query.limit(limit + 1)
+
+
+def seek_page(query, columns, after=None, limit=DEFAULT_LIMIT, descending=False):
+    """Paginación por clave compuesta (p. ej. fecha + id) en una dirección.
+
+    Devuelve (filas, has_next); ver seek_query.
+    """
+    rows = seek_query(query, columns, after=after, limit=limit, descending=descending).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,218 @@
+"""Revisión de planes de ejecución de las consultas frecuentes.
+
+Aquí se registran las consultas calientes de cada blueprint. Cada entrada
+arma su consulta con el mismo helper que usa la ruta (con argumentos de
+ejemplo), así que lo revisado no puede separarse de lo que se ejecuta. La
+revisión corre ``EXPLAIN QUERY PLAN`` (SQLite) o ``EXPLAIN`` (MySQL) sobre
+cada una y reporta las que recorren una tabla completa, para detectar
+índices perdidos antes de que lleguen a producción.
+
+Uso: ``flask check-query-plans`` (sale con código 1 si hay regresiones) o
+``check_query_plans()`` desde las pruebas.
+"""
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy.orm import Query
+
+from app import db
+
+HOT_QUERIES = {}
+# Recorridos completos aceptados por consulta (tablas chicas por construcción)
+ALLOWED_SCANS = {}
+
+
+def hot_query(blueprint, name, allow_scans=()):
+    """Registra una función que construye la consulta (select o Query) a revisar.
+
+    ``allow_scans`` son tablas que la consulta puede recorrer completas a
+    propósito; cada una debe justificarse donde se registra.
+    """
+    def decorator(builder):
+        HOT_QUERIES[f'{blueprint}.{name}'] = builder
+        ALLOWED_SCANS[f'{blueprint}.{name}'] = set(allow_scans)
+        return builder
+    return decorator
+
+
+def _explain(statement):
+    """Filas del plan de ejecución de `statement` (select o Query) en el backend actual."""
+    if isinstance(statement, Query):
+        statement = statement.statement
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    return db.session.execute(db.text(prefix + sql)).mappings().all()
+
+
+def full_scans(plan, dialect_name, tables=None):
+    """Tablas que el plan recorre completas (sin índice).
+
+    Solo cuentan las tablas de `tables` (por defecto, las de los modelos):
+    recorrer una subconsulta ya agrupada o una fila constante no es un
+    índice perdido.
+    """
+    tables = set(db.metadata.tables) if tables is None else set(tables)
+    scans = []
+    for row in plan:
+        if dialect_name == 'sqlite':
+            # "SCAN product" es un recorrido completo; "SCAN x USING INDEX" o "SEARCH" no
+            match = re.match(r'SCAN (?:TABLE )?(\w+)(.*)', row['detail'])
+            if match and 'USING' not in match.group(2):
+                scans.append(match.group(1))
+        elif row.get('type') == 'ALL':
+            scans.append(row['table'])
+    return [table for table in scans if table in tables]
+
+
+def check_query_plans():
+    """Devuelve {consulta: [tablas recorridas completas]} solo para las que fallan."""
+    dialect_name = db.engine.dialect.name
+    problems = {}
+    for name, builder in sorted(HOT_QUERIES.items()):
+        scans = [table for table in full_scans(_explain(builder()), dialect_name)
+                 if table not in ALLOWED_SCANS[name]]
+        if scans:
+            problems[name] = scans
+    return problems
+
+
+# --- Consultas calientes por blueprint -------------------------------------
+
+SAMPLE_DAY = date(2024, 1, 1)
+SAMPLE_TIME = datetime(2024, 1, 1)
+
+
+def _models():
+    from app import models
+    return models
+
+
+@hot_query('products', 'active_listing')
+def _active_listing():
+    from app.pagination import keyset_query
+    from app.routes.products import LIST_FIELDS, product_listing_query
+    Product = _models().Product
+    return keyset_query(product_listing_query(LIST_FIELDS), Product.idProduct, after=0)
+
+
+@hot_query('products', 'category_listing')
+def _category_listing():
+    from app.pagination import keyset_query
+    from app.routes.products import CATEGORY_FIELDS, product_listing_query
+    Product = _models().Product
+    return keyset_query(product_listing_query(CATEGORY_FIELDS, Product.category == 'Vestidos'),
+                        Product.idProduct, after=0)
+
+
+@hot_query('products', 'related_by_category')
+def _related_by_category():
+    from app.routes.products import same_category_query
+    return same_category_query(1, 'Vestidos')
+
+
+@hot_query('products', 'trending_top')
+def _trending_top():
+    from app.leaderboard import top_products_query
+    return top_products_query('7d', active_only=True, today=SAMPLE_DAY)
+
+
+@hot_query('cart', 'user_cart')
+def _user_cart():
+    from app.routes.cart import cart_state_query
+    return cart_state_query(1)
+
+
+@hot_query('cart', 'user_product_line')
+def _user_product_line():
+    from app.routes.cart import cart_line_query
+    return cart_line_query(1, 1)
+
+
+@hot_query('cart', 'cart_lines')
+def _cart_lines():
+    from app.routes.cart import cart_lines_query
+    return cart_lines_query(1)
+
+
+@hot_query('cart', 'available_stock')
+def _available_stock():
+    from app.reservations import available_stock_query
+    return available_stock_query([1, 2], now=SAMPLE_TIME)
+
+
+@hot_query('cart', 'expired_holds')
+def _expired_holds():
+    from app.reservations import expired_holds_query
+    return expired_holds_query(SAMPLE_TIME, 1000)
+
+
+# El total histórico de pedidos suma sales_daily completa: una fila por día
+@hot_query('dashboard', 'sales_totals', allow_scans=['sales_daily'])
+def _sales_totals():
+    from app.routes.dashboard import sales_totals_query
+    return sales_totals_query(SAMPLE_DAY)
+
+
+@hot_query('dashboard', 'recent_orders')
+def _recent_orders():
+    from app.routes.dashboard import recent_orders_query
+    return recent_orders_query()
+
+
+@hot_query('dashboard', 'popular_products')
+def _popular_products():
+    from app.leaderboard import top_products_query
+    return top_products_query('all', limit=3)
+
+
+@hot_query('dashboard', 'sales_report_days')
+def _sales_report_days():
+    from app.reports import daily_query
+    return daily_query(SAMPLE_DAY, date(2024, 12, 31))
+
+
+@hot_query('dashboard', 'sales_report_categories')
+def _sales_report_categories():
+    from app.reports import category_query
+    return category_query(SAMPLE_DAY, date(2024, 12, 31))
+
+
+def _orders_page(sort, after, statuses=(), descending=True):
+    from app.pagination import seek_query
+    from app.routes.dashboard import ORDER_SORT_KEYS, orders_grid_query
+    Order = _models().Order
+    columns = [getattr(Order, name) for name, _ in ORDER_SORT_KEYS[sort]]
+    return seek_query(orders_grid_query(statuses), columns, after=after, descending=descending)
+
+
+@hot_query('dashboard', 'orders_page_by_status')
+def _orders_page_by_status():
+    return _orders_page('date', [SAMPLE_TIME, 10], statuses=['Pendiente'])
+
+
+@hot_query('dashboard', 'orders_page_by_amount')
+def _orders_page_by_amount():
+    return _orders_page('amount', [Decimal('100'), 10], descending=False)
+
+
+def _users_page(after=None, **filters):
+    from app.pagination import seek_query
+    from app.user_directory import sort_columns, user_query
+    return seek_query(user_query(**filters), sort_columns(), after=after, descending=True)
+
+
+@hot_query('dashboard', 'users_page')
+def _users_page_after_cursor():
+    return _users_page(after=[SAMPLE_TIME, 10])
+
+
+@hot_query('dashboard', 'users_page_by_role')
+def _users_page_by_role():
+    return _users_page(role='admin')
+
+
+@hot_query('dashboard', 'users_prefix_search')
+def _users_prefix_search():
+    return _users_page(q='ana_')
@@ -0,0 +1,155 @@
+"""Índice "comprados juntos con frecuencia" a partir de OrderDetail.
+
+``product_recommendation`` guarda, por producto, sus TOP_K vecinos con el
+número de pedidos en los que aparecieron juntos. La página de producto lee
+sus recomendaciones con un único rango sobre la clave primaria.
+
+- ``rebuild_recommendations()``: reconstrucción completa y exacta. Carga
+  (idOrder, idProduct) por bloques en arreglos NumPy y cuenta los pares de
+  forma vectorizada, sin bucles por fila en Python.
+- ``record_order()``: actualización incremental al registrar un pedido
+  (algoritmo Space-Saving: si la lista está llena, el vecino con menos
+  puntos se reemplaza y hereda su puntuación + 1). Es aproximada; la
+  reconstrucción periódica la vuelve exacta.
+"""
+import numpy as np
+
+from app import db
+
+TOP_K = 8
+CHUNK_SIZE = 50000
+
+
+def cooccurrence_topk(order_ids, product_ids, k=TOP_K):
+    """Top-k de co-ocurrencias por producto.
+
+    Recibe dos arreglos paralelos (pedido, producto) y devuelve tres
+    arreglos (producto, relacionado, veces) ordenados por producto y
+    veces descendente.
+    """
+    orders = np.asarray(order_ids, dtype=np.int64)
+    products = np.asarray(product_ids, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    if orders.size == 0:
+        return empty, empty, empty
+
+    # Pares (pedido, producto) únicos y ordenados por pedido
+    order = np.lexsort((products, orders))
+    orders, products = orders[order], products[order]
+    keep = np.ones(orders.size, dtype=bool)
+    keep[1:] = (orders[1:] != orders[:-1]) | (products[1:] != products[:-1])
+    orders, products = orders[keep], products[keep]
+
+    catalog, dense = np.unique(products, return_inverse=True)
+    n = np.int64(catalog.size)
+
+    # Compara cada línea con la que está d posiciones más adelante; como las
+    # líneas están agrupadas por pedido, el bucle termina al superar la
+    # canasta más grande.
+    sources, targets = [], []
+    distance = 1
+    while distance < orders.size:
+        same = orders[distance:] == orders[:-distance]
+        if not same.any():
+            break
+        a = dense[:-distance][same]
+        b = dense[distance:][same]
+        sources += [a, b]
+        targets += [b, a]
+        distance += 1
+    if not sources:
+        return empty, empty, empty
+
+    keys, counts = np.unique(np.concatenate(sources) * n + np.concatenate(targets),
+                             return_counts=True)
+    src, dst = keys // n, keys % n
+
+    # Orden por producto, veces desc. y relacionado; rango dentro de cada producto
+    order = np.lexsort((dst, -counts, src))
+    src, dst, counts = src[order], dst[order], counts[order]
+    rank = np.arange(src.size) - np.searchsorted(src, src, side='left')
+    top = rank < k
+    return catalog[src[top]], catalog[dst[top]], counts[top].astype(np.int64)
+
+
+def _load_order_lines(chunk_size=CHUNK_SIZE):
+    """(idOrder, idProduct) de order_detail como arreglos, leídos por bloques."""
+    from app.models import OrderDetail
+
+    statement = db.select(OrderDetail.idOrder, OrderDetail.idProduct) \
+        .where(OrderDetail.idOrder.isnot(None), OrderDetail.idProduct.isnot(None)) \
+        .execution_options(yield_per=chunk_size)
+    order_chunks, product_chunks = [], []
+    for partition in db.session.execute(statement).partitions():
+        block = np.array(partition, dtype=np.int64).reshape(-1, 2)
+        order_chunks.append(block[:, 0])
+        product_chunks.append(block[:, 1])
+    if not order_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(order_chunks), np.concatenate(product_chunks)
+
+
+def rebuild_recommendations(k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Reconstruye product_recommendation completo; devuelve las filas escritas."""
+    from app.models import ProductRecommendation
+
+    orders, products = _load_order_lines(chunk_size)
+    src, dst, counts = cooccurrence_topk(orders, products, k)
+
+    table = ProductRecommendation.__table__
+    db.session.execute(table.delete())
+    rows = [{'idProduct': int(a), 'idRelated': int(b), 'score': int(c)}
+            for a, b, c in zip(src.tolist(), dst.tolist(), counts.tolist())]
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(table.insert(), rows[start:start + chunk_size])
+    db.session.commit()
+    return len(rows)
+
+
+def record_order(product_ids, k=TOP_K):
+    """Suma un pedido al índice. No hace commit: va en la transacción del pedido."""
+    from app.models import ProductRecommendation
+
+    in_order = {int(pid) for pid in product_ids if pid is not None}
+    product_ids = sorted(in_order)
+    if len(product_ids) < 2:
+        return
+
+    current = {}
+    for row in ProductRecommendation.query.filter(
+            ProductRecommendation.idProduct.in_(product_ids)).all():
+        current.setdefault(row.idProduct, {})[row.idRelated] = row
+
+    for product_id in product_ids:
+        neighbors = current.setdefault(product_id, {})
+        for related_id in product_ids:
+            if related_id == product_id:
+                continue
+            if related_id in neighbors:
+                neighbors[related_id].score += 1
+                continue
+            score = 1
+            if len(neighbors) >= k:
+                # Solo se reemplazan vecinos que no estén en este mismo pedido
+                candidates = [row for related, row in neighbors.items() if related not in in_order]
+                if not candidates:
+                    continue
+                weakest = min(candidates, key=lambda row: (row.score, -row.idRelated))
+                del neighbors[weakest.idRelated]
+                db.session.delete(weakest)
+                score = weakest.score + 1
+            neighbors[related_id] = ProductRecommendation(
+                idProduct=product_id, idRelated=related_id, score=score)
+            db.session.add(neighbors[related_id])
+
+
+def recommended_products(product_id, limit=4):
+    """Productos activos recomendados para `product_id`, por puntuación."""
+    from app.models import Product, ProductRecommendation
+
+    return Product.query.join(
+        ProductRecommendation, ProductRecommendation.idRelated == Product.idProduct
+    ).filter(
+        ProductRecommendation.idProduct == product_id,
+        Product.status == 'Activo'
+    ).order_by(ProductRecommendation.score.desc(), Product.idProduct).limit(limit).all()
@@ -0,0 +1,131 @@
+"""Reportes de ventas sobre los agregados diarios (ver app/rollups.py).
+
+La base de datos solo devuelve las filas de ``sales_daily`` y
+``sales_category_daily`` del rango (una por día, o por día y categoría),
+así que el costo depende de los días pedidos y no de cuántas líneas de
+pedido haya. El reagrupado por semana/mes y los promedios se hacen con
+NumPy sobre esos arreglos.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app import db
+
+GRANULARITIES = ('day', 'week', 'month')
+TOP_CATEGORIES = 5
+MAX_RANGE_DAYS = 3 * 366
+
+
+def _as_day(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def daily_query(start, end):
+    """Filas de sales_daily del rango (la consulta de load_daily)."""
+    from app.models import SalesDaily
+
+    return db.session.query(
+        SalesDaily.day, SalesDaily.orders, SalesDaily.revenue, SalesDaily.units
+    ).filter(SalesDaily.day >= start, SalesDaily.day <= end)
+
+
+def load_daily(start, end):
+    """Arreglos (días datetime64[D], pedidos, ingresos, unidades) del rango, con ceros en los días sin ventas."""
+    rows = daily_query(start, end).all()
+
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    orders = np.zeros(days.size, dtype=np.int64)
+    revenue = np.zeros(days.size, dtype=np.float64)
+    units = np.zeros(days.size, dtype=np.int64)
+    if rows:
+        position = (np.array([np.datetime64(_as_day(row[0]), 'D') for row in rows]) - days[0]).astype(np.int64)
+        orders[position] = [row[1] for row in rows]
+        revenue[position] = [float(row[2]) for row in rows]
+        units[position] = [row[3] for row in rows]
+    return days, orders, revenue, units
+
+
+def period_starts(days, granularity):
+    """Primer día del periodo (día, semana ISO desde el lunes o mes) de cada día."""
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        # El 1970-01-01 (día 0) fue jueves: +3 deja el lunes en múltiplos de 7
+        offset = (days.astype(np.int64) + 3) % 7
+        return days - offset
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f'Granularidad no soportada: {granularity}')
+
+
+def resample(days, orders, revenue, units, granularity):
+    """Suma los arreglos diarios por periodo; devuelve una lista de dicts."""
+    keys, inverse = np.unique(period_starts(days, granularity), return_inverse=True)
+    period_orders = np.bincount(inverse, weights=orders, minlength=keys.size)
+    period_revenue = np.bincount(inverse, weights=revenue, minlength=keys.size)
+    period_units = np.bincount(inverse, weights=units, minlength=keys.size)
+    average = np.divide(period_revenue, period_orders,
+                        out=np.zeros_like(period_revenue), where=period_orders > 0)
+    return [{
+        'period': str(key),
+        'orders': int(o),
+        'revenue': round(float(r), 2),
+        'units': int(u),
+        'average_order': round(float(a), 2)
+    } for key, o, r, u, a in zip(keys, period_orders, period_revenue, period_units, average)]
+
+
+def category_query(start, end):
+    """Ingresos y unidades por categoría en el rango (la consulta de top_categories)."""
+    from app.models import SalesCategoryDaily
+
+    return db.session.query(
+        SalesCategoryDaily.category,
+        db.func.sum(SalesCategoryDaily.revenue),
+        db.func.sum(SalesCategoryDaily.units)
+    ).filter(
+        SalesCategoryDaily.day >= start, SalesCategoryDaily.day <= end
+    ).group_by(SalesCategoryDaily.category)
+
+
+def top_categories(start, end, limit=TOP_CATEGORIES):
+    """Categorías con más ingresos en el rango y su participación."""
+    rows = category_query(start, end).all()
+    if not rows:
+        return []
+
+    revenue = np.array([float(row[1] or 0) for row in rows])
+    units = np.array([int(row[2] or 0) for row in rows])
+    order = np.lexsort((np.array([row[0] for row in rows]), -revenue))[:limit]
+    total = revenue.sum()
+    share = revenue / total if total else np.zeros_like(revenue)
+    return [{
+        'name': rows[i][0],
+        'sales': round(float(revenue[i]), 2),
+        'units': int(units[i]),
+        'share': round(float(share[i]), 4)
+    } for i in order]
+
+
+def sales_report(start, end, granularities=GRANULARITIES):
+    """Reporte completo del rango [start, end] (fechas inclusive)."""
+    days, orders, revenue, units = load_daily(start, end)
+    total_orders = int(orders.sum())
+    total_revenue = float(revenue.sum())
+    return {
+        'range': {'start': start.isoformat(), 'end': end.isoformat()},
+        'total_sales': round(total_revenue, 2),
+        'total_orders': total_orders,
+        'total_units': int(units.sum()),
+        'average_order': round(total_revenue / total_orders, 2) if total_orders else 0,
+        'revenue_by': {granularity: resample(days, orders, revenue, units, granularity)
+                       for granularity in granularities},
+        'top_categories': top_categories(start, end)
+    }
+
+
+def default_range(today=None):
+    """Últimos 12 meses hasta hoy (UTC)."""
+    end = today or datetime.utcnow().date()
+    return end - timedelta(days=364), end
@@ -0,0 +1,171 @@
+"""Reservas temporales de stock para las líneas del carrito.
+
+Cada línea del carrito tiene a lo sumo una fila en ``stock_hold`` con la
+cantidad reservada y su vencimiento (``STOCK_HOLD_TTL``). La disponibilidad
+de un producto es ``stock - reservas vigentes``; la suma de las vigentes se
+resuelve con el índice (idProduct, expires_at, quantity) sin tocar la tabla.
+
+Las reservas vencidas ya no cuentan aunque sigan en la tabla; el barrido
+``release_expired()`` (``flask release-expired-holds``) las borra por lotes.
+
+Orden de bloqueo en ``hold_stock()``: primero las filas de ``product``
+(SELECT ... FOR UPDATE en MySQL), luego la escritura de la reserva (que en
+SQLite toma el bloqueo de escritura) y al final la validación. Así la
+validación nunca ve un estado que otra transacción esté cambiando.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+
+DEFAULT_TTL = 900
+DEFAULT_SWEEP_BATCH = 1000
+
+
+def _ttl():
+    return current_app.config.get('STOCK_HOLD_TTL', DEFAULT_TTL)
+
+
+def held_quantity(product_id_column, now=None, exclude_user=None):
+    """Subconsulta correlacionada: unidades reservadas vigentes del producto."""
+    from app.models import StockHold
+
+    hold = StockHold.__table__
+    conditions = [hold.c.idProduct == product_id_column,
+                  hold.c.expires_at > (now or datetime.utcnow())]
+    if exclude_user is not None:
+        conditions.append(hold.c.idUser != exclude_user)
+    return db.func.coalesce(
+        db.select(db.func.sum(hold.c.quantity)).where(*conditions).scalar_subquery(), 0
+    )
+
+
+def available_stock(product_ids, exclude_user=None, now=None):
+    """{idProduct: stock - reservas vigentes} de los productos indicados.
+
+    Con `exclude_user` no se descuentan las reservas de ese usuario (lo que
+    él mismo puede comprar).
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    rows = available_stock_query(product_ids, exclude_user, now).all()
+    return {product_id: int(available) for product_id, available in rows}
+
+
+def available_stock_query(product_ids, exclude_user=None, now=None):
+    """La consulta de available_stock (sin ejecutar)."""
+    from app.models import Product
+
+    return db.session.query(
+        Product.idProduct,
+        Product.stock - held_quantity(Product.idProduct, now, exclude_user)
+    ).filter(Product.idProduct.in_(list(product_ids)))
+
+
+def _upsert_holds(rows):
+    from app.models import StockHold
+
+    hold = StockHold.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(hold)
+        statement = statement.on_duplicate_key_update(
+            quantity=statement.inserted.quantity,
+            expires_at=statement.inserted.expires_at
+        )
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(hold)
+        statement = statement.on_conflict_do_update(
+            index_elements=['idUser', 'idProduct'],
+            set_={'quantity': statement.excluded.quantity, 'expires_at': statement.excluded.expires_at}
+        )
+    else:
+        raise RuntimeError(f'Backend no soportado para reservas: {dialect}')
+    db.session.execute(statement, rows)
+
+
+def hold_stock(user_id, quantities, ttl=None, now=None):
+    """Fija las reservas de `user_id` a {idProduct: cantidad} y renueva su vencimiento.
+
+    Cantidades <= 0 liberan la reserva. No hace commit. Devuelve la lista de
+    productos que quedarían sobre-reservados (o inexistentes): si no está
+    vacía, el llamador debe hacer rollback.
+    """
+    from app.models import Product, StockHold
+
+    now = now or datetime.utcnow()
+    product_ids = sorted(quantities)
+    if not product_ids:
+        return []
+
+    # Serializa las reservas por producto (no-op en SQLite)
+    found = {product_id for (product_id,) in db.session.query(Product.idProduct)
+             .filter(Product.idProduct.in_(product_ids))
+             .order_by(Product.idProduct).with_for_update()}
+
+    expires_at = now + timedelta(seconds=_ttl() if ttl is None else ttl)
+    rows = [{'idUser': user_id, 'idProduct': product_id,
+             'quantity': quantities[product_id], 'expires_at': expires_at}
+            for product_id in product_ids if product_id in found and quantities[product_id] > 0]
+    released = [product_id for product_id in product_ids if quantities[product_id] <= 0]
+    if rows:
+        _upsert_holds(rows)
+    if released:
+        release_holds(user_id, released)
+
+    # Validación ya con los bloqueos tomados; las lecturas con bloqueo ven lo
+    # último confirmado y no una foto vieja de la transacción
+    held_ids = [row['idProduct'] for row in rows]
+    stock, held = {}, {}
+    if held_ids:
+        stock = dict(db.session.query(Product.idProduct, Product.stock)
+                     .filter(Product.idProduct.in_(held_ids)).with_for_update().all())
+        held = dict(db.session.query(StockHold.idProduct, db.func.sum(StockHold.quantity))
+                    .filter(StockHold.idProduct.in_(held_ids), StockHold.expires_at > now)
+                    .group_by(StockHold.idProduct).with_for_update().all())
+    return [product_id for product_id in product_ids
+            if quantities[product_id] > 0
+            and (product_id not in found or held.get(product_id, 0) > stock.get(product_id, 0))]
+
+
+def release_holds(user_id, product_ids=None):
+    """Libera las reservas de `user_id` (todas o las de `product_ids`). No hace commit."""
+    from app.models import StockHold
+
+    hold = StockHold.__table__
+    statement = hold.delete().where(hold.c.idUser == user_id)
+    if product_ids is not None:
+        statement = statement.where(hold.c.idProduct.in_(list(product_ids)))
+    return db.session.execute(statement).rowcount
+
+
+def expired_holds_query(now, batch_size):
+    """Ids del siguiente lote de reservas vencidas (por el índice de expires_at)."""
+    from app.models import StockHold
+
+    hold = StockHold.__table__
+    return db.select(hold.c.idHold).where(hold.c.expires_at <= now) \
+        .order_by(hold.c.expires_at).limit(batch_size)
+
+
+def release_expired(batch_size=None, now=None):
+    """Borra las reservas vencidas por lotes (un commit por lote); devuelve cuántas."""
+    from app.models import StockHold
+
+    hold = StockHold.__table__
+    batch_size = batch_size or current_app.config.get('STOCK_HOLD_SWEEP_BATCH', DEFAULT_SWEEP_BATCH)
+    now = now or datetime.utcnow()
+    released = 0
+    while True:
+        ids = db.session.execute(expired_holds_query(now, batch_size)).scalars().all()
+        if not ids:
+            return released
+        db.session.execute(hold.delete().where(hold.c.idHold.in_(ids), hold.c.expires_at <= now))
+        db.session.commit()
+        released += len(ids)
+        if len(ids) < batch_size:
+            return released
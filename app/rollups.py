@@ -0,0 +1,136 @@
+"""Agregados de ventas mantenidos de forma incremental.
+
+- ``sales_daily``: por día (UTC) pedidos, ingresos y unidades vendidas.
+- ``sales_category_daily``: por día y categoría, ingresos y unidades (la
+  categoría es la del producto en el momento de la venta).
+- ``product_sales``: por producto unidades e ingresos acumulados.
+- ``product_sales_daily``: por día y producto, unidades e ingresos; de ahí
+  salen las ventanas móviles del ranking (ver app/leaderboard.py).
+
+``record_sale()`` se llama dentro de la transacción que crea el pedido
+(ver app/checkout.py) y suma con un upsert por tabla, así que las
+estadísticas del dashboard leen unas pocas filas en lugar de recorrer
+``orders`` y ``order_detail``. ``rebuild_rollups()`` los recalcula desde
+cero (``flask rebuild-sales-rollups``), por ejemplo tras cargar pedidos
+históricos fuera de la aplicación.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from app import db
+from app.counters import upsert_increment
+
+UNCATEGORIZED = 'Sin categoría'
+
+
+def record_sale(order_date, lines):
+    """Suma un pedido a los agregados. No hace commit.
+
+    `lines` son tuplas (idProduct, cantidad, precio unitario, categoría).
+    """
+    from app.leaderboard import record_windows
+    from app.models import ProductSales, ProductSalesDaily, SalesCategoryDaily, SalesDaily
+
+    lines = [(product_id, int(quantity), Decimal(str(price)), category or UNCATEGORIZED)
+             for product_id, quantity, price, category in lines]
+    if not lines:
+        return
+    day = (order_date or datetime.utcnow()).date()
+    upsert_increment(SalesDaily.__table__, [{
+        'day': day,
+        'orders': 1,
+        'revenue': sum(quantity * price for _, quantity, price, _ in lines),
+        'units': sum(quantity for _, quantity, _, _ in lines)
+    }], ['day'], ['orders', 'revenue', 'units'])
+
+    per_category = defaultdict(lambda: [0, Decimal('0')])
+    per_product = defaultdict(lambda: [0, Decimal('0')])
+    for product_id, quantity, price, category in lines:
+        for bucket in (per_category[category], per_product[product_id]):
+            bucket[0] += quantity
+            bucket[1] += quantity * price
+    upsert_increment(SalesCategoryDaily.__table__, [
+        {'day': day, 'category': category, 'units': units, 'revenue': revenue}
+        for category, (units, revenue) in sorted(per_category.items())
+    ], ['day', 'category'], ['units', 'revenue'])
+    upsert_increment(ProductSales.__table__, [
+        {'idProduct': product_id, 'units': units, 'revenue': revenue}
+        for product_id, (units, revenue) in sorted(per_product.items())
+    ], ['idProduct'], ['units', 'revenue'])
+    upsert_increment(ProductSalesDaily.__table__, [
+        {'day': day, 'idProduct': product_id, 'units': units, 'revenue': revenue}
+        for product_id, (units, revenue) in sorted(per_product.items())
+    ], ['day', 'idProduct'], ['units', 'revenue'])
+    record_windows(day, per_product)
+
+
+def rebuild_rollups():
+    """Recalcula los agregados desde orders/order_detail; devuelve (días, productos)."""
+    from app.leaderboard import rebuild_windows
+    from app.models import (Order, OrderDetail, Product, ProductSales, ProductSalesDaily,
+                            SalesCategoryDaily, SalesDaily)
+
+    # Misma fuente que record_sale(): las líneas del pedido (cantidad * precio),
+    # no orders.totalAmount; un pedido sin líneas no se registra en ninguno de los dos
+    day = db.func.date(Order.orderDate)
+    days = [
+        {'day': value if isinstance(value, date) else date.fromisoformat(value),
+         'orders': orders, 'revenue': revenue or 0, 'units': int(units or 0)}
+        for value, orders, revenue, units in db.session.query(
+            day, db.func.count(db.distinct(Order.idOrder)),
+            db.func.sum(OrderDetail.quantity * OrderDetail.price),
+            db.func.sum(OrderDetail.quantity)
+        ).join(Order, Order.idOrder == OrderDetail.idOrder)
+         .filter(Order.orderDate.isnot(None)).group_by(day)
+    ]
+
+    category = db.func.coalesce(Product.category, UNCATEGORIZED)
+    categories = [
+        {'day': value if isinstance(value, date) else date.fromisoformat(value),
+         'category': name, 'units': int(units or 0), 'revenue': revenue or 0}
+        for value, name, units, revenue in db.session.query(
+            day, category,
+            db.func.sum(OrderDetail.quantity),
+            db.func.sum(OrderDetail.quantity * OrderDetail.price)
+        ).join(Order, Order.idOrder == OrderDetail.idOrder)
+         .join(Product, Product.idProduct == OrderDetail.idProduct)
+         .filter(Order.orderDate.isnot(None)).group_by(day, category)
+    ]
+
+    products = [
+        {'idProduct': product_id, 'units': int(units or 0), 'revenue': revenue or 0}
+        for product_id, units, revenue in db.session.query(
+            OrderDetail.idProduct,
+            db.func.sum(OrderDetail.quantity),
+            db.func.sum(OrderDetail.quantity * OrderDetail.price)
+        ).filter(OrderDetail.idProduct.isnot(None)).group_by(OrderDetail.idProduct)
+    ]
+
+    product_days = [
+        {'day': value if isinstance(value, date) else date.fromisoformat(value),
+         'idProduct': product_id, 'units': int(units or 0), 'revenue': revenue or 0}
+        for value, product_id, units, revenue in db.session.query(
+            day, OrderDetail.idProduct,
+            db.func.sum(OrderDetail.quantity),
+            db.func.sum(OrderDetail.quantity * OrderDetail.price)
+        ).join(Order, Order.idOrder == OrderDetail.idOrder)
+         .filter(Order.orderDate.isnot(None), OrderDetail.idProduct.isnot(None))
+         .group_by(day, OrderDetail.idProduct)
+    ]
+
+    db.session.execute(SalesDaily.__table__.delete())
+    db.session.execute(SalesCategoryDaily.__table__.delete())
+    db.session.execute(ProductSales.__table__.delete())
+    db.session.execute(ProductSalesDaily.__table__.delete())
+    if days:
+        db.session.execute(SalesDaily.__table__.insert(), days)
+    if categories:
+        db.session.execute(SalesCategoryDaily.__table__.insert(), categories)
+    if products:
+        db.session.execute(ProductSales.__table__.insert(), products)
+    if product_days:
+        db.session.execute(ProductSalesDaily.__table__.insert(), product_days)
+    rebuild_windows()
+    db.session.commit()
+    return len(days), len(products)
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, current_user, login_required
 from app import db, mail
 from app.models import User  # ← Importar User (singular)
+from app.events import publish_user
 from flask_mail import Message
 from werkzeug.security import generate_password_hash, check_password_hash
 import logging
@@ -379,6 +380,7 @@ def register():
             
             db.session.add(new_user)
             db.session.commit()
+            publish_user(new_user.idUser, new_user.nameUser)
             
             # ✅ ENVIAR EMAIL DE BIENVENIDA
             if send_welcome_email(new_user):
@@ -1,45 +1,135 @@
 from flask import Blueprint, jsonify, request, render_template, flash
 from flask_login import login_required, current_user
 from app import db
-from app.models import CartItem, Product
+from app.models import CartItem, OrderDetail, Product
+from app.cache import catalog_cache
+from app.checkout import CheckoutError, place_order
+from app.events import publish_order, publish_stock
+from app.leaderboard import roll_windows
+from app.reservations import available_stock, hold_stock, release_holds
 from datetime import datetime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 cart_bp = Blueprint('cart', __name__)
 
+def cart_lines_query(user_id):
+    """Líneas del carrito de `user_id` con su producto (la consulta de _cart_lines)."""
+    return db.session.query(
+        CartItem.idCartItem,
+        CartItem.quantity,
+        Product.idProduct,
+        Product.nameProduct,
+        Product.price,
+        Product.image,
+        (Product.price * CartItem.quantity).label('subtotal')
+    ).outerjoin(
+        Product, Product.idProduct == CartItem.idProduct
+    ).filter(
+        CartItem.idUser == user_id
+    ).order_by(CartItem.idCartItem)
+
+
+def cart_line_query(user_id, product_id):
+    """Cantidad de la línea de `product_id` en el carrito de `user_id`."""
+    return db.session.query(CartItem.quantity).filter(
+        CartItem.idUser == user_id,
+        CartItem.idProduct == product_id
+    )
+
+
+def cart_state_query(user_id):
+    """(línea, producto, cantidad) de cada línea del carrito de `user_id`."""
+    return db.session.query(CartItem.idCartItem, CartItem.idProduct, CartItem.quantity) \
+        .filter(CartItem.idUser == user_id)
+
+
+def _cart_lines(user_id):
+    """Líneas del carrito con los datos del producto y el subtotal, en una sola consulta.
+    
+    Devuelve (líneas, ids de líneas huérfanas cuyo producto ya no existe).
+    """
+    rows = cart_lines_query(user_id).all()
+    
+    lines, orphans = [], []
+    for row in rows:
+        if row.idProduct is None:
+            orphans.append(row.idCartItem)
+            continue
+        lines.append({
+            'id': row.idCartItem,
+            'product_id': row.idProduct,
+            'name': row.nameProduct,
+            'price': float(row.price),
+            'quantity': row.quantity,
+            'image': row.image,
+            'subtotal': float(row.subtotal)
+        })
+    return lines, orphans
+
+
 @cart_bp.route('/cart')
 @login_required
 def view_cart():
     try:
-        cart_items = current_user.get_cart()
-        total = 0
-        cart_data = []
-        
-        for item in cart_items:
-            # Asegúrate de que el producto existe
-            if item.product:
-                product_total = float(item.product.price) * item.quantity
-                total += product_total
-                
-                cart_data.append({
-                    'id': item.idCartItem,
-                    'product_id': item.product.idProduct,
-                    'name': item.product.nameProduct,
-                    'price': float(item.product.price),
-                    'quantity': item.quantity,
-                    'image': item.product.image,
-                    'subtotal': product_total
-                })
-            else:
-                # Si el producto fue eliminado, elimina el item del carrito
-                db.session.delete(item)
-                db.session.commit()
+        cart_data, orphans = _cart_lines(current_user.idUser)
+        
+        # Si hay productos eliminados, se quitan del carrito en un solo DELETE
+        if orphans:
+            CartItem.query.filter(CartItem.idCartItem.in_(orphans)).delete(synchronize_session=False)
+            db.session.commit()
         
+        total = sum(item['subtotal'] for item in cart_data)
         return render_template('cart.html', cart_items=cart_data, total=total)
     
     except Exception as e:
+        db.session.rollback()
         flash('Error al cargar el carrito', 'danger')
         return render_template('cart.html', cart_items=[], total=0)
 
+def _upsert_cart_line(user_id, product_id, quantity):
+    """Agrega `quantity` unidades al carrito en una sola sentencia.
+    
+    INSERT ... SELECT desde product que solo produce la fila si el stock
+    alcanza para lo que ya hay en el carrito más lo nuevo; si la línea
+    existe, ON CONFLICT / ON DUPLICATE KEY suma la cantidad. Devuelve True
+    si se agregó y False si no hay producto o stock suficiente.
+    """
+    cart_item = CartItem.__table__
+    product = Product.__table__
+    in_cart = db.select(cart_item.c.quantity).where(
+        cart_item.c.idUser == user_id,
+        cart_item.c.idProduct == product_id
+    ).scalar_subquery()
+    source = db.select(
+        db.literal(user_id, db.Integer),
+        product.c.idProduct,
+        db.literal(quantity, db.Integer),
+        db.literal(datetime.utcnow(), db.DateTime)
+    ).where(
+        product.c.idProduct == product_id,
+        product.c.stock >= db.func.coalesce(in_cart, 0) + quantity
+    )
+    columns = ['idUser', 'idProduct', 'quantity', 'added_at']
+    
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(cart_item).from_select(columns, source)
+        statement = statement.on_duplicate_key_update(
+            quantity=cart_item.c.quantity + statement.inserted.quantity
+        )
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(cart_item).from_select(columns, source)
+        statement = statement.on_conflict_do_update(
+            index_elements=['idUser', 'idProduct'],
+            set_={'quantity': cart_item.c.quantity + statement.excluded.quantity}
+        )
+    else:
+        raise RuntimeError(f'Backend no soportado para el carrito: {dialect}')
+    
+    return db.session.execute(statement).rowcount > 0
+
+
 @cart_bp.route('/api/cart/add', methods=['POST'])
 @login_required
 def add_to_cart():
@@ -48,40 +138,35 @@ def add_to_cart():
         product_id = data.get('product_id')
         quantity = data.get('quantity', 1)
         
-        # Verificar si el producto existe
-        product = Product.query.get(product_id)
-        if not product:
+        try:
+            product_id = int(product_id)
+            quantity = int(quantity)
+        except (ValueError, TypeError):
             return jsonify({'success': False, 'message': 'Producto no encontrado'})
+        if quantity <= 0:
+            return jsonify({'success': False, 'message': 'La cantidad debe ser mayor a 0'})
         
-        # Verificar si el producto ya está en el carrito
-        existing_item = CartItem.query.filter_by(
-            idUser=current_user.idUser, 
-            idProduct=product_id
-        ).first()
+        # Verificación de stock e inserción/actualización en una sola sentencia
+        if not _upsert_cart_line(current_user.idUser, product_id, quantity):
+            db.session.rollback()
+            # Solo en el caso de error se distingue el motivo
+            if db.session.get(Product, product_id) is None:
+                return jsonify({'success': False, 'message': 'Producto no encontrado'})
+            return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'})
         
-        if existing_item:
-            # Verificar stock disponible
-            if existing_item.quantity + quantity > product.stock:
-                return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'})
-            
-            existing_item.quantity += quantity
-        else:
-            # Verificar stock disponible
-            if quantity > product.stock:
-                return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'})
-            
-            new_item = CartItem(
-                idUser=current_user.idUser,
-                idProduct=product_id,
-                quantity=quantity
-            )
-            db.session.add(new_item)
+        # Reserva temporal de la cantidad total de la línea
+        in_cart = cart_line_query(current_user.idUser, product_id).scalar()
+        if hold_stock(current_user.idUser, {product_id: in_cart}):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'})
         
+        # El conteo se lee dentro de la misma transacción
+        cart_count = current_user.get_cart_count()
         db.session.commit()
         return jsonify({
             'success': True, 
             'message': 'Producto agregado al carrito',
-            'cart_count': current_user.get_cart_count()
+            'cart_count': cart_count
         })
     
     except Exception as e:
@@ -101,11 +186,12 @@ def update_cart_item():
         
         item = CartItem.query.get(item_id)
         if item and item.idUser == current_user.idUser:
-            # Verificar stock disponible
-            if quantity > item.product.stock:
+            # Verificar stock disponible (descontando lo reservado por otros carritos)
+            item.quantity = quantity
+            if hold_stock(current_user.idUser, {item.idProduct: quantity}):
+                db.session.rollback()
                 return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'})
             
-            item.quantity = quantity
             db.session.commit()
             return jsonify({'success': True, 'message': 'Carrito actualizado'})
         
@@ -124,6 +210,7 @@ def remove_from_cart():
         
         item = CartItem.query.get(item_id)
         if item and item.idUser == current_user.idUser:
+            release_holds(current_user.idUser, [item.idProduct])
             db.session.delete(item)
             db.session.commit()
             return jsonify({
@@ -138,11 +225,175 @@ def remove_from_cart():
         db.session.rollback()
         return jsonify({'success': False, 'message': 'Error al eliminar el producto'})
 
+def _apply_cart_ops(ops, lines, stock):
+    """Aplica las operaciones en orden sobre {idProduct: cantidad}.
+    
+    `lines` es el estado inicial del carrito e `stock` el stock de cada
+    producto involucrado. Devuelve (estado final, error) donde error es
+    {'index', 'message'} de la primera operación inválida.
+    """
+    state = {product_id: line['quantity'] for product_id, line in lines.items()}
+    by_item = {line['id']: product_id for product_id, line in lines.items()}
+    
+    for index, op in enumerate(ops):
+        kind = op.get('op')
+        product_id = op.get('product_id')
+        if product_id is None and op.get('item_id') is not None:
+            product_id = by_item.get(op.get('item_id'))
+        if product_id is None or (kind != 'add' and product_id not in state):
+            return None, {'index': index, 'message': 'Item no encontrado'}
+        
+        if kind == 'remove':
+            state.pop(product_id)
+            continue
+        try:
+            quantity = int(op.get('quantity', 1))
+        except (ValueError, TypeError):
+            return None, {'index': index, 'message': 'La cantidad debe ser numérica'}
+        
+        if kind == 'add':
+            if quantity <= 0:
+                return None, {'index': index, 'message': 'La cantidad debe ser mayor a 0'}
+            if product_id not in stock:
+                return None, {'index': index, 'message': 'Producto no encontrado'}
+            quantity += state.get(product_id, 0)
+        elif kind == 'update':
+            if quantity <= 0:
+                state.pop(product_id)
+                continue
+        else:
+            return None, {'index': index, 'message': f'Operación desconocida: {kind}'}
+        
+        if quantity > stock.get(product_id, 0):
+            return None, {'index': index, 'message': 'No hay suficiente stock disponible'}
+        state[product_id] = quantity
+    return state, None
+
+
+@cart_bp.route('/api/cart/batch', methods=['POST'])
+@login_required
+def batch_cart():
+    """Aplica una lista ordenada de operaciones sobre el carrito en una transacción.
+    
+    Cuerpo: {"ops": [{"op": "add", "product_id": 1, "quantity": 2},
+                     {"op": "update", "item_id": 5, "quantity": 3},
+                     {"op": "remove", "item_id": 7}]}
+    Si alguna operación falla no se aplica ninguna. Responde con el carrito final.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        ops = data.get('ops')
+        if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+            return jsonify({'success': False, 'message': 'Se esperaba una lista de operaciones'}), 400
+        for index, op in enumerate(ops):
+            for key in ('product_id', 'item_id'):
+                if op.get(key) is not None:
+                    try:
+                        op[key] = int(op[key])
+                    except (ValueError, TypeError):
+                        return jsonify({'success': False, 'index': index, 'message': f'{key} inválido'}), 400
+        user_id = current_user.idUser
+        
+        # Estado actual del carrito: una consulta
+        lines = {
+            row.idProduct: {'id': row.idCartItem, 'quantity': row.quantity}
+            for row in cart_state_query(user_id)
+        }
+        by_item = {line['id']: product_id for product_id, line in lines.items()}
+        
+        # Disponibilidad (stock - reservas de otros) de los productos involucrados: una consulta
+        involved = set()
+        for op in ops:
+            if op.get('product_id') is not None:
+                involved.add(op.get('product_id'))
+            elif op.get('item_id') in by_item:
+                involved.add(by_item[op.get('item_id')])
+        stock = available_stock(involved, exclude_user=user_id)
+        
+        state, error = _apply_cart_ops(ops, lines, stock)
+        if error:
+            return jsonify({'success': False, **error}), 400
+        
+        # Escrituras por lotes dentro de la misma transacción
+        removed = [line['id'] for product_id, line in lines.items() if product_id not in state]
+        changed = [{'b_id': lines[product_id]['id'], 'b_quantity': quantity}
+                   for product_id, quantity in state.items()
+                   if product_id in lines and lines[product_id]['quantity'] != quantity]
+        added = [{'idUser': user_id, 'idProduct': product_id, 'quantity': quantity, 'added_at': datetime.utcnow()}
+                 for product_id, quantity in state.items() if product_id not in lines]
+        
+        table = CartItem.__table__
+        if removed:
+            db.session.execute(table.delete().where(table.c.idCartItem.in_(removed)))
+        if changed:
+            db.session.execute(
+                table.update().where(table.c.idCartItem == db.bindparam('b_id'))
+                              .values(quantity=db.bindparam('b_quantity')),
+                changed
+            )
+        if added:
+            db.session.execute(table.insert(), added)
+        
+        # Reservas: las líneas que quedan se renuevan y las borradas se liberan
+        holds = dict(state)
+        holds.update((product_id, 0) for product_id in lines if product_id not in state)
+        if hold_stock(user_id, holds):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'No hay suficiente stock disponible'}), 409
+        
+        cart_items, _ = _cart_lines(user_id)
+        cart_count = current_user.get_cart_count()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Carrito actualizado',
+            'cart_items': cart_items,
+            'total': sum(item['subtotal'] for item in cart_items),
+            'cart_count': cart_count
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Error al actualizar el carrito: ' + str(e)}), 500
+
+@cart_bp.route('/api/cart/checkout', methods=['POST'])
+@login_required
+def checkout():
+    """Convierte el carrito en un pedido (ver app/checkout.py)."""
+    try:
+        order = place_order(current_user.idUser)
+        # El stock cambió: invalidar el catálogo cacheado y avisar al dashboard
+        catalog_cache.bump()
+        publish_order(order, current_user.nameUser)
+        publish_stock(product_id for (product_id,) in db.session.query(OrderDetail.idProduct)
+                      .filter(OrderDetail.idOrder == order.idOrder))
+        try:
+            # Con el pedido ya confirmado: saca del ranking los días vencidos
+            roll_windows()
+        except Exception as e:
+            print(f"⚠️ No se pudo avanzar el ranking de más vendidos: {e}")
+        return jsonify({
+            'success': True,
+            'message': 'Pedido realizado correctamente',
+            'order_id': order.idOrder,
+            'total': float(order.totalAmount),
+            'cart_count': 0
+        }), 201
+    
+    except CheckoutError as e:
+        status = 409 if e.shortages else 400
+        return jsonify({'success': False, 'message': e.message, 'shortages': e.shortages}), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Error al procesar el pedido: ' + str(e)}), 500
+
 @cart_bp.route('/api/cart/clear', methods=['POST'])
 @login_required
 def clear_cart():
     try:
         CartItem.query.filter_by(idUser=current_user.idUser).delete()
+        release_holds(current_user.idUser)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Carrito vaciado'})
     
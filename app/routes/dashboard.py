@@ -1,7 +1,13 @@
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for
+from flask import Blueprint, current_app, render_template, jsonify, request, redirect, stream_with_context, url_for
 from flask_login import login_required, current_user, logout_user
 from app import db
+from app.cache import catalog_cache, dashboard_cache
+from app.decorators import admin_required
+from app.events import event_bus, publish_user, stream as event_stream
+from app.conditional import catalog_validators, conditional_json
+from app.pagination import DEFAULT_LIMIT, decode_cursor, encode_cursor, keyset_page, parse_limit, seek_page
 from datetime import datetime, timedelta
+from decimal import Decimal
 import random
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -11,56 +17,65 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def dashboard():
     return render_template('dashboard.html', username=current_user.nameUser)
 
+def sales_totals_query(today):
+    """Pedidos totales e ingresos de `today`, del agregado diario (una fila por día)."""
+    from app.models import SalesDaily
+    
+    return db.session.query(
+        db.select(db.func.coalesce(db.func.sum(SalesDaily.orders), 0)).scalar_subquery(),
+        db.select(SalesDaily.revenue).where(SalesDaily.day == today).scalar_subquery()
+    )
+
+def recent_orders_query(limit=5):
+    """Últimos pedidos con el cliente en el mismo JOIN."""
+    from app.models import Order, User
+    
+    return db.session.query(
+        Order.idOrder, Order.orderDate, Order.totalAmount, Order.status, User.nameUser
+    ).outerjoin(User, User.idUser == Order.idUser).order_by(Order.orderDate.desc()).limit(limit)
+
+def _dashboard_stats():
+    """Totales, pedidos recientes y productos populares del dashboard."""
+    # Importar modelos aquí para evitar problemas de importación circular
+    from app.counters import counter_values
+    from app.leaderboard import top_products
+    
+    # Productos y usuarios salen de la tabla counter (mantenida por triggers);
+    # pedidos e ingresos, del agregado diario (una fila por día): nada recorre
+    # product, user ni orders
+    totals = counter_values('products', 'users')
+    total_orders, today_income = sales_totals_query(datetime.utcnow().date()).one()
+    
+    recent_orders = recent_orders_query().all()
+    
+    # Productos populares (más vendidos) desde el índice del ranking
+    popular_products = top_products('all', limit=3)
+    
+    return {
+        'total_products': totals['products'],
+        'total_orders': int(total_orders),
+        'total_users': totals['users'],
+        'today_income': float(today_income or 0),
+        'recent_orders': [{
+            'id': order.idOrder,
+            'customer': order.nameUser or 'Cliente',
+            'date': order.orderDate.strftime('%d/%m/%Y'),
+            'amount': float(order.totalAmount),
+            'status': order.status
+        } for order in recent_orders],
+        'popular_products': [{
+            'name': product['name'],
+            'sales': product['units'],
+            'category': product['category']
+        } for product in popular_products]
+    }
+
+
 @dashboard_bp.route('/api/dashboard/stats')
 @login_required
 def dashboard_stats():
     try:
-        # Importar modelos aquí para evitar problemas de importación circular
-        from app.models import Product, Order, OrderDetail, User
-        
-        # Obtener estadísticas para el dashboard
-        total_products = Product.query.count()
-        total_orders = Order.query.count()
-        total_users = User.query.count()
-        
-        # Calcular ingresos de hoy
-        today = datetime.now().date()
-        today_orders = Order.query.filter(Order.orderDate >= today).all()
-        today_income = sum(float(order.totalAmount) for order in today_orders) if today_orders else 0
-        
-        # Obtener pedidos recientes
-        recent_orders = Order.query.order_by(Order.orderDate.desc()).limit(5).all()
-        
-        # Obtener productos populares (más vendidos)
-        popular_products = []
-        try:
-            popular_products = db.session.query(
-                Product.nameProduct, 
-                Product.category,
-                db.func.sum(OrderDetail.quantity).label('total_sold')
-            ).join(OrderDetail).group_by(Product.idProduct).order_by(db.desc('total_sold')).limit(3).all()
-        except:
-            # Si hay error, usar datos de ejemplo
-            popular_products = []
-        
-        return jsonify({
-            'total_products': total_products,
-            'total_orders': total_orders,
-            'total_users': total_users,
-            'today_income': today_income,
-            'recent_orders': [{
-                'id': order.idOrder,
-                'customer': order.user.nameUser if order.user else 'Cliente',
-                'date': order.orderDate.strftime('%d/%m/%Y'),
-                'amount': float(order.totalAmount),
-                'status': order.status
-            } for order in recent_orders],
-            'popular_products': [{
-                'name': name,
-                'sales': total_sold,
-                'category': category
-            } for name, category, total_sold in popular_products]
-        })
+        return jsonify(_dashboard_stats())
     except Exception as e:
         print(f"Error en dashboard stats: {e}")
         # Devolver datos de ejemplo si hay error
@@ -73,101 +88,137 @@ def dashboard_stats():
             'popular_products': []
         })
 
-@dashboard_bp.route('/api/products')
+@dashboard_bp.route('/api/dashboard/snapshot')
 @login_required
-def get_products():
+def dashboard_snapshot():
+    """Todo lo que la página del dashboard necesita al cargar, en una petición.
+    
+    Estadísticas y la primera página de productos y de usuarios (con su
+    ``next_cursor`` para pedir el resto). La respuesta ya
+    serializada se comparte por ventana de DASHBOARD_SNAPSHOT_TTL segundos
+    (y por versión del catálogo); si falta, las peticiones simultáneas
+    esperan un único cálculo.
+    """
     try:
-        from app.models import Product
-        # OBTENER TODOS LOS PRODUCTOS SIN LÍMITE
-        products = Product.query.all()
-        return jsonify([{
-            'id': product.idProduct,
-            'name': product.nameProduct,
-            'category': product.category,
-            'price': float(product.price),
-            'stock': product.stock,
-            'status': product.status,
-            'description': product.description or '',  # AÑADIR DESCRIPCIÓN
-            'image': product.image or f'https://via.placeholder.com/250x300/f8f9fa/000?text={product.nameProduct}'  # AÑADIR IMAGEN
-        } for product in products])
+        from app.user_directory import user_page
+        
+        def build():
+            return current_app.json.dumps({
+                'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'stats': _dashboard_stats(),
+                # Misma clave que GET /api/admin/products?limit=N: comparten la entrada cacheada
+                'products': catalog_cache.get_or_set(f'admin-products:limit={DEFAULT_LIMIT}',
+                                                     lambda: _product_page(limit=DEFAULT_LIMIT)),
+                'users': user_page()
+            })
+        
+        version = catalog_cache.version()
+        # Sin versión del catálogo no se puede saber si la foto sigue vigente
+        body = build() if version is None else dashboard_cache.get_or_compute(f'snapshot:v{version}', build)
+        return current_app.response_class(body, mimetype='application/json')
     except Exception as e:
-        print(f"Error obteniendo productos: {e}")
-        return jsonify([])
+        print(f"Error en dashboard snapshot: {e}")
+        return jsonify({'error': 'No se pudo cargar el dashboard'}), 500
 
-@dashboard_bp.route('/api/products', methods=['POST'])
+@dashboard_bp.route('/api/dashboard/events')
 @login_required
-def add_product():
-    try:
-        from app.models import Product
-        data = request.get_json()
-        new_product = Product(
-            nameProduct=data['name'],
-            category=data['category'],
-            price=data['price'],
-            stock=data['stock'],
-            status=data['status'],
-            description=data.get('description', ''),
-            image=data.get('image', '')  # AÑADIR IMAGEN
-        )
-        db.session.add(new_product)
-        db.session.commit()
-        return jsonify({'message': 'Producto agregado correctamente'})
-    except Exception as e:
-        print(f"Error agregando producto: {e}")
-        return jsonify({'error': str(e)}), 500
+def dashboard_events():
+    """Feed en vivo del dashboard (Server-Sent Events, ver app/events.py).
+    
+    Emite deltas ``order``, ``stock`` y ``user`` a medida que ocurren y
+    ``resync`` cuando el cliente debe recargar la foto completa.
+    """
+    subscriber = event_bus.subscribe(request.headers.get('Last-Event-ID', type=int))
+    # El stream no consulta la base: devolver ya la conexión al pool
+    db.session.remove()
+    response = current_app.response_class(
+        event_stream(event_bus, subscriber,
+                     heartbeat=current_app.config.get('DASHBOARD_EVENTS_HEARTBEAT', 15),
+                     max_age=current_app.config.get('DASHBOARD_EVENTS_MAX_AGE', 300)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Si el cliente se va antes del primer fragmento el generador nunca arranca
+    # y su finally no corre: el servidor igual llama a close() sobre la respuesta
+    response.call_on_close(lambda: event_bus.unsubscribe(subscriber))
+    return response
+
+def _serialize_product(product):
+    return {
+        'id': product.idProduct,
+        'name': product.nameProduct,
+        'category': product.category,
+        'price': float(product.price),
+        'stock': product.stock,
+        'status': product.status,
+        'description': product.description or '',  # AÑADIR DESCRIPCIÓN
+        'image': product.image or f'https://via.placeholder.com/250x300/f8f9fa/000?text={product.nameProduct}'  # AÑADIR IMAGEN
+    }
 
-@dashboard_bp.route('/api/products/<int:product_id>', methods=['PUT'])
+def _all_products():
+    from app.models import Product
+    # OBTENER TODOS LOS PRODUCTOS SIN LÍMITE
+    return [_serialize_product(product) for product in Product.query.all()]
+
+def _product_page(after=None, limit=DEFAULT_LIMIT):
+    """Una página de productos por cursor: {items, next_cursor, limit}."""
+    from app.models import Product
+    products, has_next, _ = keyset_page(Product.query, Product.idProduct, after=after, limit=limit)
+    return {
+        'items': [_serialize_product(product) for product in products],
+        'next_cursor': products[-1].idProduct if has_next else None,
+        'limit': limit
+    }
+
+# El catálogo público (GET /api/products, con ?fields= y solo activos) vive en
+# products_bp; el panel lista todos los productos, también los inactivos
+@dashboard_bp.route('/api/admin/products')
 @login_required
-def update_product(product_id):
+@admin_required
+def get_admin_products():
+    """Todos los productos del panel; ?after=<idProduct>&limit=N para paginar por cursor."""
     try:
-        from app.models import Product
-        product = Product.query.get_or_404(product_id)
-        data = request.get_json()
+        def load_products():
+            # Paginación por cursor opcional: ?after=<idProduct>&limit=N
+            if 'after' in request.args or 'limit' in request.args:
+                return _product_page(after=request.args.get('after', type=int),
+                                     limit=parse_limit(request.args.get('limit')))
+            return _all_products()
         
-        product.nameProduct = data['name']
-        product.category = data['category']
-        product.price = data['price']
-        product.stock = data['stock']
-        product.status = data['status']
-        if 'description' in data:
-            product.description = data['description']
-        if 'image' in data:  # ACTUALIZAR IMAGEN
-            product.image = data['image']
-        
-        db.session.commit()
-        return jsonify({'message': 'Producto actualizado correctamente'})
+        key = 'admin-products:' + request.query_string.decode()
+        etag, last_modified = catalog_validators(key)
+        return conditional_json(etag, last_modified,
+                                lambda: catalog_cache.get_or_set(key, load_products))
     except Exception as e:
-        print(f"Error actualizando producto: {e}")
-        return jsonify({'error': str(e)}), 500
+        print(f"Error obteniendo productos: {e}")
+        return jsonify([])
 
-@dashboard_bp.route('/api/products/<int:product_id>', methods=['DELETE'])
-@login_required
-def delete_product(product_id):
-    try:
-        from app.models import Product
-        product = Product.query.get_or_404(product_id)
-        db.session.delete(product)
-        db.session.commit()
-        return jsonify({'message': 'Producto eliminado correctamente'})
-    except Exception as e:
-        print(f"Error eliminando producto: {e}")
-        return jsonify({'error': str(e)}), 500
-    
 # Rutas para gestión de usuarios
 @dashboard_bp.route('/api/users')
 @login_required
 def get_users():
+    """Usuarios paginados por cursor, del más nuevo al más antiguo.
+    
+    ?q= (prefijo de nombre o email), ?role=admin|user, ?order=desc|asc,
+    ?limit=N y ?after=<next_cursor>. El total sale de un contador.
+    """
     try:
-        from app.models import User
-        users = User.query.all()
-        return jsonify([{
-            'id': user.idUser,
-            'name': user.nameUser,
-            'email': user.emailUser,
-            'role': 'Administrador' if user.is_admin else 'Usuario',
-            'created_at': user.created_at.strftime('%Y-%m-%d %H:%M') if user.created_at else 'N/A',
-            'status': 'Activo'
-        } for user in users])
+        from app.user_directory import ROLES, user_page
+        
+        role = request.args.get('role') or None
+        if role is not None and role not in ROLES:
+            return jsonify({'error': f"role debe ser uno de: {', '.join(ROLES)}"}), 400
+        try:
+            page = user_page(
+                q=request.args.get('q', '').strip() or None,
+                role=role,
+                after=request.args.get('after') or None,
+                limit=parse_limit(request.args.get('limit')),
+                descending=request.args.get('order', 'desc').lower() != 'asc'
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page)
     except Exception as e:
         print(f"Error obteniendo usuarios: {e}")
         return jsonify({'error': str(e)}), 500
@@ -185,6 +236,7 @@ def delete_user(user_id):
         
         db.session.delete(user)
         db.session.commit()
+        publish_user(user_id, change='deleted')
         return jsonify({'message': 'Usuario eliminado correctamente'})
     except Exception as e:
         print(f"Error eliminando usuario: {e}")
@@ -237,49 +289,186 @@ def add_category():
         return jsonify({'error': str(e)}), 500
 
 # Rutas para pedidos
+# Clave de orden de la grilla (columna, conversión desde el cursor); idOrder desempata
+ORDER_SORT_KEYS = {
+    'date': [('orderDate', datetime.fromisoformat), ('idOrder', int)],
+    'amount': [('totalAmount', lambda value: Decimal(str(value))), ('idOrder', int)],
+    'id': [('idOrder', int)],
+}
+
+
+def orders_grid_query(statuses=(), date_from=None, date_to=None):
+    """Pedidos de la grilla con cliente y conteos, filtrados y sin orden (ver get_orders)."""
+    from app.models import Order, OrderDetail, User
+    
+    items = db.select(db.func.count(OrderDetail.idOrderDetail)) \
+        .where(OrderDetail.idOrder == Order.idOrder).scalar_subquery()
+    units = db.select(db.func.coalesce(db.func.sum(OrderDetail.quantity), 0)) \
+        .where(OrderDetail.idOrder == Order.idOrder).scalar_subquery()
+    query = db.session.query(
+        Order.idOrder, Order.orderDate, Order.totalAmount, Order.status,
+        User.nameUser, items.label('items'), units.label('units')
+    ).outerjoin(User, User.idUser == Order.idUser)
+    if statuses:
+        query = query.filter(Order.status.in_(statuses))
+    if date_from:
+        query = query.filter(Order.orderDate >= date_from)
+    if date_to:
+        query = query.filter(Order.orderDate < date_to + timedelta(days=1))
+    return query
+
 @dashboard_bp.route('/api/orders')
 @login_required
 def get_orders():
+    """Grilla de pedidos paginada por cursor.
+    
+    ?status= (repetible), ?date_from=&date_to= (YYYY-MM-DD, inclusive),
+    ?sort=date|amount|id, ?order=desc|asc, ?limit=N y ?after=<next_cursor>.
+    Una sola consulta por página: cliente por JOIN y conteo de líneas por
+    subconsulta sobre el índice de order_detail.
+    """
     try:
-        from app.models import Order, User
-        orders = Order.query.all()
-        return jsonify([{
-            'id': order.idOrder,
-            'customer': order.user.nameUser if order.user else 'Cliente',
-            'date': order.orderDate.strftime('%d/%m/%Y'),
-            'amount': float(order.totalAmount),
-            'status': order.status,
-            'items': order.items_count if hasattr(order, 'items_count') else 0
-        } for order in orders])
+        from app.models import Order
+        
+        sort_keys = ORDER_SORT_KEYS
+        sort = request.args.get('sort', 'date')
+        if sort not in sort_keys:
+            return jsonify({'error': f"sort debe ser uno de: {', '.join(sort_keys)}"}), 400
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        columns = [getattr(Order, name) for name, _ in sort_keys[sort]]
+        parsers = [parse for _, parse in sort_keys[sort]]
+        
+        statuses = request.args.getlist('status')
+        valid_statuses = set(Order.status.type.enums)
+        if any(status not in valid_statuses for status in statuses):
+            return jsonify({'error': f"status debe ser uno de: {', '.join(Order.status.type.enums)}"}), 400
+        try:
+            after = decode_cursor(request.args['after'], parsers) if request.args.get('after') else None
+            date_from = datetime.strptime(request.args['date_from'], '%Y-%m-%d') if request.args.get('date_from') else None
+            date_to = datetime.strptime(request.args['date_to'], '%Y-%m-%d') if request.args.get('date_to') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = parse_limit(request.args.get('limit'))
+        rows, has_next = seek_page(orders_grid_query(statuses, date_from, date_to), columns,
+                                   after=after, limit=limit, descending=descending)
+        next_cursor = encode_cursor([getattr(rows[-1], name) for name, _ in sort_keys[sort]]) if has_next else None
+        return jsonify({
+            'items': [{
+                'id': row.idOrder,
+                'customer': row.nameUser or 'Cliente',
+                'date': row.orderDate.strftime('%d/%m/%Y') if row.orderDate else None,
+                'amount': float(row.totalAmount),
+                'status': row.status,
+                'items': row.items,
+                'units': int(row.units)
+            } for row in rows],
+            'next_cursor': next_cursor,
+            'limit': limit
+        })
     except Exception as e:
         print(f"Error obteniendo pedidos: {e}")
-        # Datos de ejemplo
-        return jsonify([
-            {'id': 'ORD001', 'customer': 'María García', 'date': '15/03/2023', 'amount': 125.50, 'status': 'Completado', 'items': 2},
-            {'id': 'ORD002', 'customer': 'Carlos López', 'date': '16/03/2023', 'amount': 89.99, 'status': 'Procesando', 'items': 1},
-            {'id': 'ORD003', 'customer': 'Ana Martínez', 'date': '17/03/2023', 'amount': 210.75, 'status': 'Enviado', 'items': 3}
-        ])
+        return jsonify({'error': str(e)}), 500
 
 # Rutas para reportes
+@dashboard_bp.route('/api/export/<name>')
+@login_required
+@admin_required
+def export_data(name):
+    """Descarga completa de orders/products/users en CSV o NDJSON (?format=).
+    
+    Las filas se leen con un cursor del servidor y se envían por trozos a
+    medida que llegan (ver app/exporter.py).
+    """
+    from app.exporter import DEFAULT_CHUNK_SIZE, MIMETYPES, export_chunks, validate_export
+    
+    fmt = request.args.get('format', 'csv').lower()
+    error = validate_export(name, fmt)
+    if error:
+        return jsonify({'error': error}), 400
+    chunk_size = max(1, min(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int), 10000))
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return current_app.response_class(
+        stream_with_context(export_chunks(name, fmt, chunk_size)),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                 'X-Accel-Buffering': 'no'}
+    )
+
 @dashboard_bp.route('/api/reports/sales')
 @login_required
 def get_sales_report():
+    """Reporte de ventas de un rango de fechas.
+    
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive; por defecto los últimos 12
+    meses) y ?granularity=day,week,month para elegir las series.
+    """
     try:
-        # Aquí iría la lógica para generar reportes de ventas
-        return jsonify({
-            'total_sales': 15000.75,
-            'average_order': 125.50,
-            'top_categories': [
-                {'name': 'Vestidos', 'sales': 6500.25},
-                {'name': 'Pantalones', 'sales': 4200.50},
-                {'name': 'Camisas', 'sales': 4300.00}
-            ],
-            'sales_trend': [1200, 1900, 3000, 2500, 2800, 3200]  # Últimos 6 meses
-        })
+        from app.reports import GRANULARITIES, MAX_RANGE_DAYS, default_range, sales_report
+        
+        start, end = default_range()
+        try:
+            if request.args.get('end'):
+                end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+                start = end - timedelta(days=364)
+            if request.args.get('start'):
+                start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Las fechas deben tener el formato YYYY-MM-DD'}), 400
+        if start > end or (end - start).days >= MAX_RANGE_DAYS:
+            return jsonify({'error': f'Rango inválido (máximo {MAX_RANGE_DAYS} días)'}), 400
+        
+        granularities = [g for g in request.args.get('granularity', ','.join(GRANULARITIES)).split(',')
+                         if g in GRANULARITIES] or list(GRANULARITIES)
+        report = sales_report(start, end, granularities)
+        # Compatibilidad: serie mensual de ingresos como lista simple
+        if 'month' in report['revenue_by']:
+            report['sales_trend'] = [period['revenue'] for period in report['revenue_by']['month']]
+        return jsonify(report)
     except Exception as e:
         print(f"Error generando reporte: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Análisis de pedidos (ver app/analytics.py): se calculan juntos y se guardan en disco
+@dashboard_bp.route('/api/analytics/cohorts')
+@login_required
+@admin_required
+def get_analytics_cohorts():
+    """Cohortes por mes de alta: compradores, recompra y retención mensual."""
+    try:
+        from app.analytics import cached_reports, cohorts_json
+        
+        return jsonify(cohorts_json(cached_reports()))
+    except Exception as e:
+        print(f"Error calculando cohortes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@dashboard_bp.route('/api/analytics/basket')
+@login_required
+@admin_required
+def get_analytics_basket():
+    """Tamaño de canasta: promedio, mediana, histograma y promedio por mes."""
+    try:
+        from app.analytics import basket_json, cached_reports
+        
+        return jsonify(basket_json(cached_reports()))
+    except Exception as e:
+        print(f"Error calculando tamaño de canasta: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@dashboard_bp.route('/api/analytics/category-affinity')
+@login_required
+@admin_required
+def get_analytics_category_affinity():
+    """Matriz de pedidos que combinan cada par de categorías y su lift."""
+    try:
+        from app.analytics import affinity_json, cached_reports
+        
+        return jsonify(affinity_json(cached_reports()))
+    except Exception as e:
+        print(f"Error calculando afinidad de categorías: {e}")
+        return jsonify({'error': str(e)}), 500
+
 # Ruta para configuración
 @dashboard_bp.route('/api/config')
 @login_required
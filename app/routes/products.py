@@ -2,27 +2,241 @@ from flask import Blueprint, jsonify, request, render_template
 from flask_login import login_required
 from app import db
 from app.models import Product
+from app.cache import catalog_cache
+from app.events import publish_stock
+from app.conditional import (catalog_validators, conditional_json, if_match_failed,
+                              product_etag, product_validators)
+from app.pagination import MAX_LIMIT, keyset_page, parse_limit
+from app.search import search_product_ids
+from app.facets import FacetFilters, facet_counts
+from app.recommendations import recommended_products
+from app.leaderboard import PERIODS, top_products
+from app.importer import DEFAULT_BATCH_SIZE, import_products, validate_product
+from app.reservations import available_stock
+from datetime import date, datetime
 from decimal import Decimal
+from sqlalchemy.orm.exc import StaleDataError
 
 products_bp = Blueprint('products', __name__)
 
+# Campos expuestos por la API y la columna que los respalda (para ?fields=)
+PRODUCT_FIELDS = {
+    'id': Product.idProduct,
+    'name': Product.nameProduct,
+    'description': Product.description,
+    'price': Product.price,
+    'image_url': Product.image,
+    'category': Product.category,
+    'stock': Product.stock,
+    'status': Product.status,
+}
+for _extra in ('details', 'size', 'color'):
+    if hasattr(Product, _extra):
+        PRODUCT_FIELDS[_extra] = getattr(Product, _extra)
+
+LIST_FIELDS = ['id', 'name', 'description', 'price', 'image_url',
+               'category', 'stock', 'status', 'details']
+CATEGORY_FIELDS = ['id', 'name', 'description', 'price', 'image_url',
+                   'category', 'stock', 'status']
+BULK_CHUNK_SIZE = 1000
+
+
+def _requested_fields(default):
+    """Lee ?fields=a,b,c y devuelve solo los campos válidos ('id' siempre va incluido)."""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+    fields = [f.strip() for f in raw.split(',') if f.strip() in PRODUCT_FIELDS]
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def _projected_query(fields):
+    """Consulta que selecciona solo las columnas necesarias para `fields`."""
+    columns = [PRODUCT_FIELDS[f].label(f) for f in fields if f in PRODUCT_FIELDS]
+    # image_url usa el nombre como texto del placeholder
+    if 'image_url' in fields and 'name' not in fields:
+        columns.append(Product.nameProduct.label('name'))
+    return db.session.query(*columns)
+
+
+def _serialize_row(row, fields):
+    """Convierte una fila proyectada al formato JSON de la API."""
+    data = {}
+    for field in fields:
+        value = getattr(row, field, '')
+        if field == 'price':
+            value = float(value)
+        elif field in ('description', 'details'):
+            value = value or ''
+        elif field == 'image_url':
+            value = value or f'https://via.placeholder.com/250x300/f8f9fa/000?text={row.name}'
+        data[field] = value
+    return data
+
+
+def _product_dict(product):
+    """Columnas de un Product como dict serializable en JSON (para cachear y usar en plantillas)."""
+    data = {}
+    for column in Product.__table__.columns:
+        value = getattr(product, column.name)
+        data[column.name] = value.isoformat() if isinstance(value, (datetime, date)) else value
+    data['price'] = float(product.price)
+    return data
+
+
+def product_listing_query(fields, *filters):
+    """Productos activos que cumplen `filters`, con las columnas de `fields` (sin orden)."""
+    return _projected_query(fields).filter(Product.status == 'Activo', *filters)
+
+
+def same_category_query(product_id, category, limit=4):
+    """Otros productos activos de la categoría: respaldo de "comprados juntos"."""
+    return Product.query.filter(
+        Product.category == category,
+        Product.idProduct != product_id,
+        Product.status == 'Activo'
+    ).order_by(Product.idProduct).limit(limit)
+
+
+def _product_listing(default_fields, *filters):
+    """Datos comunes de los listados: completos o por cursor (?after=&limit=)."""
+    fields = _requested_fields(default_fields)
+    query = product_listing_query(fields, *filters)
+    
+    # Modo cursor solo si se pide explícitamente, para no romper clientes actuales
+    if 'after' not in request.args and 'limit' not in request.args:
+        return [_serialize_row(row, fields) for row in query.order_by(Product.idProduct).all()]
+    
+    after = request.args.get('after', type=int)
+    limit = parse_limit(request.args.get('limit'))
+    rows, has_next, _ = keyset_page(query, Product.idProduct, after=after, limit=limit)
+    return {
+        'items': [_serialize_row(row, fields) for row in rows],
+        'next_cursor': rows[-1].id if has_next else None,
+        'limit': limit
+    }
+
+
 @products_bp.route('/api/products', methods=['GET'])
 def get_products():
-    """Obtener todos los productos activos (API JSON)"""
+    """Obtener los productos activos (API JSON).
+    
+    Soporta ?after=<idProduct>&limit=N (paginación por cursor) y ?fields=a,b,c.
+    """
     try:
-        # OBTENER TODOS LOS PRODUCTOS ACTIVOS SIN LÍMITE
-        products = Product.query.filter_by(status='Activo').all()
-        return jsonify([{
-            'id': product.idProduct,
-            'name': product.nameProduct,
-            'description': product.description or '',
-            'price': float(product.price),
-            'image_url': product.image or f'https://via.placeholder.com/250x300/f8f9fa/000?text={product.nameProduct}',
-            'category': product.category,
-            'stock': product.stock,
-            'status': product.status,
-            'details': getattr(product, 'details', '')  # Detalles adicionales si existen
-        } for product in products])
+        key = 'products:' + request.query_string.decode()
+        etag, last_modified = catalog_validators(key, Product.status == 'Activo')
+        return conditional_json(etag, last_modified,
+                                lambda: catalog_cache.get_or_set(key, lambda: _product_listing(LIST_FIELDS)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/api/products/search', methods=['GET'])
+def search_products():
+    """Búsqueda de texto completo sobre nombre, descripción y detalles.
+    
+    ?q=<texto>&limit=N&fields=a,b,c — resultados ordenados por relevancia.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'El parámetro q es requerido'}), 400
+        
+        ranked = search_product_ids(query, limit=parse_limit(request.args.get('limit'), default=20))
+        fields = _requested_fields(LIST_FIELDS)
+        rows = {}
+        if ranked:
+            rows = {
+                row.id: row for row in
+                _projected_query(fields).filter(Product.idProduct.in_([pid for pid, _ in ranked])).all()
+            }
+        
+        results = []
+        for product_id, score in ranked:
+            if product_id in rows:
+                item = _serialize_row(rows[product_id], fields)
+                item['score'] = round(score, 4)
+                results.append(item)
+        return jsonify({'query': query, 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/api/products/filter', methods=['GET'])
+def filter_products():
+    """Filtrado facetado del catálogo.
+    
+    ?category=&size=&color= (repetibles), ?min_price=&max_price=, ?in_stock=1|0,
+    más ?after=&limit=&fields=. La respuesta incluye los conteos por faceta.
+    """
+    try:
+        in_stock = request.args.get('in_stock')
+        filters = FacetFilters(
+            category=request.args.getlist('category'),
+            size=request.args.getlist('size'),
+            color=request.args.getlist('color'),
+            in_stock=None if in_stock is None else in_stock.lower() in ('1', 'true', 'si', 'sí'),
+            price_min=request.args.get('min_price', type=float),
+            price_max=request.args.get('max_price', type=float)
+        )
+        
+        fields = _requested_fields(LIST_FIELDS)
+        limit = parse_limit(request.args.get('limit'))
+        query = _projected_query(fields).filter(*filters.product_conditions())
+        rows, has_next, _ = keyset_page(query, Product.idProduct,
+                                        after=request.args.get('after', type=int), limit=limit)
+        facets, total = facet_counts(filters)
+        
+        return jsonify({
+            'items': [_serialize_row(row, fields) for row in rows],
+            'next_cursor': rows[-1].id if has_next else None,
+            'limit': limit,
+            'total': total,
+            'facets': facets
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/api/products/availability', methods=['GET'])
+def product_availability():
+    """Unidades disponibles (stock - reservas vigentes) por producto.
+    
+    ?ids=1,2,3 (máximo MAX_LIMIT). No se cachea: las reservas cambian sin
+    pasar por las escrituras del catálogo.
+    """
+    try:
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids debe ser una lista de enteros separados por comas'}), 400
+        if not ids or len(ids) > MAX_LIMIT:
+            return jsonify({'error': f'Se requieren entre 1 y {MAX_LIMIT} ids'}), 400
+        
+        available = available_stock(ids)
+        return jsonify({
+            'availability': [{'id': product_id, 'available': max(available[product_id], 0)}
+                             for product_id in ids if product_id in available]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/api/products/trending', methods=['GET'])
+def trending_products():
+    """Más vendidos activos: ?period=7d|30d|all (por defecto 7d) y ?limit=N (máximo 50).
+    
+    Se lee del índice del ranking (ver app/leaderboard.py); el caché cambia
+    con cada pedido (versión del catálogo) y con el día UTC.
+    """
+    try:
+        period = request.args.get('period', '7d')
+        if period not in PERIODS:
+            return jsonify({'error': f"period debe ser uno de: {', '.join(PERIODS)}"}), 400
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        key = f'trending:{period}:{limit}:{datetime.utcnow().date()}'
+        products = catalog_cache.get_or_set(
+            key, lambda: top_products(period, limit=limit, active_only=True))
+        return jsonify({'period': period, 'products': products})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -31,18 +245,23 @@ def get_products():
 def product_detail(product_id):
     """Página de detalles del producto (HTML)"""
     try:
-        product = Product.query.get_or_404(product_id)
-        
-        # Productos relacionados (misma categoría)
-        related_products = Product.query.filter(
-            Product.category == product.category,
-            Product.idProduct != product_id,
-            Product.status == 'Activo'
-        ).limit(4).all()
+        def load_page():
+            product = Product.query.get_or_404(product_id)
+            
+            # Comprados juntos con frecuencia (índice precalculado)
+            related_products = recommended_products(product_id, limit=4)
+            if not related_products:
+                # Sin historial de pedidos: productos de la misma categoría
+                related_products = same_category_query(product_id, product.category).all()
+            return {
+                'product': _product_dict(product),
+                'related_products': [_product_dict(related) for related in related_products]
+            }
         
+        page = catalog_cache.get_or_set(f'product-page:{product_id}', load_page)
         return render_template('product_detail.html', 
-                             product=product, 
-                             related_products=related_products)
+                             product=page['product'], 
+                             related_products=page['related_products'])
     except Exception as e:
         return render_template('error404.html'), 404
 
@@ -50,20 +269,29 @@ def product_detail(product_id):
 def get_product_detail(product_id):
     """Obtener detalles específicos de un producto (API JSON)"""
     try:
-        product = Product.query.get_or_404(product_id)
-        return jsonify({
-            'id': product.idProduct,
-            'name': product.nameProduct,
-            'description': product.description or '',
-            'price': float(product.price),
-            'image_url': product.image or f'https://via.placeholder.com/300x300/f8f9fa/000?text={product.nameProduct}',
-            'category': product.category,
-            'stock': product.stock,
-            'status': product.status,
-            'details': getattr(product, 'details', ''),
-            'size': getattr(product, 'size', 'No especificado'),
-            'color': getattr(product, 'color', 'No especificado')
-        })
+        def load_product():
+            product = Product.query.get_or_404(product_id)
+            return {
+                'id': product.idProduct,
+                'name': product.nameProduct,
+                'description': product.description or '',
+                'price': float(product.price),
+                'image_url': product.image or f'https://via.placeholder.com/300x300/f8f9fa/000?text={product.nameProduct}',
+                'category': product.category,
+                'stock': product.stock,
+                'status': product.status,
+                'details': getattr(product, 'details', ''),
+                'size': getattr(product, 'size', 'No especificado'),
+                'color': getattr(product, 'color', 'No especificado'),
+                'version': product.version
+            }
+        
+        validators = product_validators(product_id)
+        if validators is None:
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        etag, last_modified = validators
+        return conditional_json(etag, last_modified,
+                                lambda: catalog_cache.get_or_set(f'product:{product_id}', load_product))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -77,52 +305,21 @@ def add_product():
             data = request.get_json()
         else:
             data = request.form.to_dict()
-            # Convertir tipos de datos para form data
-            if 'price' in data:
-                data['price'] = float(data['price'])
-            if 'stock' in data:
-                data['stock'] = int(data['stock'])
         
-        # Validar campos requeridos
-        required_fields = ['name', 'category', 'price', 'stock']
-        missing_fields = [field for field in required_fields if field not in data or not data[field]]
-        
-        if missing_fields:
+        # Validar campos requeridos y tipos de datos (mismas reglas que la importación masiva)
+        values, error = validate_product(data)
+        if error:
             return jsonify({
                 'success': False, 
-                'message': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
-            }), 400
-        
-        # Validar tipos de datos
-        try:
-            price = float(data['price'])
-            stock = int(data['stock'])
-        except (ValueError, TypeError):
-            return jsonify({
-                'success': False,
-                'message': 'Precio y stock deben ser valores numéricos'
+                'message': error
             }), 400
         
-        new_product = Product(
-            nameProduct=data['name'],
-            category=data['category'],
-            price=price,
-            stock=stock,
-            description=data.get('description', ''),
-            image=data.get('image', ''),
-            status='Activo' if stock > 0 else 'Inactivo'
-        )
-        
-        # Añadir campos adicionales si existen en el modelo
-        if hasattr(Product, 'details') and 'details' in data:
-            new_product.details = data['details']
-        if hasattr(Product, 'size') and 'size' in data:
-            new_product.size = data['size']
-        if hasattr(Product, 'color') and 'color' in data:
-            new_product.color = data['color']
+        new_product = Product(**values)
         
         db.session.add(new_product)
         db.session.commit()
+        catalog_cache.bump()
+        publish_stock([new_product.idProduct], change='created')
         
         return jsonify({
             'success': True,
@@ -140,12 +337,140 @@ def add_product():
             'message': f'Error al agregar el producto: {str(e)}'
         }), 500
 
+@products_bp.route('/api/products/import', methods=['POST'])
+@login_required
+def import_products_endpoint():
+    """Importación masiva de productos desde CSV o NDJSON.
+    
+    Acepta el archivo como multipart (campo `file`) o como cuerpo de la
+    petición; el formato se toma de ?format= o de la extensión del archivo.
+    """
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        fmt = request.args.get('format')
+        if not fmt:
+            filename = (upload.filename if upload else '') or ''
+            fmt = 'ndjson' if filename.endswith(('.ndjson', '.jsonl')) or \
+                (not upload and 'ndjson' in (request.content_type or '')) else 'csv'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'success': False, 'message': 'Formato no soportado (csv o ndjson)'}), 400
+        
+        batch_size = request.args.get('batch_size', DEFAULT_BATCH_SIZE, type=int)
+        result = import_products(stream, fmt=fmt, batch_size=max(1, min(batch_size, 10000)))
+        if result.inserted:
+            catalog_cache.bump()
+            publish_stock(result.product_ids, change='created')
+        
+        return jsonify({'success': result.failed == 0, **result.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error al importar productos: {str(e)}'
+        }), 500
+
+def _parse_bulk_changes(payload):
+    """Valida [{id, stock?, price?}]; devuelve (cambios, errores)."""
+    changes, errors = {}, []
+    if not isinstance(payload, list):
+        return [], [{'index': None, 'error': 'Se esperaba una lista de cambios'}]
+    for index, item in enumerate(payload):
+        try:
+            product_id = int(item['id'])
+            stock = int(item['stock']) if item.get('stock') is not None else None
+            price = float(item['price']) if item.get('price') is not None else None
+        except (KeyError, ValueError, TypeError):
+            errors.append({'index': index, 'error': 'id, stock y price deben ser numéricos'})
+            continue
+        if stock is None and price is None:
+            errors.append({'index': index, 'error': 'Indica stock y/o price'})
+        elif (stock is not None and stock < 0) or (price is not None and price < 0):
+            errors.append({'index': index, 'error': 'stock y price no pueden ser negativos'})
+        else:
+            # Si un id se repite, gana el último cambio
+            changes[product_id] = {'b_id': product_id, 'b_stock': stock, 'b_price': price}
+    return list(changes.values()), errors
+
+
+@products_bp.route('/api/products/bulk', methods=['PATCH'])
+@login_required
+def bulk_update_products():
+    """Actualización masiva de stock y/o precio.
+    
+    Cuerpo: [{"id": 1, "stock": 10}, {"id": 2, "price": 99.9}, ...] (o {"items": [...]}).
+    Todo se aplica en una sola transacción con UPDATEs por lotes; el status
+    ('Activo'/'Inactivo') se recalcula en SQL a partir del stock resultante.
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('items')
+        changes, errors = _parse_bulk_changes(payload)
+        if errors:
+            return jsonify({'success': False, 'message': 'Cambios inválidos', 'errors': errors}), 400
+        
+        ids = [change['b_id'] for change in changes]
+        existing = set()
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            existing.update(db.session.scalars(
+                db.select(Product.idProduct).where(Product.idProduct.in_(ids[start:start + BULK_CHUNK_SIZE]))
+            ))
+        changes = [change for change in changes if change['b_id'] in existing]
+        
+        new_stock = db.func.coalesce(db.bindparam('b_stock', type_=db.Integer), Product.stock)
+        statement = db.update(Product.__table__).where(
+            Product.idProduct == db.bindparam('b_id')
+        ).values(
+            stock=new_stock,
+            price=db.func.coalesce(db.bindparam('b_price', type_=db.Numeric(10, 2)), Product.price),
+            status=db.case((new_stock > 0, 'Activo'), else_='Inactivo'),
+            # Fuera del ORM la versión se incrementa a mano (invalida los If-Match pendientes)
+            version=Product.version + 1
+        )
+        for start in range(0, len(changes), BULK_CHUNK_SIZE):
+            db.session.execute(statement, changes[start:start + BULK_CHUNK_SIZE])
+        db.session.commit()
+        if changes:
+            catalog_cache.bump()
+            publish_stock(change['b_id'] for change in changes)
+        
+        return jsonify({
+            'success': True,
+            'updated': len(changes),
+            'not_found': sorted(set(ids) - existing)
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error en la actualización masiva: {str(e)}'
+        }), 500
+
+def _version_conflict(product):
+    """409 con la versión vigente del producto (o 404 si ya no existe)."""
+    if product is None:
+        return jsonify({'success': False, 'message': 'Producto no encontrado'}), 404
+    response = jsonify({
+        'success': False,
+        'message': 'El producto fue modificado por otra persona; recarga los datos e intenta de nuevo',
+        'version': product.version
+    })
+    response.set_etag(product_etag(product.idProduct, product.version))
+    return response, 409
+
 @products_bp.route('/api/products/<int:product_id>', methods=['PUT'])
 @login_required
 def update_product(product_id):
-    """Actualizar producto existente"""
+    """Actualizar producto existente
+    
+    Acepta If-Match con el ETag de GET /api/products/<id>; si el producto
+    cambió desde entonces (o cambia durante la petición) responde 409.
+    """
     try:
         product = Product.query.get_or_404(product_id)
+        if if_match_failed(product_etag(product.idProduct, product.version)):
+            return _version_conflict(product)
         
         # Verificar si es JSON o form data
         if request.is_json:
@@ -193,16 +518,27 @@ def update_product(product_id):
         if hasattr(product, 'color') and 'color' in data:
             product.color = data['color']
         
-        # Actualizar estado basado en stock
-        product.status = 'Activo' if product.stock > 0 else 'Inactivo'
+        # Estado explícito del panel o, si no viene, según el stock
+        if data.get('status') in ('Activo', 'Inactivo'):
+            product.status = data['status']
+        else:
+            product.status = 'Activo' if product.stock > 0 else 'Inactivo'
         
         db.session.commit()
+        catalog_cache.bump()
+        publish_stock([product_id])
         
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'message': 'Producto actualizado correctamente'
+            'message': 'Producto actualizado correctamente',
+            'version': product.version
         })
+        response.set_etag(product_etag(product.idProduct, product.version))
+        return response
         
+    except StaleDataError:
+        db.session.rollback()
+        return _version_conflict(db.session.get(Product, product_id))
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -218,6 +554,8 @@ def delete_product(product_id):
         product = Product.query.get_or_404(product_id)
         db.session.delete(product)
         db.session.commit()
+        catalog_cache.bump()
+        publish_stock([product_id], change='deleted')
         
         return jsonify({
             'success': True,
@@ -235,21 +573,6 @@ def delete_product(product_id):
 def get_products_by_category(category_name):
     """Obtener productos por categoría"""
     try:
-        products = Product.query.filter_by(
-            category=category_name, 
-            status='Activo'
-        ).all()
-        
-        return jsonify([{
-            'id': product.idProduct,
-            'name': product.nameProduct,
-            'description': product.description or '',
-            'price': float(product.price),
-            'image_url': product.image or f'https://via.placeholder.com/250x300/f8f9fa/000?text={product.nameProduct}',
-            'category': product.category,
-            'stock': product.stock,
-            'status': product.status
-        } for product in products])
-        
+        return jsonify(_product_listing(CATEGORY_FIELDS, Product.category == category_name))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,123 @@
+"""Búsqueda de texto completo sobre el catálogo.
+
+- SQLite: tabla virtual FTS5 de contenido externo (``product_fts``) que se
+  mantiene sincronizada con ``product`` mediante triggers, así que cualquier
+  INSERT/UPDATE/DELETE (ORM, blueprints o SQL directo) actualiza el índice.
+- MySQL: índice FULLTEXT sobre (nameProduct, description, details), que el
+  propio motor mantiene en cada escritura.
+"""
+import re
+
+from sqlalchemy import text
+
+from app import db
+
+SEARCH_COLUMNS = ('nameProduct', 'description', 'details')
+MYSQL_FULLTEXT_INDEX = 'ft_product_search'
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        nameProduct, description, details,
+        content='product', content_rowid='idProduct',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, nameProduct, description, details)
+        VALUES (new.idProduct, new.nameProduct, new.description, new.details);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, nameProduct, description, details)
+        VALUES ('delete', old.idProduct, old.nameProduct, old.description, old.details);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_au
+    AFTER UPDATE OF nameProduct, description, details ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, nameProduct, description, details)
+        VALUES ('delete', old.idProduct, old.nameProduct, old.description, old.details);
+        INSERT INTO product_fts(rowid, nameProduct, description, details)
+        VALUES (new.idProduct, new.nameProduct, new.description, new.details);
+    END
+    """,
+]
+
+
+def init_search_index():
+    """Crea el índice de texto del backend actual si todavía no existe."""
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == 'sqlite':
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'"
+            )).first()
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                # Indexar los productos que ya existían antes del índice
+                conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+        elif dialect == 'mysql':
+            exists = conn.execute(text(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'product' AND index_name = :name"
+            ), {'name': MYSQL_FULLTEXT_INDEX}).first()
+            if not exists:
+                conn.execute(text(
+                    f"ALTER TABLE product ADD FULLTEXT {MYSQL_FULLTEXT_INDEX} "
+                    f"({', '.join(SEARCH_COLUMNS)})"
+                ))
+
+
+def _terms(query):
+    """Palabras de la consulta, sin la sintaxis especial de FTS5/MySQL."""
+    return re.findall(r'\w+', query or '', flags=re.UNICODE)
+
+
+def search_product_ids(query, limit=20, only_active=True):
+    """Devuelve [(idProduct, score)] ordenados por relevancia (mayor score primero)."""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    dialect = db.engine.dialect.name
+    status_filter = "AND p.status = 'Activo'" if only_active else ''
+
+    if dialect == 'sqlite':
+        # Cada término como prefijo; bm25 pondera más el nombre que la descripción
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = f"""
+            SELECT p.idProduct, -bm25(product_fts, 10.0, 2.0, 1.0) AS score
+            FROM product_fts
+            JOIN product p ON p.idProduct = product_fts.rowid
+            WHERE product_fts MATCH :match {status_filter}
+            ORDER BY score DESC
+            LIMIT :limit
+        """
+        params = {'match': match, 'limit': limit}
+    elif dialect == 'mysql':
+        against = f"MATCH (p.{', p.'.join(SEARCH_COLUMNS)}) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+        sql = f"""
+            SELECT p.idProduct, {against} AS score
+            FROM product p
+            WHERE {against} {status_filter}
+            ORDER BY score DESC
+            LIMIT :limit
+        """
+        params = {'q': ' '.join(terms), 'limit': limit}
+    else:
+        # Backend sin índice de texto: coincidencia simple por nombre
+        sql = f"""
+            SELECT p.idProduct, 1.0 AS score
+            FROM product p
+            WHERE lower(p.nameProduct) LIKE :pattern {status_filter}
+            ORDER BY p.idProduct
+            LIMIT :limit
+        """
+        params = {'pattern': f"%{' '.join(terms).lower()}%", 'limit': limit}
+
+    rows = db.session.execute(text(sql), params).all()
+    return [(row[0], float(row[1])) for row in rows]
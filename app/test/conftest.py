@@ -22,4 +22,26 @@ def user(app):
     db.session.add(user)
     db.session.commit()  # Commit changes within the context
     yield user    
-  # Cleanup changes within the context
\ No newline at end of file
+  # Cleanup changes within the context
+
+
+@pytest.fixture
+def admin_client(app, client):
+    """Cliente con la sesión del administrador creado por create_app()."""
+    from app.models import User
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.idUser)
+    return client
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    """App sobre una base SQLite en archivo, para pruebas con varios hilos."""
+    from config import Config
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'shop.db'}")
+    monkeypatch.setattr(Config, 'SQLALCHEMY_ENGINE_OPTIONS', {'connect_args': {'timeout': 30}}, raising=False)
+    app = create_app()
+    yield app
+    with app.app_context():
+        db.drop_all()
@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import analytics, db
+from app.analytics_benchmark import naive_reports, reports_match, synthetic_dataset
+from app.models import Order, OrderDetail, Product, User
+from app.rollups import record_sale
+
+
+def _seed():
+    users = [User(nameUser=name, emailUser=f'{name}@mail.com', passwordUser='x', created_at=datetime(2024, month, day))
+             for name, month, day in [('ana', 1, 15), ('beto', 1, 20), ('carla', 2, 3)]]
+    products = [Product(nameProduct=name, category=category, price=10, stock=50, status='Activo')
+                for name, category in [('Camisa', 'Camisas'), ('Sombrero', 'Accesorios'), ('Pantalón', 'Pantalones')]]
+    db.session.add_all(users + products)
+    db.session.commit()
+    ana, beto, carla = users
+    shirt, hat, pants = products
+    for user, when, lines in [(ana, datetime(2024, 1, 16), [(shirt, 2), (hat, 1)]),
+                              (ana, datetime(2024, 3, 2), [(shirt, 1)]),
+                              (beto, datetime(2024, 1, 25), [(pants, 4)]),
+                              (carla, datetime(2024, 2, 10), [(hat, 1), (pants, 1)])]:
+        _order(user, when, lines)
+    return users, products
+
+
+def _order(user, when, lines):
+    order = Order(idUser=user.idUser, orderDate=when, totalAmount=10 * sum(q for _, q in lines), status='Completado')
+    db.session.add(order)
+    db.session.flush()
+    db.session.add_all([OrderDetail(idOrder=order.idOrder, idProduct=product.idProduct, quantity=quantity, price=10)
+                        for product, quantity in lines])
+    # Como en el checkout: el pedido se suma a los agregados en la misma transacción
+    record_sale(when, [(product.idProduct, quantity, 10, product.category) for product, quantity in lines])
+    db.session.commit()
+
+
+def test_analytics_endpoints(admin_client, app, tmp_path):
+    app.config['ANALYTICS_CACHE_DIR'] = str(tmp_path)
+    _seed()
+
+    cohorts = {c['month']: c for c in admin_client.get('/api/analytics/cohorts').get_json()['cohorts']}
+    january = cohorts['2024-01']
+    assert (january['users'], january['buyers'], january['repeat_buyers'], january['repeat_rate']) == (2, 2, 1, 0.5)
+    assert january['retention'][:3] == [2, 0, 1]
+    assert cohorts['2024-02']['retention'][:3] == [1, 0, 0]
+
+    basket = admin_client.get('/api/analytics/basket').get_json()
+    assert (basket['orders'], basket['average_units'], basket['average_lines'], basket['median_units']) == (4, 2.5, 1.5, 2.5)
+    assert [h['orders'] for h in basket['histogram'][:4]] == [1, 1, 1, 1]
+    assert basket['histogram'][-1]['units'] == '10+'
+    assert [(m['month'], m['orders'], m['average_units']) for m in basket['monthly']] == \
+        [('2024-01', 2, 3.5), ('2024-02', 1, 2.0), ('2024-03', 1, 1.0)]
+
+    affinity = admin_client.get('/api/analytics/category-affinity').get_json()
+    index = {name: i for i, name in enumerate(affinity['categories'])}
+    accessories, shirts, pants = index['Accesorios'], index['Camisas'], index['Pantalones']
+    assert affinity['orders'] == 4
+    assert affinity['together'][accessories][accessories] == 2
+    assert affinity['together'][accessories][shirts] == affinity['together'][shirts][accessories] == 1
+    assert affinity['together'][shirts][pants] == 0
+    assert affinity['lift'][accessories][shirts] == 1.0
+
+
+def test_reports_are_cached_on_disk_until_data_changes(admin_client, app, tmp_path, monkeypatch):
+    app.config['ANALYTICS_CACHE_DIR'] = str(tmp_path)
+    (ana, _, _), (shirt, _, _) = _seed()
+    assert admin_client.get('/api/analytics/basket').get_json()['orders'] == 4
+    cached = list(tmp_path.glob('analytics-*.npz'))
+    assert len(cached) == 1
+
+    # Con los mismos datos se lee el archivo: no se vuelve a cargar la base
+    def fail(*args, **kwargs):
+        raise AssertionError('no debería recalcular')
+    monkeypatch.setattr(analytics, 'load_dataset', fail)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        assert admin_client.get('/api/analytics/cohorts').status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    monkeypatch.undo()
+    # La huella no recorre las tablas de pedidos
+    assert statements and not [sql for sql in statements if 'FROM orders' in sql or 'order_detail' in sql]
+
+    _order(ana, datetime(2024, 4, 1), [(shirt, 3)])
+    assert admin_client.get('/api/analytics/basket').get_json()['orders'] == 5
+    refreshed = list(tmp_path.glob('analytics-*.npz'))
+    assert len(refreshed) == 1 and refreshed != cached
+
+
+def test_vectorized_reports_match_naive_implementation():
+    for orders in (1, 50, 5000):
+        data = synthetic_dataset(orders=orders, categories=5, seed=orders)
+        assert reports_match(naive_reports(data), analytics.compute_reports(data))
+    # Bloques de afinidad más chicos que el número de pedidos
+    data = synthetic_dataset(orders=5000, seed=3)
+    assert reports_match(analytics.category_affinity(data), analytics.category_affinity(data, chunk=128))
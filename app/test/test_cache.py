@@ -0,0 +1,220 @@
+import threading
+import time
+
+from app import db
+from app.cache import BucketCache, LRUCache, LocalBackend, SingleFlight, catalog_cache, dashboard_cache
+from app.models import Product
+
+
+def test_lru_evicts_and_expires():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is None
+
+
+def test_read_through_is_invalidated_by_writes(admin_client, app):
+    product = Product(nameProduct='Falda', price=30, stock=4, category='Faldas', status='Activo')
+    db.session.add(product)
+    db.session.commit()
+
+    assert admin_client.get(f'/api/products/{product.idProduct}').get_json()['price'] == 30.0
+    # Una escritura directa sin bump sigue sirviendo la copia cacheada
+    Product.query.filter_by(idProduct=product.idProduct).update({'price': 35})
+    db.session.commit()
+    assert admin_client.get(f'/api/products/{product.idProduct}').get_json()['price'] == 30.0
+
+    # Los handlers de escritura suben la versión del catálogo
+    admin_client.put(f'/api/products/{product.idProduct}', json={
+        'name': 'Falda', 'category': 'Faldas', 'price': 40, 'stock': 4, 'status': 'Activo'
+    })
+    assert admin_client.get(f'/api/products/{product.idProduct}').get_json()['price'] == 40.0
+    assert admin_client.get(f'/product/{product.idProduct}').status_code == 200
+
+
+def test_shared_backend_stand_in(app):
+    shared = LocalBackend()
+    catalog_cache.init_app(app, shared=shared)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'value': len(calls)}
+
+    assert catalog_cache.get_or_set('k', loader) == {'value': 1}
+    catalog_cache.local.clear()
+    assert catalog_cache.get_or_set('k', loader) == {'value': 1}
+    catalog_cache.bump()
+    assert catalog_cache.get_or_set('k', loader) == {'value': 2}
+    assert len(calls) == 2
+
+
+
+def test_product_page_is_json_safe_with_shared_backend(app, client):
+    catalog_cache.init_app(app, shared=LocalBackend())
+    product = Product(nameProduct='Blusa', price=25, stock=3, category='Blusas', status='Activo')
+    related = Product(nameProduct='Blusa larga', price=28, stock=3, category='Blusas', status='Activo')
+    db.session.add_all([product, related])
+    db.session.commit()
+
+    for _ in range(2):  # la segunda lectura sale del backend compartido
+        response = client.get(f'/product/{product.idProduct}')
+        assert response.status_code == 200
+        assert 'Blusa' in response.get_data(as_text=True)
+
+
+def test_version_is_shared_between_workers_without_backend(app):
+    from app.cache import CatalogCache
+
+    # Dos procesos: cada uno con su LRU, la misma base de datos (sin reutilizar la versión leída)
+    app.config['CATALOG_VERSION_TTL'] = 0
+    workers = [CatalogCache(), CatalogCache()]
+    for worker in workers:
+        worker.init_app(app)
+    loads = []
+    assert workers[1].get_or_set('k', lambda: loads.append(1) or 'viejo') == 'viejo'
+    workers[0].bump()
+    assert workers[1].version() == workers[0].version() == 1
+    assert workers[1].get_or_set('k', lambda: loads.append(1) or 'nuevo') == 'nuevo'
+    assert len(loads) == 2
+
+
+def test_version_is_read_once_per_window_and_fails_closed(app, monkeypatch):
+    from sqlalchemy import event
+    from app import counters
+    from app.cache import CatalogCache
+
+    app.config['CATALOG_VERSION_TTL'] = 60
+    cache = CatalogCache()
+    cache.init_app(app)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        for _ in range(5):
+            assert cache.get_or_set('k', lambda: 'valor') == 'valor'
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert len([sql for sql in statements if 'counter' in sql]) == 1
+
+    # bump no confirma la sesión de quien llama y este worker ve la versión nueva al instante
+    pending = Product(nameProduct='Pendiente', price=1, stock=1, category='Varios', status='Activo')
+    db.session.add(pending)
+    assert cache.bump() == 1 and cache.version() == 1
+    assert pending in db.session.new
+    db.session.rollback()
+
+    # Si la versión no se puede leer no se sirve ni se guarda nada cacheado
+    def fail(name):
+        raise RuntimeError('sin base')
+    monkeypatch.setattr(counters, 'read_counter', fail)
+    cache._version = None
+    loads = []
+    assert cache.get_or_set('k', lambda: loads.append(1) or 'fresco') == 'fresco'
+    assert cache.get_or_set('k', lambda: loads.append(1) or 'fresco') == 'fresco'
+    assert cache.version() is None and len(loads) == 2
+
+
+def test_conditional_get_returns_304_until_product_changes(admin_client, app):
+    product = Product(nameProduct='Abrigo', price=150, stock=2, category='Abrigos', status='Activo')
+    db.session.add(product)
+    db.session.commit()
+    url = f'/api/products/{product.idProduct}'
+
+    first = admin_client.get(url)
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Last-Modified']
+
+    again = admin_client.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    since = admin_client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+    listing = admin_client.get('/api/products')
+    assert admin_client.get('/api/products', headers={'If-None-Match': listing.headers['ETag']}).status_code == 304
+
+    admin_client.put(url, json={
+        'name': 'Abrigo largo', 'category': 'Abrigos', 'price': 150, 'stock': 2, 'status': 'Activo'
+    })
+    changed = admin_client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['name'] == 'Abrigo largo'
+    assert admin_client.get('/api/products', headers={'If-None-Match': listing.headers['ETag']}).status_code == 200
+
+
+def test_single_flight_coalesces_concurrent_misses():
+    cache = BucketCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'foto'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('snapshot', loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['foto'] * 8
+    assert len(calls) == 1
+    assert cache.bucket_key('x', now=125) == cache.bucket_key('x', now=179) != cache.bucket_key('x', now=180)
+
+    # Los que esperan reciben el mismo error que el que calcula
+    flight = SingleFlight()
+    try:
+        flight.do('k', lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert flight.do('k', lambda: 2) == 2
+
+
+def test_dashboard_snapshot_is_shared_within_window(admin_client, app):
+    app.config['DASHBOARD_SNAPSHOT_TTL'] = 3600  # que la ventana no termine durante la prueba
+    dashboard_cache.init_app(app)
+    db.session.add(Product(nameProduct='Bufanda', price=12, stock=3, category='Accesorios', status='Activo'))
+    db.session.commit()
+
+    first = admin_client.get('/api/dashboard/snapshot').get_json()
+    assert first['stats']['total_products'] == 1
+    assert [p['name'] for p in first['products']['items']] == ['Bufanda']
+    assert first['products']['next_cursor'] is None
+    assert first['users']['total'] == 1
+
+    # Dentro de la ventana se sirve la misma foto aunque cambien los datos...
+    db.session.add(Product(nameProduct='Gorro', price=9, stock=3, category='Accesorios', status='Activo'))
+    db.session.commit()
+    assert admin_client.get('/api/dashboard/snapshot').get_json() == first
+
+    # ...salvo que cambie la versión del catálogo o termine la ventana
+    catalog_cache.bump()
+    assert admin_client.get('/api/dashboard/snapshot').get_json()['stats']['total_products'] == 2
+    dashboard_cache.local.clear()
+    assert admin_client.get('/api/dashboard/snapshot').status_code == 200
+
+
+def test_dashboard_snapshot_embeds_first_product_page(admin_client, app):
+    from app.pagination import DEFAULT_LIMIT
+
+    dashboard_cache.init_app(app)
+    db.session.add_all([Product(nameProduct=f'P{i:02d}', price=5, stock=1, category='Varios', status='Activo')
+                        for i in range(DEFAULT_LIMIT + 1)])
+    db.session.commit()
+
+    products = admin_client.get('/api/dashboard/snapshot').get_json()['products']
+    assert len(products['items']) == DEFAULT_LIMIT
+    rest = admin_client.get(f"/api/admin/products?limit={DEFAULT_LIMIT}&after={products['next_cursor']}").get_json()
+    assert [p['name'] for p in rest['items']] == [f'P{DEFAULT_LIMIT:02d}']
+    assert rest['next_cursor'] is None
@@ -0,0 +1,195 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import CartItem, Product, User
+
+
+def _count_queries(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements, lambda: event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_view_cart_uses_constant_queries(admin_client, app):
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    products = [Product(nameProduct=f'P{i}', price=10 + i, stock=10, status='Activo') for i in range(20)]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all(CartItem(idUser=admin.idUser, idProduct=p.idProduct, quantity=2) for p in products)
+    # Línea huérfana: el producto ya no existe
+    db.session.add(CartItem(idUser=admin.idUser, idProduct=9999, quantity=1))
+    db.session.commit()
+
+    statements, stop = _count_queries(app)
+    response = admin_client.get('/cart')
+    stop()
+
+    assert response.status_code == 200
+    cart_queries = [sql for sql in statements if 'cart_item' in sql]
+    assert len(cart_queries) == 2  # lectura con JOIN + DELETE de huérfanas
+    assert CartItem.query.filter_by(idUser=admin.idUser).count() == 20
+    assert b'P19' in response.data
+
+
+def test_add_to_cart_upserts_within_stock(admin_client, app):
+    product = Product(nameProduct='Bolso', price=50, stock=3, status='Activo')
+    db.session.add(product)
+    db.session.commit()
+
+    first = admin_client.post('/api/cart/add', json={'product_id': product.idProduct, 'quantity': 2}).get_json()
+    assert first == {'success': True, 'message': 'Producto agregado al carrito', 'cart_count': 1}
+
+    again = admin_client.post('/api/cart/add', json={'product_id': product.idProduct, 'quantity': 1}).get_json()
+    assert again['success'] and again['cart_count'] == 1
+    assert CartItem.query.filter_by(idProduct=product.idProduct).one().quantity == 3
+
+    too_many = admin_client.post('/api/cart/add', json={'product_id': product.idProduct, 'quantity': 1}).get_json()
+    assert too_many == {'success': False, 'message': 'No hay suficiente stock disponible'}
+
+    missing = admin_client.post('/api/cart/add', json={'product_id': 9999}).get_json()
+    assert missing == {'success': False, 'message': 'Producto no encontrado'}
+
+
+def test_cart_counter_follows_every_mutation(admin_client, app):
+    from app.counters import repair_cart_counts
+
+    products = [Product(nameProduct=f'C{i}', price=5, stock=5, status='Activo') for i in range(3)]
+    db.session.add_all(products)
+    db.session.commit()
+    for product in products:
+        admin_client.post('/api/cart/add', json={'product_id': product.idProduct})
+    admin_client.post('/api/cart/add', json={'product_id': products[0].idProduct})
+    assert admin_client.get('/api/cart/count').get_json()['count'] == 3
+
+    line = CartItem.query.filter_by(idProduct=products[1].idProduct).one()
+    removed = admin_client.post('/api/cart/remove', json={'item_id': line.idCartItem}).get_json()
+    assert removed['cart_count'] == 2
+
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    db.session.execute(db.update(User).values(cart_count=42))
+    db.session.commit()
+    repair_cart_counts()
+    assert admin.get_cart_count() == 2
+
+    admin_client.post('/api/cart/clear')
+    assert admin_client.get('/api/cart/count').get_json()['count'] == 0
+
+
+def test_batch_applies_ops_atomically(admin_client, app):
+    shirt = Product(nameProduct='Camisa', price=20, stock=5, status='Activo')
+    hat = Product(nameProduct='Sombrero', price=15, stock=1, status='Activo')
+    db.session.add_all([shirt, hat])
+    db.session.commit()
+    admin_client.post('/api/cart/add', json={'product_id': shirt.idProduct, 'quantity': 1})
+    line = CartItem.query.filter_by(idProduct=shirt.idProduct).one()
+
+    data = admin_client.post('/api/cart/batch', json={'ops': [
+        {'op': 'update', 'item_id': line.idCartItem, 'quantity': 3},
+        {'op': 'add', 'product_id': hat.idProduct},
+        {'op': 'add', 'product_id': shirt.idProduct, 'quantity': 1},
+    ]}).get_json()
+    assert data['success']
+    assert data['cart_count'] == 2
+    assert data['total'] == 4 * 20 + 15
+    assert {item['name']: item['quantity'] for item in data['cart_items']} == {'Camisa': 4, 'Sombrero': 1}
+
+    # La segunda operación excede el stock: no se aplica nada
+    response = admin_client.post('/api/cart/batch', json={'ops': [
+        {'op': 'remove', 'item_id': line.idCartItem},
+        {'op': 'add', 'product_id': hat.idProduct},
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()['index'] == 1
+    assert CartItem.query.filter_by(idProduct=shirt.idProduct).one().quantity == 4
+
+
+def test_checkout_creates_order_and_decrements_stock(admin_client, app):
+    from app.models import Order, OrderDetail
+    shirt = Product(nameProduct='Camisa', price=20, stock=3, status='Activo')
+    hat = Product(nameProduct='Sombrero', price=15, stock=5, status='Activo')
+    db.session.add_all([shirt, hat])
+    db.session.commit()
+    admin_client.post('/api/cart/batch', json={'ops': [
+        {'op': 'add', 'product_id': shirt.idProduct, 'quantity': 3},
+        {'op': 'add', 'product_id': hat.idProduct, 'quantity': 2},
+    ]})
+
+    response = admin_client.post('/api/cart/checkout')
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['total'] == 3 * 20 + 2 * 15
+
+    order = db.session.get(Order, data['order_id'])
+    assert {(d.idProduct, d.quantity) for d in OrderDetail.query.filter_by(idOrder=order.idOrder)} == \
+        {(shirt.idProduct, 3), (hat.idProduct, 2)}
+    db.session.expire_all()
+    assert (shirt.stock, shirt.status) == (0, 'Inactivo')
+    assert (hat.stock, hat.status) == (3, 'Activo')
+    assert CartItem.query.count() == 0
+    assert admin_client.get('/api/cart/count').get_json()['count'] == 0
+
+    # Carrito vacío
+    assert admin_client.post('/api/cart/checkout').status_code == 400
+
+
+def test_checkout_rolls_back_on_shortage(admin_client, app):
+    from app.models import Order
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    shirt = Product(nameProduct='Camisa', price=20, stock=5, status='Activo')
+    hat = Product(nameProduct='Sombrero', price=15, stock=1, status='Activo')
+    db.session.add_all([shirt, hat])
+    db.session.flush()
+    db.session.add_all([CartItem(idUser=admin.idUser, idProduct=shirt.idProduct, quantity=2),
+                        CartItem(idUser=admin.idUser, idProduct=hat.idProduct, quantity=2)])
+    db.session.commit()
+
+    response = admin_client.post('/api/cart/checkout')
+    assert response.status_code == 409
+    assert [item['name'] for item in response.get_json()['shortages']] == ['Sombrero']
+    db.session.expire_all()
+    assert (shirt.stock, hat.stock) == (5, 1)
+    assert Order.query.count() == 0
+    assert CartItem.query.count() == 2
+
+
+def test_concurrent_checkouts_never_oversell(file_app):
+    import threading
+    from app.models import Order
+
+    app = file_app
+    buyers, stock = 40, 15
+    with app.app_context():
+        product = Product(nameProduct='Edición limitada', price=50, stock=stock, status='Activo')
+        users = [User(nameUser=f'u{i}', emailUser=f'u{i}@example.com', passwordUser='x') for i in range(buyers)]
+        db.session.add(product)
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(CartItem(idUser=u.idUser, idProduct=product.idProduct, quantity=1) for u in users)
+        db.session.commit()
+        user_ids, product_id = [u.idUser for u in users], product.idProduct
+
+    statuses = []
+    barrier = threading.Barrier(buyers)
+
+    def buy(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        barrier.wait()
+        statuses.append(client.post('/api/cart/checkout').status_code)
+
+    threads = [threading.Thread(target=buy, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses.count(201) == stock
+    assert statuses.count(409) == buyers - stock
+    with app.app_context():
+        assert db.session.get(Product, product_id).stock == 0
+        assert Order.query.count() == stock
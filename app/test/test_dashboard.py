@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.counters import counter_values, repair_product_counts
+from app.models import CartItem, Order, OrderDetail, Product, ProductSales, SalesDaily, User
+from app.rollups import rebuild_rollups, record_sale
+
+
+def _checkout(client, user_id, lines):
+    db.session.add_all(CartItem(idUser=user_id, idProduct=product_id, quantity=quantity)
+                       for product_id, quantity in lines)
+    db.session.commit()
+    assert client.post('/api/cart/checkout').status_code == 201
+
+
+def test_checkout_updates_rollups_and_stats(admin_client, app):
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    shirt = Product(nameProduct='Camisa', category='Camisas', price=20, stock=50, status='Activo')
+    hat = Product(nameProduct='Sombrero', category='Accesorios', price=15, stock=50, status='Activo')
+    db.session.add_all([shirt, hat])
+    db.session.commit()
+
+    _checkout(admin_client, admin.idUser, [(shirt.idProduct, 2), (hat.idProduct, 1)])
+    _checkout(admin_client, admin.idUser, [(hat.idProduct, 4)])
+
+    today = db.session.get(SalesDaily, datetime.utcnow().date())
+    assert (today.orders, float(today.revenue), today.units) == (2, 2 * 20 + 15 + 4 * 15, 7)
+    assert db.session.get(ProductSales, hat.idProduct).units == 5
+
+    stats = admin_client.get('/api/dashboard/stats').get_json()
+    assert stats['total_orders'] == 2
+    assert stats['total_products'] == 2
+    assert stats['today_income'] == 115.0
+    assert [p['name'] for p in stats['popular_products']] == ['Sombrero', 'Camisa']
+    assert stats['recent_orders'][0]['customer'] == 'admin'
+
+    # La reconstrucción completa coincide con lo mantenido incrementalmente
+    before = [(r.day, r.orders, float(r.revenue), r.units) for r in SalesDaily.query.all()]
+    rebuild_rollups()
+    assert [(r.day, r.orders, float(r.revenue), r.units) for r in SalesDaily.query.all()] == before
+
+
+def test_rebuild_groups_history_by_day(app):
+    product = Product(nameProduct='Camisa', price=10, stock=0, status='Inactivo')
+    db.session.add(product)
+    db.session.flush()
+    for days_ago, quantity in [(3, 1), (3, 2), (1, 5)]:
+        order = Order(totalAmount=10 * quantity, orderDate=datetime.utcnow() - timedelta(days=days_ago))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderDetail(idOrder=order.idOrder, idProduct=product.idProduct,
+                                   quantity=quantity, price=10))
+    db.session.commit()
+
+    assert rebuild_rollups() == (2, 1)
+    rows = SalesDaily.query.order_by(SalesDaily.day).all()
+    assert [(r.orders, float(r.revenue), r.units) for r in rows] == [(2, 30.0, 3), (1, 50.0, 5)]
+    assert db.session.get(ProductSales, product.idProduct).units == 8
+
+
+def test_sales_report_from_checkouts(admin_client, app):
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    dress = Product(nameProduct='Vestido', category='Vestidos', price=80, stock=50, status='Activo')
+    shirt = Product(nameProduct='Camisa', category='Camisas', price=20, stock=50, status='Activo')
+    db.session.add_all([dress, shirt])
+    db.session.commit()
+    _checkout(admin_client, admin.idUser, [(dress.idProduct, 1), (shirt.idProduct, 2)])
+    _checkout(admin_client, admin.idUser, [(shirt.idProduct, 1)])
+
+    report = admin_client.get('/api/reports/sales?granularity=month').get_json()
+    assert report['total_sales'] == 140.0
+    assert report['total_orders'] == 2
+    assert report['average_order'] == 70.0
+    assert [(c['name'], c['sales']) for c in report['top_categories']] == [('Vestidos', 80.0), ('Camisas', 60.0)]
+    assert list(report['revenue_by']) == ['month']
+    assert report['sales_trend'][-1] == 140.0
+
+    assert admin_client.get('/api/reports/sales?start=2024-02-01&end=2024-01-01').status_code == 400
+    assert admin_client.get('/api/reports/sales?start=ayer').status_code == 400
+
+
+def test_year_report_matches_naive_grouping(admin_client, app):
+    import random
+    import time
+    from app.models import SalesCategoryDaily
+
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1).date()
+    daily = {}
+    for offset in range(365):
+        if rng.random() < 0.9:
+            day = start + timedelta(days=offset)
+            daily[day] = (rng.randint(1, 40), rng.randint(100, 5000), rng.randint(1, 90))
+            db.session.add(SalesDaily(day=day, orders=daily[day][0], revenue=daily[day][1], units=daily[day][2]))
+            for category in ('Vestidos', 'Camisas', 'Accesorios'):
+                db.session.add(SalesCategoryDaily(day=day, category=category, revenue=rng.randint(1, 100), units=1))
+    db.session.commit()
+
+    began = time.perf_counter()
+    report = admin_client.get('/api/reports/sales?start=2025-01-01&end=2025-12-31').get_json()
+    assert time.perf_counter() - began < 1
+
+    months, weeks = {}, {}
+    for day, (orders, revenue, _) in daily.items():
+        for bucket, key in ((months, day.replace(day=1)), (weeks, day - timedelta(days=day.weekday()))):
+            totals = bucket.setdefault(key.isoformat(), [0, 0])
+            totals[0] += orders
+            totals[1] += revenue
+    by_month = {p['period']: [p['orders'], p['revenue']] for p in report['revenue_by']['month']}
+    by_week = {p['period']: [p['orders'], p['revenue']] for p in report['revenue_by']['week'] if p['orders']}
+    assert by_month == months
+    assert by_week == weeks
+    assert len(report['revenue_by']['day']) == 365
+    assert report['total_orders'] == sum(orders for orders, _, _ in daily.values())
+
+
+def test_orders_grid_pages_filters_and_sorts(admin_client, app):
+    from sqlalchemy import event
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    product = Product(nameProduct='Camisa', price=10, stock=0, status='Inactivo')
+    db.session.add(product)
+    db.session.flush()
+    base = datetime(2025, 3, 1, 12)
+    for i in range(7):
+        order = Order(idUser=admin.idUser, totalAmount=10 * (i % 3 + 1),
+                      status='Enviado' if i % 2 else 'Pendiente',
+                      orderDate=base + timedelta(days=i // 2))  # fechas repetidas
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all(OrderDetail(idOrder=order.idOrder, idProduct=product.idProduct, quantity=2, price=5)
+                           for _ in range(i % 3 + 1))
+    db.session.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    seen, cursor = [], None
+    while True:
+        url = '/api/orders?limit=3' + (f'&after={cursor}' if cursor else '')
+        page = admin_client.get(url).get_json()
+        seen += page['items']
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+    # Fecha desc. con idOrder desempatando, sin repetir ni saltar filas
+    assert [o['id'] for o in seen] == [o.idOrder for o in
+                                      Order.query.order_by(Order.orderDate.desc(), Order.idOrder.desc())]
+    assert all(o['items'] == o['amount'] / 10 and o['customer'] == 'admin' for o in seen)
+    # Una consulta por página (más la del usuario de la sesión)
+    assert len([s for s in statements if 'FROM orders' in s]) == 3
+
+    page = admin_client.get('/api/orders?status=Enviado&sort=amount&order=asc&date_from=2025-03-02').get_json()
+    assert [(o['status'], o['amount']) for o in page['items']] == [('Enviado', 10.0), ('Enviado', 30.0)]
+
+    assert admin_client.get('/api/orders?status=Perdido').status_code == 400
+    assert admin_client.get('/api/orders?after=basura').status_code == 400
+
+
+def test_stats_totals_come_from_counters(admin_client, app):
+    from sqlalchemy import event
+
+    products = [Product(nameProduct=f'P{i}', category='Varios', price=5, stock=1, status='Activo') for i in range(3)]
+    db.session.add_all(products)
+    db.session.commit()
+    db.session.delete(products[0])
+    db.session.commit()
+    assert counter_values('products', 'users') == {'products': 2, 'users': 1}
+    assert repair_product_counts() == {'products': 2}
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        stats = admin_client.get('/api/dashboard/stats').get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert (stats['total_products'], stats['total_users']) == (2, 1)
+    assert not [sql for sql in statements if 'count(' in sql.lower()]
+
+
+def test_rebuild_matches_record_sale_when_total_differs_from_lines(app):
+    from app.cache import catalog_cache
+
+    product = Product(nameProduct='Abrigo', category='Abrigos', price=50, stock=10, status='Activo')
+    db.session.add(product)
+    db.session.flush()
+    # totalAmount con envío: los agregados cuentan solo las líneas, en ambos caminos
+    order = Order(totalAmount=2 * 50 + 7, orderDate=datetime.utcnow())
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(OrderDetail(idOrder=order.idOrder, idProduct=product.idProduct, quantity=2, price=50))
+    record_sale(order.orderDate, [(product.idProduct, 2, 50, product.category)])
+    db.session.commit()
+    incremental = [(r.day, r.orders, float(r.revenue), r.units) for r in SalesDaily.query.all()]
+    assert incremental[0][1:] == (1, 100.0, 2)
+
+    version = catalog_cache.version()
+    result = app.test_cli_runner().invoke(args=['rebuild-sales-rollups'])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    assert [(r.day, r.orders, float(r.revenue), r.units) for r in SalesDaily.query.all()] == incremental
+    assert catalog_cache.version() == version + 1
@@ -0,0 +1,71 @@
+import json
+
+from app import db
+from app.events import EventBus, RESYNC, event_bus, stream
+from app.models import Product
+
+
+def _events(body):
+    """[(tipo, datos)] de un cuerpo text/event-stream (sin comentarios ni retry)."""
+    parsed = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if 'event' in fields:
+            parsed.append((fields['event'], json.loads(fields['data'])))
+    return parsed
+
+
+def test_write_paths_publish_and_stream_replays_from_last_event_id(admin_client, app):
+    app.config.update(DASHBOARD_EVENTS_HEARTBEAT=0.05, DASHBOARD_EVENTS_MAX_AGE=0.2)
+    product = Product(nameProduct='Chaqueta', price=80, stock=5, category='Abrigos', status='Activo')
+    db.session.add(product)
+    db.session.commit()
+    last_id = event_bus.publish('ping', {}).id
+
+    admin_client.put(f'/api/products/{product.idProduct}', json={
+        'name': 'Chaqueta', 'category': 'Abrigos', 'price': 80, 'stock': 0, 'status': 'Activo'
+    })
+    admin_client.delete(f'/api/products/{product.idProduct}')
+
+    response = admin_client.get('/api/dashboard/events', headers={'Last-Event-ID': str(last_id)})
+    assert response.mimetype == 'text/event-stream'
+    events = _events(response.get_data(as_text=True))
+    assert events == [
+        ('stock', {'change': 'updated', 'products': [
+            {'id': product.idProduct, 'name': 'Chaqueta', 'stock': 0, 'status': 'Activo'}]}),
+        ('stock', {'change': 'deleted', 'products': [{'id': product.idProduct}]}),
+    ]
+    assert event_bus.subscriber_count() == 0
+
+
+def test_slow_or_stale_clients_get_resync():
+    bus = EventBus(history=2, queue_size=2)
+    for i in range(4):
+        bus.publish('order', {'id': i})
+
+    # El historial ya no llega al evento 1: se pide resync
+    stale = bus.subscribe(last_id=1)
+    assert [event.id for event in stale.backlog] == [3, 4]
+    assert stale.lagged
+    bus.unsubscribe(stale)
+
+    # Una cola llena descarta lo pendiente y pide resync; luego sigue normal
+    slow = bus.subscribe()
+    for i in range(3):
+        bus.publish('order', {'id': i})
+    clock = iter([0, 0, 0, 10]).__next__
+    body = ''.join(stream(bus, slow, heartbeat=0.05, max_age=5, clock=clock))
+    assert [event for event, _ in _events(body)] == [RESYNC]
+    assert bus.subscriber_count() == 0
+
+
+def test_disconnect_before_first_chunk_releases_subscriber(app):
+    from werkzeug.test import EnvironBuilder
+
+    # Llamada WSGI directa: el cliente de prueba siempre lee el primer fragmento
+    app.config['LOGIN_DISABLED'] = True
+    body = app.wsgi_app(EnvironBuilder(path='/api/dashboard/events').get_environ(), lambda *args: None)
+    assert event_bus.subscriber_count() == 1
+    # El cliente se fue sin leer nada: el generador nunca arrancó
+    body.close()
+    assert event_bus.subscriber_count() == 0
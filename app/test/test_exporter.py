@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app import db
+from app.models import Order, OrderDetail, Product, User
+
+
+def _seed():
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    products = [Product(nameProduct=f'Prenda {i}', category='Camisas', price=10 + i, stock=i, status='Activo')
+                for i in range(5)]
+    db.session.add_all(products)
+    db.session.flush()
+    for i in range(7):
+        order = Order(idUser=admin.idUser, totalAmount=12.5 * (i + 1), status='Pendiente',
+                      orderDate=datetime(2024, 3, i + 1, 10, 30))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderDetail(idOrder=order.idOrder, idProduct=products[i % 5].idProduct,
+                                   quantity=i + 1, price=10))
+    db.session.commit()
+
+
+def test_csv_export_streams_every_row(admin_client, app):
+    _seed()
+    response = admin_client.get('/api/export/orders?chunk_size=2')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="orders-' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['id'] for row in rows] == [str(order.idOrder) for order in Order.query.order_by(Order.idOrder)]
+    assert rows[2] == {'id': rows[2]['id'], 'user_id': rows[2]['user_id'], 'customer': 'admin',
+                       'email': 'admin@fashion.com', 'date': '2024-03-03T10:30:00', 'status': 'Pendiente',
+                       'total': '37.50', 'items': '1', 'units': '3'}
+
+
+def test_ndjson_export_and_cli(admin_client, app, tmp_path):
+    _seed()
+    lines = admin_client.get('/api/export/products?format=ndjson&chunk_size=3').get_data(as_text=True).splitlines()
+    products = [json.loads(line) for line in lines]
+    assert [p['name'] for p in products] == [f'Prenda {i}' for i in range(5)]
+    assert products[1]['price'] == '11.00'
+
+    users = admin_client.get('/api/export/users?format=ndjson').get_data(as_text=True)
+    assert 'password' not in users and json.loads(users.splitlines()[0])['role'] == 'admin'
+
+    assert admin_client.get('/api/export/payments').status_code == 400
+    assert admin_client.get('/api/export/orders?format=xml').status_code == 400
+
+    output = tmp_path / 'orders.csv'
+    result = app.test_cli_runner().invoke(args=['export', 'orders', '--output', str(output), '--chunk-size', '3'])
+    assert result.exit_code == 0, result.output
+    assert len(output.read_text(encoding='utf-8').splitlines()) == 1 + 7
@@ -0,0 +1,69 @@
+import io
+
+from app import db
+from app.events import event_bus
+from app.importer import import_products
+from app.models import Product
+
+
+CSV_DATA = (
+    "name,category,price,stock,size\n"
+    "Vestido,Vestidos,59.90,3,M\n"
+    "Sin precio,Vestidos,,3,\n"
+    "Camisa,Camisas,abc,2,\n"
+    "Pantalón,Pantalones,45,1,L\n"
+    "Falda,Faldas,30,5,\n"
+)
+
+
+def test_csv_import_reports_row_errors(app):
+    result = import_products(io.BytesIO(CSV_DATA.encode()), fmt='csv', batch_size=2)
+    assert result.inserted == 3
+    assert [error['line'] for error in result.errors] == [3, 4]
+    assert result.batches == 2
+    assert Product.query.filter_by(nameProduct='Vestido').one().size == 'M'
+
+
+def test_ndjson_endpoint(admin_client, app):
+    body = b'\n'.join([
+        b'{"name": "Abrigo", "category": "Abrigos", "price": 120, "stock": 2}',
+        b'no es json',
+        b'{"name": "Bufanda", "category": "Accesorios", "price": 15, "stock": 10, "color": "Rojo"}',
+    ])
+    last_id = event_bus.publish('ping', {}).id
+    response = admin_client.post('/api/products/import?format=ndjson', data=body,
+                                 content_type='application/x-ndjson')
+    data = response.get_json()
+    subscriber = event_bus.subscribe(last_id)
+    event_bus.unsubscribe(subscriber)
+    events = [event.data for event in subscriber.backlog if event.type == 'stock']
+    assert data['inserted'] == 2
+    assert data['failed'] == 1
+    assert data['errors'][0]['line'] == 2
+    assert [event['change'] for event in events] == ['created']
+    assert sorted(product['name'] for product in events[0]['products']) == ['Abrigo', 'Bufanda']
+    assert admin_client.get('/api/products/search?q=bufanda&fields=name,color').get_json()['results'][0]['color'] == 'Rojo'
+
+
+def test_failing_batch_is_retried_with_savepoints_and_one_commit(app):
+    from sqlalchemy import event, text
+
+    db.session.execute(text(
+        "CREATE TRIGGER reject_product BEFORE INSERT ON product WHEN NEW.nameProduct = 'Rechazado' "
+        "BEGIN SELECT RAISE(ABORT, 'producto rechazado'); END"
+    ))
+    db.session.commit()
+    commits = []
+    listener = lambda conn: commits.append(1)  # noqa: E731
+    event.listen(db.engine, 'commit', listener)
+    try:
+        data = "name,category,price,stock\n" + ''.join(
+            f"{'Rechazado' if i == 2 else f'Producto {i}'},Varios,10,1\n" for i in range(4))
+        result = import_products(io.BytesIO(data.encode()), fmt='csv', batch_size=10)
+    finally:
+        event.remove(db.engine, 'commit', listener)
+
+    assert (result.inserted, result.failed, result.batches) == (3, 1, 1)
+    assert result.errors[0]['line'] == 4 and 'rechazado' in result.errors[0]['error']
+    assert len(commits) == 1
+    assert Product.query.filter(Product.nameProduct.like('Producto %')).count() == 3
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.leaderboard import rebuild_windows, roll_windows, top_products
+from app.models import CartItem, Product, ProductTrending, User
+from app.rollups import record_sale
+
+
+def _windows():
+    return sorted((row.period, row.idProduct, row.units, float(row.revenue))
+                  for row in ProductTrending.query.all())
+
+
+def test_checkout_feeds_leaderboard_and_trending_endpoint(admin_client, app):
+    admin = User.query.filter_by(emailUser='admin@fashion.com').first()
+    shirt = Product(nameProduct='Camisa', category='Camisas', price=20, stock=50, status='Activo')
+    hat = Product(nameProduct='Sombrero', category='Accesorios', price=15, stock=50, status='Activo')
+    db.session.add_all([shirt, hat])
+    db.session.commit()
+
+    db.session.add_all([CartItem(idUser=admin.idUser, idProduct=shirt.idProduct, quantity=1),
+                        CartItem(idUser=admin.idUser, idProduct=hat.idProduct, quantity=3)])
+    db.session.commit()
+    assert admin_client.post('/api/cart/checkout').status_code == 201
+
+    for period in ('all', '7d', '30d'):
+        assert [(p['name'], p['units']) for p in top_products(period)] == [('Sombrero', 3), ('Camisa', 1)]
+
+    response = admin_client.get('/api/products/trending?limit=1').get_json()
+    assert response['period'] == '7d'
+    assert [p['name'] for p in response['products']] == ['Sombrero']
+    assert admin_client.get('/api/products/trending?period=1y').status_code == 400
+    assert 'MÁS VENDIDOS DE LA SEMANA' in admin_client.get('/').get_data(as_text=True)
+
+
+def test_roll_expires_old_days_like_a_rebuild(app):
+    today = datetime.utcnow().date()
+    products = [Product(nameProduct=f'P{i}', price=10, stock=10, status='Activo') for i in range(3)]
+    db.session.add_all(products)
+    db.session.commit()
+    a, b, c = (p.idProduct for p in products)
+
+    assert roll_windows(today)  # primera vez: reconstruye y deja el marcador
+    assert not roll_windows(today)
+    for days_ago, lines in [(0, [(a, 2)]), (3, [(b, 5), (a, 1)]), (10, [(c, 7)])]:
+        when = datetime.combine(today - timedelta(days=days_ago), datetime.min.time())
+        record_sale(when, [(product_id, quantity, 10, None) for product_id, quantity in lines])
+    db.session.commit()
+    # El pedido de hace 10 días solo cuenta en la ventana de 30
+    assert [(p['id'], p['units']) for p in top_products('7d')] == [(b, 5), (a, 3)]
+    assert [p['id'] for p in top_products('30d')] == [c, b, a]
+
+    # Cinco días después: sale el día de hace 3, el de hoy sigue
+    assert roll_windows(today + timedelta(days=5))
+    incremental = _windows()
+    rebuild_windows(today + timedelta(days=5))
+    db.session.commit()
+    assert incremental == _windows()
+    assert [row for row in incremental if row[0] == '7d'] == [('7d', a, 2, 20.0)]
+
+    # Un salto mayor que la ventana la reconstruye entera
+    assert roll_windows(today + timedelta(days=60))
+    assert _windows() == []
+
+
+def test_reads_never_roll_or_commit(app):
+    from app.leaderboard import MARKER
+    from app.models import Counter
+
+    today = datetime.utcnow().date()
+    products = [Product(nameProduct=f'P{i}', price=10, stock=10, status='Activo') for i in range(2)]
+    db.session.add_all(products)
+    db.session.commit()
+    a, b = (p.idProduct for p in products)
+    assert roll_windows(today - timedelta(days=10))
+    for days_ago, product_id, quantity in [(9, a, 4), (2, b, 1)]:
+        when = datetime.combine(today - timedelta(days=days_ago), datetime.min.time())
+        record_sale(when, [(product_id, quantity, 10, None)])
+    db.session.commit()
+
+    # Marcador atrasado: la ventana se suma de product_sales_daily y nada se escribe
+    db.session.add(Product(nameProduct='Pendiente', price=1, stock=1, status='Activo'))
+    stale = [(p['id'], p['units']) for p in top_products('7d', today=today)]
+    db.session.rollback()
+    assert stale == [(b, 1)]
+    assert Product.query.filter_by(nameProduct='Pendiente').count() == 0
+    assert db.session.get(Counter, MARKER).value == (today - timedelta(days=10)).toordinal()
+
+    assert roll_windows(today)
+    assert [(p['id'], p['units']) for p in top_products('7d', today=today)] == stale
@@ -0,0 +1,204 @@
+from app import db
+from app.models import Product
+import pytest
+
+
+@pytest.fixture
+def catalog(app):
+    for i in range(12):
+        db.session.add(Product(
+            nameProduct=f'Producto {i}',
+            price=10 + i,
+            stock=i % 4,
+            category='Vestidos' if i % 2 else 'Camisas',
+            status='Activo'
+        ))
+    db.session.commit()
+    return Product.query.order_by(Product.idProduct).all()
+
+
+def test_category_cursor_pagination(client, catalog):
+    response = client.get('/api/products/category/Vestidos?limit=4')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['items']) == 4
+    assert data['next_cursor'] == data['items'][-1]['id']
+
+    response = client.get(f"/api/products/category/Vestidos?limit=4&after={data['next_cursor']}")
+    data = response.get_json()
+    assert len(data['items']) == 2
+    assert data['next_cursor'] is None
+
+
+def test_fields_projection(client, catalog):
+    response = client.get('/api/products/category/Camisas?fields=name,price')
+    data = response.get_json()
+    assert len(data) == 6
+    assert set(data[0]) == {'id', 'name', 'price'}
+
+
+def test_admin_products_cursor(admin_client, catalog):
+    response = admin_client.get('/api/admin/products?limit=5')
+    data = response.get_json()
+    assert [item['id'] for item in data['items']] == [p.idProduct for p in catalog[:5]]
+
+    response = admin_client.get('/api/admin/products')
+    assert len(response.get_json()) == 12
+
+
+def test_public_listing_projects_fields(client, catalog):
+    catalog[0].status = 'Inactivo'
+    db.session.commit()
+
+    # Sin sesión: el catálogo público, solo productos activos y con ?fields=
+    response = client.get('/api/products?fields=name,price&limit=5')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [set(item) for item in data['items']] == [{'id', 'name', 'price'}] * 5
+    assert data['items'][0]['id'] == catalog[1].idProduct
+
+    rest = client.get(f"/api/products?fields=name&limit=50&after={data['next_cursor']}").get_json()
+    assert len(rest['items']) == 6 and rest['next_cursor'] is None
+    assert set(rest['items'][0]) == {'id', 'name'}
+
+
+def test_index_seek_pagination(client, catalog):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Producto 11' in response.data
+    assert b'after=' not in response.data
+
+
+def test_search_ranks_and_stays_in_sync(admin_client, app):
+    db.session.add_all([
+        Product(nameProduct='Vestido rojo de noche', description='Elegante', price=90, stock=3, status='Activo'),
+        Product(nameProduct='Blusa blanca', description='Combina con un vestido', price=40, stock=5, status='Activo'),
+        Product(nameProduct='Pantalón negro', description='Corte recto', price=60, stock=2, status='Activo'),
+    ])
+    db.session.commit()
+
+    results = admin_client.get('/api/products/search?q=vestido').get_json()['results']
+    assert [r['name'] for r in results] == ['Vestido rojo de noche', 'Blusa blanca']
+
+    pantalon = Product.query.filter_by(nameProduct='Pantalón negro').first()
+    admin_client.put(f'/api/products/{pantalon.idProduct}', json={
+        'name': 'Vestido negro', 'category': 'Vestidos', 'price': 60, 'stock': 2, 'status': 'Activo'
+    })
+    results = admin_client.get('/api/products/search?q=negro').get_json()['results']
+    assert [r['name'] for r in results] == ['Vestido negro']
+
+    admin_client.delete(f'/api/products/{pantalon.idProduct}')
+    assert admin_client.get('/api/products/search?q=negro').get_json()['results'] == []
+    assert admin_client.get('/api/products/search?q=').status_code == 400
+
+
+def test_facet_counts_follow_filters_and_writes(admin_client, app):
+    db.session.add_all([
+        Product(nameProduct='A', category='Vestidos', size='M', color='Rojo', price=40, stock=2, status='Activo'),
+        Product(nameProduct='B', category='Vestidos', size='S', color='Azul', price=75, stock=0, status='Activo'),
+        Product(nameProduct='C', category='Camisas', size='M', color='Rojo', price=120, stock=5, status='Activo'),
+        Product(nameProduct='D', category='Camisas', size='L', color='Negro', price=49.99, stock=1, status='Inactivo'),
+    ])
+    db.session.commit()
+
+    data = admin_client.get('/api/products/filter').get_json()
+    assert data['total'] == 3
+    assert data['facets']['category'] == {'Camisas': 1, 'Vestidos': 2}
+    assert data['facets']['price'] == {'0-50': 1, '50-100': 1, '100-150': 1}
+
+    data = admin_client.get('/api/products/filter?size=M&min_price=30&max_price=110').get_json()
+    assert [item['name'] for item in data['items']] == ['A']
+    assert data['total'] == 1
+    # Cada faceta ignora su propio filtro
+    assert data['facets']['size'] == {'M': 1, 'S': 1}
+    assert data['facets']['category'] == {'Vestidos': 1}
+    assert data['facets']['in_stock'] == {'true': 1, 'false': 0}
+
+    b = Product.query.filter_by(nameProduct='B').first()
+    admin_client.put(f'/api/products/{b.idProduct}', json={
+        'name': 'B', 'category': 'Camisas', 'price': 75, 'stock': 3, 'status': 'Activo'
+    })
+    data = admin_client.get('/api/products/filter?in_stock=1').get_json()
+    assert data['facets']['category'] == {'Camisas': 2, 'Vestidos': 1}
+    assert data['total'] == 3
+
+
+def test_bulk_update_stock_and_price(admin_client, catalog):
+    first, second, third = catalog[:3]
+    response = admin_client.patch('/api/products/bulk', json=[
+        {'id': first.idProduct, 'stock': 0},
+        {'id': second.idProduct, 'price': 99.5},
+        {'id': third.idProduct, 'stock': 7, 'price': 12},
+        {'id': 99999, 'stock': 1},
+    ])
+    assert response.get_json() == {'success': True, 'updated': 3, 'not_found': [99999]}
+
+    db.session.expire_all()
+    assert (first.stock, first.status) == (0, 'Inactivo')
+    assert (float(second.price), second.stock) == (99.5, 1)
+    assert (third.stock, float(third.price), third.status) == (7, 12.0, 'Activo')
+
+    response = admin_client.patch('/api/products/bulk', json=[{'id': first.idProduct, 'stock': -1}])
+    assert response.status_code == 400
+
+
+def test_put_requires_current_version(admin_client, catalog):
+    product = catalog[0]
+    url = f'/api/products/{product.idProduct}'
+    response = admin_client.get(url)
+    etag = response.headers['ETag']
+    assert response.get_json()['version'] == 1
+
+    body = {'name': 'Renombrado', 'category': 'Camisas', 'price': 15, 'stock': 3, 'status': 'Activo'}
+    response = admin_client.put(url, json=body, headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+    assert admin_client.get(url).headers['ETag'] == response.headers['ETag']
+
+    # Otra edición con el ETag viejo no pisa la anterior
+    response = admin_client.put(url, json={**body, 'name': 'Pisado'}, headers={'If-Match': etag})
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+
+    # Las escrituras por lotes también invalidan los ETag vigentes
+    fresh = admin_client.get(url).headers['ETag']
+    admin_client.patch('/api/products/bulk', json=[{'id': product.idProduct, 'stock': 9}])
+    assert admin_client.put(url, json=body, headers={'If-Match': fresh}).status_code == 409
+    db.session.expire_all()
+    assert (product.nameProduct, product.stock, product.version) == ('Renombrado', 9, 3)
+
+
+def test_stale_orm_write_is_rejected(app, catalog):
+    from sqlalchemy.orm.exc import StaleDataError
+    product = catalog[0]
+    # Un UPDATE concurrente fuera del ORM sube la versión después de la lectura
+    table = Product.__table__
+    db.session.execute(table.update().where(table.c.idProduct == product.idProduct)
+                       .values(stock=0, version=table.c.version + 1))
+    product.nameProduct = 'Edición vieja'
+    with pytest.raises(StaleDataError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_product_routes_have_a_single_handler(app):
+    # Dos blueprints con la misma ruta y método: el registrado primero tapa al otro
+    seen = {}
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith('/api/products'):
+            for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                assert (rule.rule, method) not in seen, (rule.rule, method, seen.get((rule.rule, method)))
+                seen[(rule.rule, method)] = rule.endpoint
+    assert seen[('/api/products', 'POST')] == 'products.add_product'
+    assert seen[('/api/products/<int:product_id>', 'PUT')] == 'products.update_product'
+    assert seen[('/api/products/<int:product_id>', 'DELETE')] == 'products.delete_product'
+
+
+def test_create_validates_and_accepts_zero_stock(admin_client, app):
+    response = admin_client.post('/api/products', json={'name': 'Gorro', 'category': 'Accesorios', 'price': 'abc', 'stock': 1})
+    assert response.status_code == 400
+
+    response = admin_client.post('/api/products', json={'name': 'Gorro', 'category': 'Accesorios', 'price': 12, 'stock': 0})
+    assert response.status_code == 201
+    product = Product.query.get(response.get_json()['product']['id'])
+    assert (product.stock, product.status) == (0, 'Inactivo')
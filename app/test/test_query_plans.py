@@ -0,0 +1,24 @@
+from app import db
+from app.query_plans import ALLOWED_SCANS, HOT_QUERIES, check_query_plans, full_scans
+
+
+def test_hot_queries_use_indexes(app):
+    assert HOT_QUERIES
+    assert check_query_plans() == {}
+
+
+def test_detects_full_table_scan(app):
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT * FROM product WHERE description = 'x'"
+    )).mappings().all()
+    assert full_scans(plan, 'sqlite') == ['product']
+
+
+def test_subqueries_and_allowed_tables_are_not_regressions(app):
+    # Recorrer una subconsulta ya materializada no es un índice perdido
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT * FROM (SELECT category, count(*) AS n FROM product "
+        "WHERE idProduct > 10 GROUP BY category) AS grouped ORDER BY n"
+    )).mappings().all()
+    assert full_scans(plan, 'sqlite') == []
+    assert 'sales_daily' in ALLOWED_SCANS['dashboard.sales_totals']
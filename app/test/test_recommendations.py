@@ -0,0 +1,58 @@
+from collections import Counter
+from itertools import permutations
+
+import numpy as np
+
+from app import db
+from app.models import Order, OrderDetail, Product, ProductRecommendation
+from app.recommendations import cooccurrence_topk, rebuild_recommendations, record_order
+
+
+def _naive_topk(lines, k):
+    baskets = {}
+    for order_id, product_id in lines:
+        baskets.setdefault(order_id, set()).add(product_id)
+    counts = Counter()
+    for basket in baskets.values():
+        counts.update(permutations(sorted(basket), 2))
+    ranked = sorted(counts.items(), key=lambda item: (item[0][0], -item[1], item[0][1]))
+    result, seen = [], Counter()
+    for (a, b), count in ranked:
+        if seen[a] < k:
+            result.append((a, b, count))
+            seen[a] += 1
+    return result
+
+
+def test_vectorized_matches_naive():
+    rng = np.random.default_rng(7)
+    orders = rng.integers(0, 300, size=2000)
+    products = rng.integers(0, 40, size=2000)
+    src, dst, counts = cooccurrence_topk(orders, products, k=5)
+    assert list(zip(src.tolist(), dst.tolist(), counts.tolist())) == \
+        _naive_topk(zip(orders.tolist(), products.tolist()), 5)
+
+
+def test_rebuild_and_product_page(client, app):
+    products = [Product(nameProduct=f'P{i}', price=10, stock=5, status='Activo') for i in range(4)]
+    db.session.add_all(products)
+    db.session.flush()
+    a, b, c, d = (p.idProduct for p in products)
+    for basket in ([a, b], [a, b, c], [a, c], [a, b]):
+        order = Order(totalAmount=20)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all(OrderDetail(idOrder=order.idOrder, idProduct=pid, quantity=1, price=10) for pid in basket)
+    db.session.commit()
+
+    assert rebuild_recommendations() == 6
+    top = ProductRecommendation.query.filter_by(idProduct=a).order_by(ProductRecommendation.score.desc()).all()
+    assert [(r.idRelated, r.score) for r in top] == [(b, 3), (c, 2)]
+
+    record_order([a, d])
+    db.session.commit()
+    assert ProductRecommendation.query.get((a, d)).score == 1
+
+    response = client.get(f'/product/{a}')
+    assert response.status_code == 200
+    assert response.data.index(b'P1') < response.data.index(b'P2')
@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import CartItem, Product, StockHold, User
+from app.reservations import available_stock, hold_stock, release_expired
+
+
+def _users(count):
+    users = [User(nameUser=f'u{i}', emailUser=f'u{i}@example.com', passwordUser='x') for i in range(count)]
+    db.session.add_all(users)
+    db.session.flush()
+    return users
+
+
+def test_holds_reduce_availability_until_they_expire(app):
+    alice, bob = _users(2)
+    product = Product(nameProduct='Bolso', price=40, stock=5, status='Activo')
+    db.session.add(product)
+    db.session.commit()
+    now = datetime.utcnow()
+
+    assert hold_stock(alice.idUser, {product.idProduct: 3}, now=now) == []
+    db.session.commit()
+    assert available_stock([product.idProduct]) == {product.idProduct: 2}
+    assert available_stock([product.idProduct], exclude_user=alice.idUser) == {product.idProduct: 5}
+
+    # Bob no puede reservar más de lo que queda; la reserva se revierte
+    assert hold_stock(bob.idUser, {product.idProduct: 3}, now=now) == [product.idProduct]
+    db.session.rollback()
+    assert hold_stock(bob.idUser, {product.idProduct: 2}, now=now) == []
+    db.session.commit()
+    assert available_stock([product.idProduct]) == {product.idProduct: 0}
+
+    # Vencidas ya no cuentan; el barrido las borra por lotes
+    later = now + timedelta(hours=1)
+    assert available_stock([product.idProduct], now=later) == {product.idProduct: 5}
+    assert release_expired(batch_size=1, now=later) == 2
+    assert StockHold.query.count() == 0
+
+
+def test_cart_endpoints_keep_holds_in_sync(admin_client, app):
+    other = _users(1)[0]
+    product = Product(nameProduct='Bolso', price=40, stock=4, status='Activo')
+    db.session.add(product)
+    db.session.commit()
+    hold_stock(other.idUser, {product.idProduct: 3})
+    db.session.commit()
+
+    data = admin_client.post('/api/cart/add', json={'product_id': product.idProduct, 'quantity': 2}).get_json()
+    assert not data['success']
+    assert admin_client.post('/api/cart/add', json={'product_id': product.idProduct}).get_json()['success']
+    availability = admin_client.get(f'/api/products/availability?ids={product.idProduct}').get_json()
+    assert availability['availability'] == [{'id': product.idProduct, 'available': 0}]
+
+    line = CartItem.query.filter_by(idProduct=product.idProduct).one()
+    admin_client.post('/api/cart/remove', json={'item_id': line.idCartItem})
+    assert available_stock([product.idProduct]) == {product.idProduct: 1}
+
+
+def test_concurrent_reservations_never_overbook(file_app):
+    buyers, stock = 40, 12
+    with file_app.app_context():
+        product = Product(nameProduct='Edición limitada', price=50, stock=stock, status='Activo')
+        db.session.add(product)
+        users = _users(buyers)
+        db.session.commit()
+        user_ids, product_id = [u.idUser for u in users], product.idProduct
+
+    results = []
+    barrier = threading.Barrier(buyers)
+
+    def reserve(user_id):
+        client = file_app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        barrier.wait()
+        response = client.post('/api/cart/add', json={'product_id': product_id, 'quantity': 1})
+        results.append(response.get_json()['success'])
+
+    threads = [threading.Thread(target=reserve, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == stock
+    with file_app.app_context():
+        assert available_stock([product_id]) == {product_id: 0}
+        assert db.session.query(db.func.sum(StockHold.quantity)).scalar() == stock
+        assert CartItem.query.count() == stock
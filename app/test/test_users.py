@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.counters import repair_user_counts, user_totals
+from app.models import User
+
+
+def _add_users(count, start=datetime(2024, 1, 1)):
+    users = [User(nameUser=f'cliente{i:02d}', emailUser=f'cliente{i:02d}@mail.com', passwordUser='x',
+                  is_admin=i % 5 == 0, created_at=start + timedelta(hours=i))
+             for i in range(count)]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def test_users_page_walks_all_users_by_cursor(admin_client):
+    _add_users(25)
+    ids, after = [], None
+    while True:
+        page = admin_client.get('/api/users', query_string={'limit': 10, 'after': after}).get_json()
+        assert page['total'] == 26
+        ids.extend(item['id'] for item in page['items'])
+        after = page['next_cursor']
+        if after is None:
+            break
+    expected = [u.idUser for u in User.query.order_by(User.created_at.desc(), User.idUser.desc())]
+    assert ids == expected
+
+    assert admin_client.get('/api/users?after=basura').status_code == 400
+    assert admin_client.get('/api/users?role=vendedor').status_code == 400
+
+
+def test_users_search_and_role_filter(admin_client):
+    _add_users(12)
+    db.session.add(User(nameUser='ana_maria', emailUser='otra@mail.com', passwordUser='x'))
+    db.session.add(User(nameUser='anaXmaria', emailUser='anax@mail.com', passwordUser='x'))
+    db.session.commit()
+
+    page = admin_client.get('/api/users?q=CLIENTE1').get_json()
+    assert sorted(item['name'] for item in page['items']) == ['cliente10', 'cliente11']
+    assert page['total'] is None
+
+    # "_" se busca literal, no como comodín de LIKE
+    assert [i['name'] for i in admin_client.get('/api/users?q=ana_').get_json()['items']] == ['ana_maria']
+    assert [i['name'] for i in admin_client.get('/api/users?q=anax@').get_json()['items']] == ['anaXmaria']
+
+    admins = admin_client.get('/api/users?role=admin').get_json()
+    assert {item['role'] for item in admins['items']} == {'Administrador'}
+    assert admins['total'] == len(admins['items']) == 4  # admin + cliente00, 05, 10
+    users = admin_client.get('/api/users?role=user&limit=100').get_json()
+    assert users['total'] == len(users['items']) == 11
+
+
+def test_user_counter_follows_inserts_updates_and_deletes(app):
+    assert user_totals() == {'users': 1, 'admins': 1}
+    users = _add_users(6)
+    assert user_totals() == {'users': 7, 'admins': 3}
+
+    users[1].is_admin = True
+    db.session.delete(users[0])
+    db.session.commit()
+    assert user_totals() == {'users': 6, 'admins': 3}
+    assert repair_user_counts() == {'users': 6, 'admins': 3}
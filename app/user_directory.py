@@ -0,0 +1,86 @@
+"""Listado paginado de usuarios para el panel de administración.
+
+Páginas por cursor sobre (created_at, idUser), búsqueda por prefijo de
+nombre o email resuelta con índices (ver los índices de ``User``) y
+totales leídos de la tabla ``counter`` (ver app/counters.py).
+"""
+from datetime import datetime
+
+from app import db
+from app.counters import user_totals
+from app.pagination import decode_cursor, encode_cursor, seek_page
+
+ROLES = ('admin', 'user')
+ESCAPE = '/'
+
+
+def prefix_pattern(q):
+    """Patrón LIKE 'q%' con los comodines de `q` escapados.
+
+    El patrón se arma aquí y no con ``startswith()``: SQLite solo usa el
+    índice para LIKE si el patrón es un literal o un parámetro, no una
+    concatenación (``'q' || '%'``).
+    """
+    for char in (ESCAPE, '%', '_'):
+        q = q.replace(char, ESCAPE + char)
+    return q + '%'
+
+
+def _role_label(is_admin):
+    return 'Administrador' if is_admin else 'Usuario'
+
+
+def sort_columns():
+    """Clave del orden del listado: (created_at, idUser)."""
+    from app.models import User
+    return [User.created_at, User.idUser]
+
+
+def user_query(q=None, role=None):
+    """Usuarios filtrados por búsqueda y rol, sin orden ni cursor (ver user_page)."""
+    from app.models import User
+
+    query = db.session.query(
+        User.idUser, User.nameUser, User.emailUser, User.is_admin, User.created_at
+    )
+    # Igualdad simple para que el filtro use el índice (is_admin, created_at)
+    if role == 'admin':
+        query = query.filter(User.is_admin == True)  # noqa: E712
+    elif role == 'user':
+        query = query.filter(User.is_admin == False)  # noqa: E712
+    if q:
+        pattern = prefix_pattern(q)
+        query = query.filter(db.or_(User.nameUser.like(pattern, escape=ESCAPE),
+                                    User.emailUser.like(pattern, escape=ESCAPE)))
+    return query
+
+
+def user_page(q=None, role=None, after=None, limit=30, descending=True):
+    """Una página de usuarios; devuelve {items, next_cursor, limit, total}.
+
+    ``after`` es el ``next_cursor`` de la página anterior (ValueError si no
+    es válido). ``total`` sale del contador sin búsqueda y es None con
+    búsqueda, porque contar las coincidencias obligaría a recorrerlas.
+    """
+    cursor = decode_cursor(after, [datetime.fromisoformat, int]) if after else None
+    rows, has_next = seek_page(user_query(q, role), sort_columns(),
+                               after=cursor, limit=limit, descending=descending)
+
+    total = None
+    if not q:
+        totals = user_totals()
+        total = {None: totals['users'], 'admin': totals['admins'],
+                 'user': totals['users'] - totals['admins']}[role]
+    return {
+        'items': [{
+            'id': row.idUser,
+            'name': row.nameUser,
+            'email': row.emailUser,
+            'role': _role_label(row.is_admin),
+            'created_at': row.created_at.strftime('%Y-%m-%d %H:%M') if row.created_at else 'N/A',
+            'status': 'Activo'
+        } for row in rows],
+        'next_cursor': encode_cursor([rows[-1].created_at, rows[-1].idUser]) if has_next else None,
+        'limit': limit,
+        'total': total
+    }
@@ -27,6 +27,28 @@ class Config:
     RESET_TOKEN_EXPIRATION = int(os.environ.get('RESET_TOKEN_EXPIRATION', 3600))  # 1 hora por defecto
     VERIFICATION_CODE_EXPIRATION = int(os.environ.get('VERIFICATION_CODE_EXPIRATION', 600))  # 10 minutos por defecto
     
+    # Caché del catálogo (LRU en memoria + backend compartido opcional)
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 1024))
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 300))  # 5 minutos por defecto
+    CATALOG_CACHE_REDIS_URL = os.environ.get('CATALOG_CACHE_REDIS_URL')  # p. ej. redis://localhost:6379/0
+    # Sin Redis, cada worker relee la versión de la tabla counter a lo sumo una vez por ventana
+    CATALOG_VERSION_TTL = float(os.environ.get('CATALOG_VERSION_TTL', 1))  # segundos
+    
+    # Reservas de stock del carrito (ver app/reservations.py)
+    STOCK_HOLD_TTL = int(os.environ.get('STOCK_HOLD_TTL', 900))  # 15 minutos por defecto
+    STOCK_HOLD_SWEEP_BATCH = int(os.environ.get('STOCK_HOLD_SWEEP_BATCH', 1000))
+    
+    # Foto combinada del dashboard: se recalcula a lo sumo una vez por ventana
+    DASHBOARD_SNAPSHOT_TTL = int(os.environ.get('DASHBOARD_SNAPSHOT_TTL', 5))  # segundos
+    
+    # Feed en vivo del dashboard (SSE, ver app/events.py)
+    DASHBOARD_EVENTS_HEARTBEAT = int(os.environ.get('DASHBOARD_EVENTS_HEARTBEAT', 15))  # segundos
+    DASHBOARD_EVENTS_MAX_AGE = int(os.environ.get('DASHBOARD_EVENTS_MAX_AGE', 300))  # el cliente reconecta
+    
+    # Análisis con NumPy (ver app/analytics.py)
+    ANALYTICS_CACHE_DIR = os.environ.get('ANALYTICS_CACHE_DIR')  # por defecto instance/analytics
+    ANALYTICS_CHUNK_SIZE = int(os.environ.get('ANALYTICS_CHUNK_SIZE', 50000))  # filas por bloque al cargar
+    
     # Google OAuth Configuration
     GOOGLE_OAUTH_CLIENT_ID = os.environ.get('GOOGLE_OAUTH_CLIENT_ID')
     GOOGLE_OAUTH_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH_CLIENT_SECRET')
@@ -0,0 +1,47 @@
+"""Columnas del catálogo: details, size, color y updated_at en product
+
+Las tablas base las crea db.create_all() al iniciar la app; esta revisión
+solo agrega las columnas que le faltan a una base de datos ya existente.
+
+Revision ID: 3f1c9a7b2d10
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7b2d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('size', sa.String(length=50), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+]
+
+
+def _existing_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('product')}
+
+
+def upgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        for column in NEW_COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column.copy())
+    op.execute("UPDATE product SET updated_at = created_at WHERE updated_at IS NULL")
+
+
+def downgrade():
+    existing = _existing_columns()
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        for column in reversed(NEW_COLUMNS):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
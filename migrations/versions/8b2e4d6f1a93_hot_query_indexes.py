@@ -0,0 +1,66 @@
+"""Índices para las consultas frecuentes y línea única por producto en el carrito
+
+Antes de crear uq_cart_item_user_product se fusionan las líneas duplicadas
+(misma pareja usuario/producto) sumando sus cantidades en la más antigua.
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c9a7b2d10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a93'
+down_revision = '3f1c9a7b2d10'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_product_status_id', 'product', ['status', 'idProduct'], False),
+    ('ix_product_category_status_id', 'product', ['category', 'status', 'idProduct'], False),
+    ('ix_orders_orderDate', 'orders', ['orderDate'], False),
+    ('ix_orders_idUser', 'orders', ['idUser'], False),
+    ('ix_order_detail_idOrder', 'order_detail', ['idOrder'], False),
+    ('ix_order_detail_idProduct', 'order_detail', ['idProduct'], False),
+    ('uq_cart_item_user_product', 'cart_item', ['idUser', 'idProduct'], True),
+]
+
+
+def _index_names(table):
+    # CREATE/DROP INDEX IF [NOT] EXISTS no existe en MySQL: se consulta el inspector
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _merge_duplicate_cart_lines():
+    bind = op.get_bind()
+    cart_item = sa.table('cart_item', sa.column('idCartItem'), sa.column('idUser'),
+                         sa.column('idProduct'), sa.column('quantity'))
+    duplicates = bind.execute(
+        sa.select(cart_item.c.idUser, cart_item.c.idProduct,
+                  sa.func.min(cart_item.c.idCartItem), sa.func.sum(cart_item.c.quantity))
+        .group_by(cart_item.c.idUser, cart_item.c.idProduct)
+        .having(sa.func.count() > 1)
+    ).all()
+    for user_id, product_id, keep_id, quantity in duplicates:
+        bind.execute(cart_item.update().where(cart_item.c.idCartItem == keep_id).values(quantity=quantity))
+        bind.execute(cart_item.delete().where(
+            cart_item.c.idUser == user_id,
+            cart_item.c.idProduct == product_id,
+            cart_item.c.idCartItem != keep_id
+        ))
+
+
+def upgrade():
+    _merge_duplicate_cart_lines()
+    for name, table, columns, unique in INDEXES:
+        if name not in _index_names(table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
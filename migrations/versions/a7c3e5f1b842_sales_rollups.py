@@ -0,0 +1,71 @@
+"""Agregados de ventas: sales_daily y product_sales
+
+Se crean las tablas y se llenan desde orders/order_detail; después las
+mantiene record_sale() al crear cada pedido.
+
+Revision ID: a7c3e5f1b842
+Revises: f28b6d9e4c31
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f1b842'
+down_revision = 'f28b6d9e4c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('sales_daily'):
+        op.create_table(
+            'sales_daily',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('orders', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(14, 2), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day')
+        )
+    if not inspector.has_table('product_sales'):
+        op.create_table(
+            'product_sales',
+            sa.Column('idProduct', sa.Integer(), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(14, 2), nullable=False),
+            sa.ForeignKeyConstraint(['idProduct'], ['product.idProduct'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('idProduct')
+        )
+        with op.batch_alter_table('product_sales', schema=None) as batch_op:
+            batch_op.create_index('ix_product_sales_units', ['units'], unique=False)
+
+    orders = sa.table('orders', sa.column('idOrder'), sa.column('orderDate'))
+    detail = sa.table('order_detail', sa.column('idOrder'), sa.column('idProduct'),
+                      sa.column('quantity'), sa.column('price'))
+    # Misma fuente que record_sale(): las líneas del pedido, no orders.totalAmount
+    day = sa.func.date(orders.c.orderDate)
+    op.execute('DELETE FROM sales_daily')
+    op.execute(sa.table('sales_daily', sa.column('day'), sa.column('orders'),
+                        sa.column('revenue'), sa.column('units')).insert().from_select(
+        ['day', 'orders', 'revenue', 'units'],
+        sa.select(day, sa.func.count(sa.distinct(orders.c.idOrder)),
+                  sa.func.sum(detail.c.quantity * detail.c.price), sa.func.sum(detail.c.quantity))
+        .select_from(detail.join(orders, orders.c.idOrder == detail.c.idOrder))
+        .where(orders.c.orderDate.isnot(None)).group_by(day)
+    ))
+    op.execute('DELETE FROM product_sales')
+    op.execute(sa.table('product_sales', sa.column('idProduct'), sa.column('units'),
+                        sa.column('revenue')).insert().from_select(
+        ['idProduct', 'units', 'revenue'],
+        sa.select(detail.c.idProduct, sa.func.sum(detail.c.quantity),
+                  sa.func.sum(detail.c.quantity * detail.c.price))
+        .where(detail.c.idProduct.isnot(None)).group_by(detail.c.idProduct)
+    ))
+
+
+def downgrade():
+    op.drop_table('product_sales')
+    op.drop_table('sales_daily')
@@ -0,0 +1,38 @@
+"""Recomendaciones "comprados juntos": tabla product_recommendation
+
+La tabla se crea vacía; ``flask rebuild-recommendations`` la llena desde
+order_detail (ver app/recommendations.py) y después cada pedido la actualiza.
+
+Revision ID: a9c3e7f1b265
+Revises: f6a2c8e4d159
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e7f1b265'
+down_revision = 'f6a2c8e4d159'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('product_recommendation'):
+        return
+    op.create_table(
+        'product_recommendation',
+        sa.Column('idProduct', sa.Integer(), nullable=False),
+        sa.Column('idRelated', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['idProduct'], ['product.idProduct'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['idRelated'], ['product.idProduct'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('idProduct', 'idRelated')
+    )
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('product_recommendation'):
+        op.drop_table('product_recommendation')
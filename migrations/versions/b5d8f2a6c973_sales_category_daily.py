@@ -0,0 +1,49 @@
+"""Agregado de ventas por día y categoría (sales_category_daily)
+
+Revision ID: b5d8f2a6c973
+Revises: a7c3e5f1b842
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8f2a6c973'
+down_revision = 'a7c3e5f1b842'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('sales_category_daily'):
+        op.create_table(
+            'sales_category_daily',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('revenue', sa.Numeric(14, 2), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'category')
+        )
+
+    orders = sa.table('orders', sa.column('idOrder'), sa.column('orderDate'))
+    detail = sa.table('order_detail', sa.column('idOrder'), sa.column('idProduct'),
+                      sa.column('quantity'), sa.column('price'))
+    product = sa.table('product', sa.column('idProduct'), sa.column('category'))
+    day = sa.func.date(orders.c.orderDate)
+    category = sa.func.coalesce(product.c.category, 'Sin categoría')
+
+    op.execute('DELETE FROM sales_category_daily')
+    op.execute(sa.table('sales_category_daily', sa.column('day'), sa.column('category'),
+                        sa.column('revenue'), sa.column('units')).insert().from_select(
+        ['day', 'category', 'revenue', 'units'],
+        sa.select(day, category, sa.func.sum(detail.c.quantity * detail.c.price), sa.func.sum(detail.c.quantity))
+        .select_from(detail.join(orders, orders.c.idOrder == detail.c.idOrder)
+                     .join(product, product.c.idProduct == detail.c.idProduct))
+        .where(orders.c.orderDate.isnot(None)).group_by(day, category)
+    ))
+
+
+def downgrade():
+    op.drop_table('sales_category_daily')
@@ -0,0 +1,42 @@
+"""Contador desnormalizado user.cart_count
+
+Los triggers que lo mantienen los crea init_cart_counter() al iniciar la
+app; aquí se agrega la columna y se calcula su valor inicial.
+
+Revision ID: c47d2e8a9b15
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d2e8a9b15'
+down_revision = '8b2e4d6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    if 'cart_count' not in columns:
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('cart_count', sa.Integer(), nullable=False, server_default='0'))
+
+    user = sa.table('user', sa.column('idUser'), sa.column('cart_count'))
+    cart_item = sa.table('cart_item', sa.column('idUser'))
+    op.execute(user.update().values(cart_count=(
+        sa.select(sa.func.count()).select_from(cart_item)
+        .where(cart_item.c.idUser == user.c.idUser).scalar_subquery()
+    )))
+
+
+def downgrade():
+    # Los triggers actualizan user.cart_count: sin ellos se puede quitar la columna
+    op.execute('DROP TRIGGER IF EXISTS cart_count_ai')
+    op.execute('DROP TRIGGER IF EXISTS cart_count_ad')
+    op.execute('DROP TRIGGER IF EXISTS cart_count_au')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('cart_count')
@@ -0,0 +1,41 @@
+"""Índices de la grilla de pedidos (estado + fecha / monto)
+
+Revision ID: c9e4a1d7b356
+Revises: b5d8f2a6c973
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a1d7b356'
+down_revision = 'b5d8f2a6c973'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_orders_status_orderDate', ['status', 'orderDate']),
+    ('ix_orders_totalAmount', ['totalAmount']),
+    ('ix_orders_status_totalAmount', ['status', 'totalAmount']),
+]
+
+
+def _index_names(table):
+    # CREATE/DROP INDEX IF [NOT] EXISTS no existe en MySQL: se consulta el inspector
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    existing = _index_names('orders')
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'orders', columns, unique=False)
+
+
+def downgrade():
+    existing = _index_names('orders')
+    for name, _ in reversed(INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name='orders')
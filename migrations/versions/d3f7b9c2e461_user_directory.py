@@ -0,0 +1,91 @@
+"""Listado de usuarios: índices de orden/búsqueda y tabla counter
+
+Revision ID: d3f7b9c2e461
+Revises: c9e4a1d7b356
+Create Date: 2026-10-18 15:30:00.000000
+
+Copias antiguas de la base no tienen ``user.created_at`` (ni ``is_admin``):
+se agregan antes de crear los índices que las usan.
+
+Los triggers que mantienen ``counter`` y su valor inicial se crean al
+arrancar la aplicación (ver app/counters.py: init_user_counter).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f7b9c2e461'
+down_revision = 'c9e4a1d7b356'
+branch_labels = None
+depends_on = None
+
+# Columnas que usan los índices; faltan en copias anteriores al modelo actual
+USER_COLUMNS = [
+    sa.Column('is_admin', sa.Boolean(), nullable=True, server_default=sa.false()),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+]
+INDEXES = [
+    ('ix_user_created_at', ['created_at']),
+    ('ix_user_is_admin_created_at', ['is_admin', 'created_at']),
+]
+# LIKE en SQLite solo usa índices con collation NOCASE
+NOCASE_INDEXES = [
+    ('ix_user_name_nocase', 'nameUser'),
+    ('ix_user_email_nocase', 'emailUser'),
+]
+
+
+def _index_names(table):
+    # CREATE/DROP INDEX IF [NOT] EXISTS no existe en MySQL: se consulta el inspector
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _add_missing_user_columns():
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    missing = [column for column in USER_COLUMNS if column.name not in existing]
+    if not missing:
+        return
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        for column in missing:
+            batch_op.add_column(column.copy())
+    if 'created_at' not in existing:
+        # Sin fecha de alta real: la del momento de la migración, así el orden por created_at no tiene NULL
+        user = sa.table('user', sa.column('created_at'))
+        op.execute(user.update().where(user.c.created_at.is_(None)).values(created_at=sa.func.now()))
+
+
+def upgrade():
+    _add_missing_user_columns()
+    if not sa.inspect(op.get_bind()).has_table('counter'):
+        op.create_table(
+            'counter',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+    existing = _index_names('user')
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'user', columns, unique=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        for name, column in NOCASE_INDEXES:
+            op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON user ("{column}" COLLATE NOCASE)')
+
+
+def downgrade():
+    # Las columnas de USER_COLUMNS se quedan: son parte del modelo base
+    if op.get_bind().dialect.name == 'sqlite':
+        for name, _ in reversed(NOCASE_INDEXES):
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+    existing = _index_names('user')
+    for name, _ in reversed(INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name='user')
+    op.execute('DROP TRIGGER IF EXISTS user_count_ai')
+    op.execute('DROP TRIGGER IF EXISTS user_count_ad')
+    op.execute('DROP TRIGGER IF EXISTS user_count_au')
+    # También escriben en counter (ver app/counters.py: init_product_counter)
+    op.execute('DROP TRIGGER IF EXISTS product_count_ai')
+    op.execute('DROP TRIGGER IF EXISTS product_count_ad')
+    op.drop_table('counter')
@@ -0,0 +1,89 @@
+"""Ranking de más vendidos: product_sales_daily y product_trending
+
+Se crean las tablas y se llenan desde orders/order_detail (las ventanas de
+7 y 30 días relativas al día UTC de la migración, que queda en el marcador
+``leaderboard_day`` de counter); después las mantiene record_sale().
+
+Revision ID: e5a9c1f3d782
+Revises: d3f7b9c2e461
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c1f3d782'
+down_revision = 'd3f7b9c2e461'
+branch_labels = None
+depends_on = None
+
+WINDOWS = {'7d': 7, '30d': 30}
+MARKER = 'leaderboard_day'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_sales_daily'):
+        op.create_table(
+            'product_sales_daily',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('idProduct', sa.Integer(), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(14, 2), nullable=False),
+            sa.ForeignKeyConstraint(['idProduct'], ['product.idProduct'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('day', 'idProduct')
+        )
+    if not inspector.has_table('product_trending'):
+        op.create_table(
+            'product_trending',
+            sa.Column('period', sa.String(length=8), nullable=False),
+            sa.Column('idProduct', sa.Integer(), nullable=False),
+            sa.Column('units', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Numeric(14, 2), nullable=False),
+            sa.ForeignKeyConstraint(['idProduct'], ['product.idProduct'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('period', 'idProduct')
+        )
+        with op.batch_alter_table('product_trending', schema=None) as batch_op:
+            batch_op.create_index('ix_product_trending_period_units', ['period', 'units', 'idProduct'], unique=False)
+
+    orders = sa.table('orders', sa.column('idOrder'), sa.column('orderDate'))
+    detail = sa.table('order_detail', sa.column('idOrder'), sa.column('idProduct'),
+                      sa.column('quantity'), sa.column('price'))
+    daily = sa.table('product_sales_daily', sa.column('day', sa.Date), sa.column('idProduct'),
+                     sa.column('units'), sa.column('revenue'))
+    trending = sa.table('product_trending', sa.column('period'), sa.column('idProduct'),
+                        sa.column('units'), sa.column('revenue'))
+    counter = sa.table('counter', sa.column('name'), sa.column('value'))
+
+    day = sa.func.date(orders.c.orderDate)
+    op.execute(daily.delete())
+    op.execute(daily.insert().from_select(
+        ['day', 'idProduct', 'units', 'revenue'],
+        sa.select(day, detail.c.idProduct, sa.func.sum(detail.c.quantity),
+                  sa.func.sum(detail.c.quantity * detail.c.price))
+        .select_from(detail.join(orders, orders.c.idOrder == detail.c.idOrder))
+        .where(orders.c.orderDate.isnot(None), detail.c.idProduct.isnot(None))
+        .group_by(day, detail.c.idProduct)
+    ))
+
+    today = datetime.utcnow().date()
+    op.execute(trending.delete())
+    for period, days in WINDOWS.items():
+        op.execute(trending.insert().from_select(
+            ['period', 'idProduct', 'units', 'revenue'],
+            sa.select(sa.literal(period), daily.c.idProduct, sa.func.sum(daily.c.units), sa.func.sum(daily.c.revenue))
+            .where(daily.c.day >= today - timedelta(days=days - 1), daily.c.day <= today)
+            .group_by(daily.c.idProduct)
+        ))
+    op.execute(counter.delete().where(counter.c.name == MARKER))
+    op.execute(counter.insert().values(name=MARKER, value=today.toordinal()))
+
+
+def downgrade():
+    op.execute("DELETE FROM counter WHERE name = 'leaderboard_day'")
+    op.drop_table('product_trending')
+    op.drop_table('product_sales_daily')
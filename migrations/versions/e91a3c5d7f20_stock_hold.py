@@ -0,0 +1,40 @@
+"""Reservas temporales de stock (stock_hold)
+
+Revision ID: e91a3c5d7f20
+Revises: c47d2e8a9b15
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91a3c5d7f20'
+down_revision = 'c47d2e8a9b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('stock_hold'):
+        return
+    op.create_table(
+        'stock_hold',
+        sa.Column('idHold', sa.Integer(), nullable=False),
+        sa.Column('idUser', sa.Integer(), nullable=False),
+        sa.Column('idProduct', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['idUser'], ['user.idUser'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['idProduct'], ['product.idProduct'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('idHold')
+    )
+    with op.batch_alter_table('stock_hold', schema=None) as batch_op:
+        batch_op.create_index('uq_stock_hold_user_product', ['idUser', 'idProduct'], unique=True)
+        batch_op.create_index('ix_stock_hold_product_expires', ['idProduct', 'expires_at', 'quantity'], unique=False)
+        batch_op.create_index('ix_stock_hold_expires', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_table('stock_hold')
@@ -0,0 +1,28 @@
+"""Columna product.version para control de concurrencia optimista
+
+Revision ID: f28b6d9e4c31
+Revises: e91a3c5d7f20
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f28b6d9e4c31'
+down_revision = 'e91a3c5d7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('product')}
+    if 'version' not in columns:
+        with op.batch_alter_table('product', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,45 @@
+"""Filtros facetados: tabla product_facet
+
+Solo se crea la tabla. Los triggers sobre ``product`` que la mantienen, y su
+llenado inicial, se crean al arrancar la aplicación (ver app/facets.py:
+init_facet_index).
+
+Revision ID: f6a2c8e4d159
+Revises: e5a9c1f3d782
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a2c8e4d159'
+down_revision = 'e5a9c1f3d782'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ['product_facet_ai', 'product_facet_ad', 'product_facet_au']
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('product_facet'):
+        return
+    op.create_table(
+        'product_facet',
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('size', sa.String(length=50), nullable=False),
+        sa.Column('color', sa.String(length=50), nullable=False),
+        sa.Column('price_bucket', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('in_stock', sa.Boolean(), nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('category', 'size', 'color', 'price_bucket', 'in_stock')
+    )
+
+
+def downgrade():
+    # Sin la tabla, los triggers harían fallar cada escritura en product
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    if sa.inspect(op.get_bind()).has_table('product_facet'):
+        op.drop_table('product_facet')